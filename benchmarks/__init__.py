@@ -0,0 +1,222 @@
+"""
+Benchmarks of the interpreter engines.
+
+The workloads are listed in `workloads.json`. Each one names a program in `programs`,
+its input, the sha256 of its expected output, and the number of Brainfuck
+instructions that it executes (as counted by the reference `BrainfuckInterpreter`),
+which is what instructions per second are measured against so that engines which
+count instructions differently can be compared. Most workloads run for at least
+a second with the fastest engine, so the reference interpreter takes minutes on
+them and can be left out with `--engines`.
+
+Every run of a workload is timed in a fresh process, so the time includes compiling
+the program and the peak memory is not affected by other runs.
+
+    python -m benchmarks run -o results.json [--engines fast compiled] [--repeat 3]
+    python -m benchmarks compare old.json new.json [--threshold 0.1]
+    python -m benchmarks calibrate
+"""
+
+import hashlib
+import json
+import multiprocessing
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+import esolang_IDE.interpreters as interpreters
+from esolang_IDE.run import ENGINES as _RUNNER_ENGINES
+
+BENCHMARKS_PATH = Path(__file__).parent
+WORKLOADS_PATH = BENCHMARKS_PATH / 'workloads.json'
+
+ENGINES = {'reference': interpreters.BrainfuckInterpreter, **_RUNNER_ENGINES}
+
+RESULTS_VERSION = 1
+
+
+class Workload(NamedTuple):
+    """A program to benchmark.
+
+    Attributes:
+        name -- Name of the workload.
+        program -- Path of the program, relative to the benchmarks directory.
+        input -- Input text.
+        instructions -- Number of instructions executed by the reference interpreter.
+        output_sha256 -- Hex digest of the expected output (encoded as latin-1)."""
+
+    name: str
+    program: str
+    input: str = ''
+    instructions: Optional[int] = None
+    output_sha256: Optional[str] = None
+
+    def code(self):
+        return (BENCHMARKS_PATH / self.program).read_text(encoding='utf-8')
+
+
+def _read_input(spec):
+    """Return the input text described by `spec`, which is either a string or a dict
+    with the keys `text` and `repeat`."""
+    if isinstance(spec, str):
+        return spec
+    return spec['text'] * spec.get('repeat', 1)
+
+
+def load_workloads(path=WORKLOADS_PATH) -> list[Workload]:
+    with open(path, encoding='utf-8') as file:
+        data = json.load(file)
+    return [
+        Workload(
+            item['name'],
+            item['program'],
+            _read_input(item.get('input', '')),
+            item.get('instructions'),
+            item.get('output_sha256'),
+        )
+        for item in data['workloads']
+    ]
+
+
+def output_hash(output: str) -> str:
+    return hashlib.sha256(output.encode('latin-1', 'replace')).hexdigest()
+
+
+def _peak_memory_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def _measure(engine, code, input_text):
+    """Run `code` once with `engine` and return (wall_time, output, peak_memory_kb)."""
+    chars = iter(input_text)
+    start = time.perf_counter()
+    interpreter = ENGINES[engine](
+        code, input_func=lambda: next(chars, '\0'), output_func=None
+    )
+    output = interpreter.run()
+    wall_time = time.perf_counter() - start
+    return wall_time, output, _peak_memory_kb()
+
+
+def _measure_in_process(engine, code, input_text):
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1) as pool:
+        return pool.apply(_measure, (engine, code, input_text))
+
+
+def run_workload(workload: Workload, engine: str, repeat: int = 3) -> dict:
+    """Return the result of running `workload` with `engine` `repeat` times."""
+    code = workload.code()
+    wall_times = []
+    peak_memory = []
+    output_ok = True
+    for _ in range(repeat):
+        wall_time, output, memory = _measure_in_process(engine, code, workload.input)
+        wall_times.append(wall_time)
+        peak_memory.append(memory)
+        if workload.output_sha256 is not None:
+            output_ok = output_ok and output_hash(output) == workload.output_sha256
+
+    wall_time = statistics.median(wall_times)
+    return {
+        'workload': workload.name,
+        'engine': engine,
+        'wall_time': wall_time,
+        'wall_times': wall_times,
+        'instructions': workload.instructions,
+        'instructions_per_second': (
+            workload.instructions / wall_time if workload.instructions else None
+        ),
+        'peak_memory_kb': max(peak_memory) if None not in peak_memory else None,
+        'output_ok': output_ok,
+    }
+
+
+def run_benchmarks(workloads, engines, repeat=3, log=None) -> dict:
+    """Run every workload with every engine and return the results."""
+    results = []
+    for workload in workloads:
+        for engine in engines:
+            result = run_workload(workload, engine, repeat)
+            results.append(result)
+            if log is not None:
+                log(_format_result(result))
+    return {
+        'version': RESULTS_VERSION,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def _format_result(result):
+    rate = result['instructions_per_second']
+    rate_text = f'{rate / 1e6:8.2f} M instr/s' if rate else ' ' * 15
+    memory = result['peak_memory_kb']
+    memory_text = f'{memory / 1024:7.1f} MB' if memory is not None else ''
+    status = '' if result['output_ok'] else '  WRONG OUTPUT'
+    return (
+        f'{result["workload"]:<12} {result["engine"]:<10} {result["wall_time"]:9.3f} s'
+        f'  {rate_text}  {memory_text}{status}'
+    )
+
+
+def compare(old: dict, new: dict, threshold: float = 0.1) -> tuple[list[str], bool]:
+    """Compare two sets of results. Return the lines of a report, and whether any
+    workload got more than `threshold` (as a fraction) slower or gave wrong output."""
+    old_results = {(r['workload'], r['engine']): r for r in old['results']}
+    lines = [f'{"workload":<12} {"engine":<10} {"old":>9}   {"new":>9}   {"change":>7}']
+    regressed = False
+    for result in new['results']:
+        key = (result['workload'], result['engine'])
+        previous = old_results.get(key)
+        if previous is None:
+            lines.append(f'{key[0]:<12} {key[1]:<10} {"-":>9}   {result["wall_time"]:9.3f}s')
+            continue
+        change = result['wall_time'] / previous['wall_time'] - 1
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressed = True
+        if not result['output_ok']:
+            flag += '  WRONG OUTPUT'
+            regressed = True
+        lines.append(
+            f'{key[0]:<12} {key[1]:<10} {previous["wall_time"]:9.3f}s  '
+            f'{result["wall_time"]:9.3f}s  {change:+7.1%}{flag}'
+        )
+    return lines, regressed
+
+
+def calibrate(path=WORKLOADS_PATH):
+    """Fill in the instruction count and output hash of every workload in the
+    manifest at `path` by running it with the reference interpreter."""
+    with open(path, encoding='utf-8') as file:
+        data = json.load(file)
+    for item in data['workloads']:
+        workload = Workload(item['name'], item['program'], _read_input(item.get('input', '')))
+        chars = iter(workload.input)
+        interpreter = interpreters.BrainfuckInterpreter(
+            workload.code(), input_func=lambda: next(chars, '\0'), output_func=None
+        )
+        output = interpreter.run()
+        item['instructions'] = interpreter.instruction_count
+        item['output_sha256'] = output_hash(output)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, indent=4)
+        file.write('\n')
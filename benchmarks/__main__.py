@@ -0,0 +1,64 @@
+import argparse
+import json
+import sys
+
+import benchmarks
+
+
+def _parser():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='run the benchmarks')
+    run.add_argument('-o', '--output', help='path to save the results to as JSON')
+    run.add_argument(
+        '--engines', nargs='+', choices=benchmarks.ENGINES, default=list(benchmarks.ENGINES)
+    )
+    run.add_argument('--workloads', nargs='+', help='names of the workloads to run')
+    run.add_argument('--repeat', type=int, default=3, help='number of runs of each workload')
+
+    compare = commands.add_parser('compare', help='compare two result files')
+    compare.add_argument('old')
+    compare.add_argument('new')
+    compare.add_argument(
+        '--threshold',
+        type=float,
+        default=0.1,
+        help='fraction by which a workload can get slower before it is a regression',
+    )
+
+    commands.add_parser(
+        'calibrate', help='record the instruction counts and outputs of the workloads'
+    )
+    return parser
+
+
+def main(argv=None) -> int:
+    args = _parser().parse_args(argv)
+
+    if args.command == 'run':
+        workloads = benchmarks.load_workloads()
+        if args.workloads:
+            workloads = [w for w in workloads if w.name in args.workloads]
+        results = benchmarks.run_benchmarks(workloads, args.engines, args.repeat, log=print)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=4)
+                file.write('\n')
+        return 0 if all(result['output_ok'] for result in results['results']) else 1
+
+    if args.command == 'compare':
+        with open(args.old, encoding='utf-8') as file:
+            old = json.load(file)
+        with open(args.new, encoding='utf-8') as file:
+            new = json.load(file)
+        lines, regressed = benchmarks.compare(old, new, args.threshold)
+        print('\n'.join(lines))
+        return 1 if regressed else 0
+
+    benchmarks.calibrate()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
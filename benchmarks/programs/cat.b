@@ -0,0 +1,4 @@
+Input heavy
+Copies the input to the output until a zero byte is read
+
+,[.,]
@@ -0,0 +1,16 @@
+Nested counting loops
+Two hundred and fifty times one hundred times one hundred iterations of an inner loop
+which clears a cell so that the optimiser cannot collapse it
+The final count modulo 256 is printed
+
+++++++++++[>+++++++++++++++++++++++++<-]>
+[
+  >++++++++++[>++++++++++<-]>
+  [
+    >++++++++++[>++++++++++<-]>
+    [->+>[-]<<]
+    <<-
+  ]
+  <<-
+]
+>>>>>.
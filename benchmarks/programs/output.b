@@ -0,0 +1,13 @@
+Output heavy
+Prints 128 times 128 times 128 characters cycling through every byte value
+
+++++++++[>++++++++++++++++<-]>
+[>
+  ++++++++[>++++++++++++++++<-]>
+  [>
+    ++++++++[>++++++++++++++++<-]>
+    [>.+<-]
+    <<-
+  ]
+  <<-
+]
@@ -0,0 +1,28 @@
+Prime cruncher
+Tests every number from 2 to 160 for primality by trial division with a divmod
+by each number below it
+Prints 1 for each prime and 0 for each other number
+
+Cells: count  n  divisors left  d  is prime  temp  then the work cells of the divmod
+
+++++++++++[>++++++++++++++++<-]>[<+>-]<-
+>+<
+[
+  ->+>>>+<<<
+  [->+>>>+<<<<]>>>>[-<<<<+>>>>]
+  <<<-->+<
+  [
+    ->+
+    copy n and d to the work cells
+    <<[->>>>>+<+<<<<]>>>>[-<<<<+>>>>]
+    <<[->>>>+<<+<<]>>[-<<+>>]>
+    divmod which leaves d minus n mod d next to it and is 0 if d divides n
+    [->[->+>>]>[<<+>>[-<+>]>+>>]<<<<<]
+    >>[-]>[-]
+    <<<<+>>[[-]<<->>]<<[<[-]>-]
+    <<<
+  ]
+  >[-]>
+  >++++++++[<++++++>-]<.[-]
+  <<<<
+]
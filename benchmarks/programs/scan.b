@@ -0,0 +1,7 @@
+Scan heavy
+Builds a trail of 1530 cells one cell at a time and scans to the end of the
+trail and back for every cell that it adds
+Prints the last cell of the trail
+
+++++++[>-[>>[>]+[<]<-]<-]
+>>>[>]<.
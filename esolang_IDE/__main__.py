@@ -1,9 +1,13 @@
-from PyQt5 import QtWidgets
-
-from controllers import IOController
+import multiprocessing
 
 
 def main():
+    # Qt is imported here rather than at module level, since worker processes
+    # (see `interpreters.process_interpreter`) import this module when they start
+    from PyQt5 import QtWidgets
+
+    from esolang_IDE.controllers import IOController
+
     app = QtWidgets.QApplication([])
     m = IOController()
     m.ide.show()
@@ -11,4 +15,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Run the worker process instead of the IDE in a frozen executable
+    multiprocessing.freeze_support()
     main()
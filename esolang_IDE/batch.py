@@ -0,0 +1,263 @@
+"""
+Run many (program, input) jobs in parallel over a pool of worker processes:
+
+    python -m esolang_IDE.batch jobs.jsonl -o results.jsonl
+
+Each line of the jobs file is a JSON object with the keys:
+    program -- Path of the program (relative to the jobs file).
+    input -- Optional input text.
+    input_file -- Optional path of a file to read the input from instead.
+    id -- Optional identifier copied into the result.
+
+Each line of the results is a JSON object with the keys:
+    index -- Line number of the job in the jobs file (starting from 0).
+    id, program -- Copied from the job.
+    status -- 'ended', 'error', 'needs_input', 'timeout' or 'instruction_limit'.
+    error -- Name of the `ErrorTypes` member or exception, or null.
+    message -- Description of the error, or null.
+    output -- Output text of the program.
+    instructions -- Number of instructions executed, where each command of the
+        source code that runs is one instruction (as in `BrainfuckInterpreter`).
+    wall_time -- Number of seconds spent running the program.
+
+Results are written in the order in which the jobs finish. Jobs with the same
+program are sent to the same worker in chunks, so that each worker only compiles
+the program once (see `interpreters.program_cache`).
+
+The timeout is checked between batches of instructions, and the engines only
+check the instruction limit at loops, so neither limit is enforced while a program
+runs a long stretch of code without any loops.
+"""
+
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+import esolang_IDE.interpreters as interpreters
+from esolang_IDE.run import ENGINES, error_message
+
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_MAX_INSTRUCTIONS = 1_000_000_000
+DEFAULT_CHUNK_SIZE = 16
+
+# Number of instructions run between checks of the time and instruction limits
+_BATCH_SIZE = 100_000
+
+
+class Job(NamedTuple):
+    """A program to run with some input.
+
+    Attributes:
+        index -- Index of the job, which is copied to the result.
+        program -- Path of the program.
+        input -- Input text.
+        id -- Optional identifier which is copied to the result."""
+
+    index: int
+    program: str
+    input: str = ''
+    id: Optional[str] = None
+
+
+class JobOptions(NamedTuple):
+    engine: str = 'compiled'
+    timeout: float = DEFAULT_TIMEOUT
+    max_instructions: int = DEFAULT_MAX_INSTRUCTIONS
+    eof: str = 'zero'
+
+
+def run_job(code: str, job: Job, options: JobOptions) -> dict:
+    """Run `code` with the input of `job` and return the result."""
+    result = {
+        'index': job.index,
+        'id': job.id,
+        'program': job.program,
+        'status': 'ended',
+        'error': None,
+        'message': None,
+        'output': '',
+        'instructions': 0,
+        'wall_time': 0.0,
+    }
+    chars = iter(job.input)
+    eof_char = '\0' if options.eof == 'zero' else ''
+    start = time.perf_counter()
+    deadline = time.monotonic() + options.timeout
+
+    try:
+        interpreter = ENGINES[options.engine](
+            code, input_func=lambda: next(chars, eof_char), output_func=None
+        )
+    except interpreters.ProgramSyntaxError as error:
+        result.update(status='error', error=error.error.name, message=error_message(error))
+        return result
+
+    while True:
+        budget = min(_BATCH_SIZE, options.max_instructions - interpreter.instruction_count)
+        status = interpreter.run_for(budget)
+        if status is not interpreters.RunStatus.BUDGET_EXHAUSTED:
+            break
+        if interpreter.instruction_count >= options.max_instructions:
+            result['status'] = 'instruction_limit'
+            break
+        if time.monotonic() >= deadline:
+            result['status'] = 'timeout'
+            break
+
+    interpreter.flush_output()
+    if status is interpreters.RunStatus.NEEDS_INPUT:
+        result['status'] = 'needs_input'
+    elif status is interpreters.RunStatus.ERROR:
+        error = interpreter.error
+        result.update(status='error', error=error.error.name, message=error_message(error))
+    result.update(
+        output=''.join(interpreter.output),
+        instructions=interpreter.instruction_count,
+        wall_time=time.perf_counter() - start,
+    )
+    return result
+
+
+def _run_chunk(code, jobs, options):
+    results = []
+    for job in jobs:
+        try:
+            results.append(run_job(code, job, options))
+        except Exception as error:
+            results.append(_error_result(job, error))
+    return results
+
+
+def _error_result(job, error):
+    return {
+        'index': job.index,
+        'id': job.id,
+        'program': job.program,
+        'status': 'error',
+        'error': type(error).__name__,
+        'message': str(error),
+        'output': '',
+        'instructions': 0,
+        'wall_time': 0.0,
+    }
+
+
+def run_batch(
+    jobs: Iterable[Job],
+    options: JobOptions = JobOptions(),
+    *,
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[dict]:
+    """Run `jobs` over a pool of `workers` processes (by default one per core), and
+    yield the result of each job as it finishes. A job which raises an exception
+    gets an error result instead of stopping the batch."""
+    programs = {}
+    for job in jobs:
+        programs.setdefault(job.program, []).append(job)
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        # Jobs of each chunk, by its future
+        futures = {}
+        for path, program_jobs in programs.items():
+            try:
+                code = Path(path).read_text(encoding='utf-8')
+            except OSError as error:
+                yield from (_error_result(job, error) for job in program_jobs)
+                continue
+            for i in range(0, len(program_jobs), chunk_size):
+                chunk = program_jobs[i : i + chunk_size]
+                futures[executor.submit(_run_chunk, code, chunk, options)] = chunk
+
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                results = future.result()
+            except Exception as error:
+                # The chunk could not be sent to a worker, or its worker died, which
+                # only fails the jobs of that chunk
+                results = [_error_result(job, error) for job in futures[future]]
+            yield from results
+
+
+def read_jobs(path) -> list[Job]:
+    """Return the jobs in the JSONL file at `path`."""
+    base = Path(path).parent
+    jobs = []
+    with open(path, encoding='utf-8') as file:
+        for index, line in enumerate(file):
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            input_text = data.get('input', '')
+            if 'input_file' in data:
+                input_text = (base / data['input_file']).read_text(encoding='utf-8')
+            jobs.append(
+                Job(index, str(base / data['program']), input_text, data.get('id'))
+            )
+    return jobs
+
+
+def _parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m esolang_IDE.batch',
+        description='Run the jobs in a JSONL file in parallel and write the results as JSONL.',
+    )
+    parser.add_argument('jobs', help='path of the JSONL file of jobs')
+    parser.add_argument('-o', '--output', help='path to write the results to (default stdout)')
+    parser.add_argument('--engine', choices=ENGINES, default='compiled')
+    parser.add_argument(
+        '--timeout', type=float, default=DEFAULT_TIMEOUT, help='seconds allowed per job'
+    )
+    parser.add_argument(
+        '--max-instructions',
+        type=int,
+        default=DEFAULT_MAX_INSTRUCTIONS,
+        help='instructions allowed per job',
+    )
+    parser.add_argument(
+        '--eof',
+        choices=('zero', 'error'),
+        default='zero',
+        help='read 0 at the end of the input, or stop with the status needs_input',
+    )
+    parser.add_argument(
+        '--workers', type=int, default=os.cpu_count(), help='number of worker processes'
+    )
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help='maximum number of jobs with the same program sent to a worker at once',
+    )
+    return parser
+
+
+def main(argv=None) -> int:
+    args = _parser().parse_args(argv)
+    try:
+        jobs = read_jobs(args.jobs)
+    except (OSError, ValueError, KeyError) as error:
+        print(f'error: could not read jobs: {error!r}', file=sys.stderr)
+        return 2
+
+    options = JobOptions(args.engine, args.timeout, args.max_instructions, args.eof)
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for result in run_batch(
+            jobs, options, workers=args.workers, chunk_size=args.chunk_size
+        ):
+            output.write(json.dumps(result) + '\n')
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
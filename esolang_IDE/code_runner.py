@@ -1,9 +1,12 @@
+import time
 from typing import Type
 
 from PyQt5 import QtCore, QtGui, QtWidgets
 
 from esolang_IDE.input_text import StandardInputText, HighlightInputText
 from esolang_IDE.output_text import RunnerOutputText
+from esolang_IDE.profile_table import ProfileTable
+from esolang_IDE.runner_metrics import RunnerMetrics
 import esolang_IDE.interpreters as interpreters
 
 
@@ -15,6 +18,10 @@ class RunnerThread(QtCore.QThread):
     continued = QtCore.pyqtSignal()
     interrupted = QtCore.pyqtSignal()
     error = QtCore.pyqtSignal(Exception)
+    # Emitted with the `LoopProfile`s whenever a profiled program stops running
+    profiled = QtCore.pyqtSignal(list)
+    # Emitted with `RunnerMetrics` periodically while running, and when stopping
+    metrics = QtCore.pyqtSignal(object)
 
     _want_to_start = QtCore.pyqtSignal()
 
@@ -23,6 +30,11 @@ class RunnerThread(QtCore.QThread):
     _STOP_INTERRUPT = 2  # Stop interrupt is not currently used
     _INTERRUPT_INTERRUPT = 3
 
+    # Number of instructions run between checks for interrupts
+    _BATCH_SIZE = 50_000
+    # Number of seconds between metrics
+    _METRICS_INTERVAL = 0.5
+
     def __init__(self, code_func, input_func, output_func):
         super().__init__()
 
@@ -31,25 +43,82 @@ class RunnerThread(QtCore.QThread):
         self._output_func = output_func
 
         self.interpreter_type = None
+        self.process_mode = False
+        self.profile_mode = False
         self._interpreter = None
+        self._interpreter_running = False
         self._run_call_interrupt = False
 
+        self._output_chars = 0
+        self._metrics_time = 0.0
+        self._metrics_instructions = 0
+
         self._want_to_start.connect(self.run_called)
 
     def run(self):
-        self._interpreter_running = True
-        try:
-            while self._interpreter_running:
-                if self._run_call_interrupt:
-                    self._handle_interrupt()
-                else:
-                    self._interpreter.step()
-        except interpreters.InterpreterError as error:
-            self.error.emit(error)
+        interpreter = self._interpreter
+        self._metrics_time = time.monotonic()
+        next_metrics_time = self._metrics_time + self._METRICS_INTERVAL
+        while self._interpreter_running:
+            if self._run_call_interrupt:
+                self._handle_interrupt()
+                return
+            status = interpreter.run_for(self._BATCH_SIZE)
+            if status is not interpreters.RunStatus.BUDGET_EXHAUSTED:
+                self._interpreter_running = False
+                self._emit_results(interpreter)
+                self.error.emit(self._status_error(interpreter, status))
+                return
+            if time.monotonic() >= next_metrics_time:
+                self._emit_metrics(interpreter)
+                next_metrics_time = self._metrics_time + self._METRICS_INTERVAL
+
+        # Paused or stopped, so pass on the output that is still buffered
+        interpreter.flush_output()
+        interpreter.pause()
+        self._emit_results(interpreter)
+
+    def _emit_results(self, interpreter):
+        """Emit the metrics and the profile of `interpreter` when it stops running."""
+        self._emit_metrics(interpreter)
+        profile = interpreter.loop_profile()
+        if profile is not None:
+            self.profiled.emit(profile)
+
+    def _emit_metrics(self, interpreter):
+        stats = interpreter.stats()
+        now = time.monotonic()
+        elapsed = now - self._metrics_time
+        rate = (stats.instructions - self._metrics_instructions) / elapsed if elapsed else 0.0
+        self._metrics_time = now
+        self._metrics_instructions = stats.instructions
+        self.metrics.emit(
+            RunnerMetrics(
+                instructions=stats.instructions,
+                instructions_per_second=rate,
+                output_chars=self._output_chars,
+                tape_cells=stats.tape_cells,
+                rss_kb=stats.rss_kb,
+            )
+        )
+
+    def _write_output(self, text):
+        self._output_chars += len(text)
+        self._output_func(text)
+
+    @staticmethod
+    def _status_error(interpreter, status):
+        if status is interpreters.RunStatus.NEEDS_INPUT:
+            return interpreters.NoInputError()
+        if status is interpreters.RunStatus.ENDED:
+            return interpreters.ExecutionEndedError()
+        return interpreter.error
 
     def _handle_interrupt(self):
         self._interpreter_running = False
-        self._interpreter = None
+        if self._interpreter is not None:
+            self._emit_results(self._interpreter)
+        self._close_interpreter()
         if self._run_call_interrupt == self._STOP_INTERRUPT:
             self.stopped.emit()
         elif self._run_call_interrupt == self._RESTART_INTERRUPT:
@@ -61,7 +130,9 @@ class RunnerThread(QtCore.QThread):
 
     def stop(self):
         self._interpreter_running = False
-        self._interpreter = None
+        # Let the runner thread finish its batch, since it may be using the interpreter
+        self.wait()
+        self._close_interpreter()
         self.stopped.emit()
 
     def pause(self):
@@ -72,32 +143,56 @@ class RunnerThread(QtCore.QThread):
         """Called whenever the code runner is run by the user.
         Set the `_run_call_interrupt` flag if currently running. Otherwise, start self, and
         if there is no current interpreter, create a new interpreter."""
-        if self.isRunning():
+        if self.isRunning() and self._interpreter_running:
             self._run_call_interrupt = self._RESTART_INTERRUPT
-        elif self._interpreter is None:
+            return
+
+        # The thread may still be finishing after it was stopped or interrupted
+        self.wait()
+        if self._interpreter is None:
             self._start_interpreter()
         else:
-            self.start()
+            self._start_thread()
             self.continued.emit()
 
     def interrupt(self):
-        if self.isRunning():
+        if self.isRunning() and self._interpreter_running:
             self._run_call_interrupt = self._INTERRUPT_INTERRUPT
 
     def _start_interpreter(self):
         if self.interpreter_type is None:
             return
+        interpreter_type = self.interpreter_type
+        if self.process_mode:
+            interpreter_type = interpreters.process_interpreter_type(interpreter_type)
+        kwargs = {}
+        if self.profile_mode and interpreter_type.supports_profiling:
+            kwargs['profile'] = True
+
+        self._output_chars = 0
+        self._metrics_instructions = 0
         self.started.emit()
         try:
-            self._interpreter = self.interpreter_type(
+            self._interpreter = interpreter_type(
                 self._code_func(),
                 input_func=self._input_func,
-                output_func=self._output_func,
+                output_func=self._write_output,
+                **kwargs,
             )
         except interpreters.ProgramSyntaxError as error:
             self.error.emit(error)
         else:
-            self.start()
+            self._start_thread()
+
+    def _close_interpreter(self):
+        interpreter, self._interpreter = self._interpreter, None
+        if interpreter is not None:
+            interpreter.close()
+
+    def _start_thread(self):
+        self._interpreter_running = True
+        self._run_call_interrupt = self._NO_INTERRUPT
+        self.start()
 
     def set_interpreter_type(self, interpreter_type: Type[interpreters.BaseInterpreter]):
         if interpreter_type is self.interpreter_type:
@@ -116,15 +211,20 @@ class CodeRunner(QtWidgets.QWidget):
 
         self._input_text = StandardInputText()
         self._output_text = RunnerOutputText()
+        self._profile_table = ProfileTable()
+        self._profile_table.hide()
 
         splitter = QtWidgets.QSplitter(QtCore.Qt.Horizontal)
         splitter.addWidget(self._output_text)
         splitter.addWidget(self._input_text)
+        splitter.addWidget(self._profile_table)
 
         self._error_text = QtWidgets.QLineEdit(self)
         self._error_text.setReadOnly(True)
 
         self._statusbar = QtWidgets.QStatusBar(self)
+        self._metrics_label = QtWidgets.QLabel(self._statusbar)
+        self._statusbar.addPermanentWidget(self._metrics_label)
 
         layout = QtWidgets.QVBoxLayout(self)
         layout.addWidget(splitter, stretch=1)
@@ -142,8 +242,14 @@ class CodeRunner(QtWidgets.QWidget):
     def set_status_message(self, text):
         self._statusbar.showMessage(text)
 
+    def set_metrics_message(self, text):
+        self._metrics_label.setText(text)
+
     def get_input_text(self):
         return self._input_text
 
     def get_output_text(self):
         return self._output_text
+
+    def get_profile_table(self):
+        return self._profile_table
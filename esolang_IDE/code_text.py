@@ -1,11 +1,32 @@
 from PyQt5 import QtWidgets, QtGui, QtCore, Qsci
 
 
+def _byte_offsets(text, positions):
+    """Return the offsets in the UTF-8 encoding of `text` of the indices `positions`
+    of `text`, since Scintilla positions are offsets in the UTF-8 document."""
+    if text.isascii():
+        return list(positions)
+    offsets = {}
+    offset = index = 0
+    for position in sorted(set(positions)):
+        offset += len(text[index:position].encode())
+        index = position
+        offsets[position] = offset
+    return [offsets[position] for position in positions]
+
+
 class CodeText(Qsci.QsciScintilla):
 
     # According to docs, The 0-7 are normally used by lexers
     _CURRENT_POSITION_INDICATOR = 8
     _ERROR_INDICATOR = 9
+    # Heatmap of the profiler, from the coolest to the hottest loops
+    _HEAT_INDICATORS = range(10, 15)
+    _HEAT_COLOURS = ('#fff3c4', '#ffde85', '#ffbb55', '#ff8c42', '#ff5a3c')
+
+    # Clicking this margin toggles a breakpoint on the line
+    _BREAKPOINT_MARGIN = 1
+    _BREAKPOINT_MARKER = 0
 
     key_during_visualisation = QtCore.pyqtSignal()
 
@@ -20,6 +41,11 @@ class CodeText(Qsci.QsciScintilla):
         self._last_command_position = (0, 0)
         self._error_locations = set()
         self._during_visualisation = False
+        self._heatmap_shown = False
+
+        # The heatmap no longer matches the code once it is edited
+        self.textChanged.connect(self.remove_heatmap)
+        self.marginClicked.connect(self._margin_clicked)
 
     def init_settings(self):
         self.setEolMode(Qsci.QsciScintilla.SC_EOL_LF)
@@ -40,7 +66,10 @@ class CodeText(Qsci.QsciScintilla):
 
         self.setMarginType(0, self.NumberMargin)
         self.setMarginWidth(0, 40)
-        self.setMarginWidth(1, 0)
+        self.setMarginType(self._BREAKPOINT_MARGIN, self.SymbolMargin)
+        self.setMarginWidth(self._BREAKPOINT_MARGIN, 14)
+        self.setMarginSensitivity(self._BREAKPOINT_MARGIN, True)
+        self.setMarginMarkerMask(self._BREAKPOINT_MARGIN, 1 << self._BREAKPOINT_MARKER)
 
         self.setScrollWidth(1)
 
@@ -67,6 +96,16 @@ class CodeText(Qsci.QsciScintilla):
             QtGui.QColor('yellow'), indicatorNumber=self._ERROR_INDICATOR
         )
 
+        self.markerDefine(self.Circle, self._BREAKPOINT_MARKER)
+        self.setMarkerBackgroundColor(QtGui.QColor('red'), self._BREAKPOINT_MARKER)
+        self.setMarkerForegroundColor(QtGui.QColor('darkred'), self._BREAKPOINT_MARKER)
+
+        for indicator, colour in zip(self._HEAT_INDICATORS, self._HEAT_COLOURS):
+            self.indicatorDefine(self.FullBoxIndicator, indicator)
+            self.setIndicatorDrawUnder(True, indicator)
+            self.setIndicatorForegroundColor(QtGui.QColor(colour), indicatorNumber=indicator)
+            self.setIndicatorOutlineColor(QtGui.QColor(colour), indicatorNumber=indicator)
+
     def set_lexer(self, lexer):
         self.setLexer(lexer(self))
 
@@ -94,6 +133,74 @@ class CodeText(Qsci.QsciScintilla):
             self.SendScintilla(self.SCI_INDICATORCLEARRANGE, position, chars)
         self._error_locations = set()
 
+    @classmethod
+    def heat_levels(cls):
+        return len(cls._HEAT_INDICATORS)
+
+    def show_heatmap(self, ranges):
+        """Colour each of the (position, chars, heat) `ranges`, where positions are
+        indices of `text()` and heat is from 0 to `heat_levels() - 1`."""
+        self.remove_heatmap()
+        bounds = _byte_offsets(
+            self.text(),
+            [bound for position, chars, _ in ranges for bound in (position, position + chars)],
+        )
+        for (_, _, heat), start, end in zip(ranges, bounds[::2], bounds[1::2]):
+            self.SendScintilla(self.SCI_SETINDICATORCURRENT, self._HEAT_INDICATORS[heat])
+            self.SendScintilla(self.SCI_INDICATORFILLRANGE, start, end - start)
+        self._heatmap_shown = bool(ranges)
+
+    def remove_heatmap(self):
+        if not self._heatmap_shown:
+            return
+        for indicator in self._HEAT_INDICATORS:
+            self.SendScintilla(self.SCI_SETINDICATORCURRENT, indicator)
+            self.SendScintilla(self.SCI_INDICATORCLEARRANGE, 0, self.length())
+        self._heatmap_shown = False
+
+    def select_range(self, position, chars):
+        """Select `chars` characters from the index `position` of `text()`."""
+        start, end = _byte_offsets(self.text(), (position, position + chars))
+        self.SendScintilla(self.SCI_SETSEL, start, end)
+        self.setFocus()
+
+    def line_index(self, position) -> tuple[int, int]:
+        """Return the (line, index) of the index `position` of `text()`."""
+        text = self.text()
+        line_start = text.rfind('\n', 0, position) + 1
+        return text.count('\n', 0, position), position - line_start
+
+    def toggle_breakpoint(self, line):
+        if self.markersAtLine(line) & (1 << self._BREAKPOINT_MARKER):
+            self.markerDelete(line, self._BREAKPOINT_MARKER)
+        else:
+            self.markerAdd(line, self._BREAKPOINT_MARKER)
+
+    def breakpoint_lines(self) -> list[int]:
+        lines = []
+        line = self.markerFindNext(0, 1 << self._BREAKPOINT_MARKER)
+        while line != -1:
+            lines.append(line)
+            line = self.markerFindNext(line + 1, 1 << self._BREAKPOINT_MARKER)
+        return lines
+
+    def breakpoint_ranges(self) -> list[tuple[int, int]]:
+        """Return the (position, chars) of each line with a breakpoint, where the
+        positions are indices of `text()`."""
+        lines = self.text().split('\n')
+        starts = [0]
+        for line in lines:
+            starts.append(starts[-1] + len(line) + 1)
+        return [
+            (starts[line], len(lines[line]))
+            for line in self.breakpoint_lines()
+            if line < len(lines)
+        ]
+
+    def _margin_clicked(self, margin, line, modifiers):
+        if margin == self._BREAKPOINT_MARGIN:
+            self.toggle_breakpoint(line)
+
     def keyPressEvent(self, event):
         if self._during_visualisation:
             self.key_during_visualisation.emit()
@@ -25,6 +25,8 @@ class _FileOperation(enum.Enum):
 
 class _RunOperation(enum.Enum):
     run = enum.auto()
+    run_in_process = enum.auto()
+    profile = enum.auto()
     visualiser = enum.auto()
 
 
@@ -125,6 +127,8 @@ class _RunOperationHandler(_OperationHandler):
 
         self._op2fn = {
             _RunOperation.run: self._run_code,
+            _RunOperation.run_in_process: self._run_code_in_process,
+            _RunOperation.profile: self._profile_code,
             _RunOperation.visualiser: self._open_visualier,
         }
 
@@ -135,6 +139,20 @@ class _RunOperationHandler(_OperationHandler):
 
         self.pages[page].controller.run_code()
 
+    def _run_code_in_process(self):
+        page = self.notebook.current_page()
+        if page is None:
+            return
+
+        self.pages[page].controller.run_code(in_process=True)
+
+    def _profile_code(self):
+        page = self.notebook.current_page()
+        if page is None:
+            return
+
+        self.pages[page].controller.run_code(profile=True)
+
     def _open_visualier(self):
         page = self.notebook.current_page()
         if page is None:
@@ -175,6 +193,18 @@ class IOController:
                 ),
                 'Run': (
                     ('Run code', 'Ctrl+B', 'Run code', run_handle(_RunOperation.run)),
+                    (
+                        'Run code in separate process',
+                        'Ctrl+Alt+B',
+                        'Run code in a separate process',
+                        run_handle(_RunOperation.run_in_process),
+                    ),
+                    (
+                        'Profile code',
+                        'Ctrl+Alt+P',
+                        'Run code and show how many instructions each loop runs',
+                        run_handle(_RunOperation.profile),
+                    ),
                     (
                         'Open visualiser',
                         'Ctrl+Shift+B',
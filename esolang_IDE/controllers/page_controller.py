@@ -32,9 +32,9 @@ class PageController(QtCore.QObject):
         if text:
             self._code_text.setText(text)
 
-    def run_code(self):
+    def run_code(self, in_process=False, profile=False):
         self._editor_page.open_code_runner()
-        self._runner_controller.run_code()
+        self._runner_controller.run_code(in_process, profile)
 
     def open_visualiser(self):
         self._editor_page.open_visualiser()
@@ -1,8 +1,10 @@
 import enum
+import math
 
 from esolang_IDE.code_runner import CodeRunner, RunnerThread
 from esolang_IDE.code_text import CodeText
 from esolang_IDE.filetypes import FileTypes
+from esolang_IDE import runner_metrics
 import esolang_IDE.interpreters as interpreters
 
 
@@ -19,6 +21,48 @@ class _RunnerStatus(enum.Enum):
         }[self]
 
 
+def _heat_ranges(profile: list[interpreters.LoopProfile], levels: int):
+    """Return the (position, chars, heat) ranges which colour each loop in `profile`
+    by the number of instructions run in it, on a log scale from 0 to `levels - 1`.
+    Loops which never ran are not coloured, and nested loops are coloured instead of
+    the loops containing them."""
+    max_ops = max((loop.ops for loop in profile), default=0)
+    if not max_ops:
+        return []
+
+    def heat(ops):
+        if not ops:
+            return None
+        level = math.ceil(levels * math.log1p(ops) / math.log1p(max_ops)) - 1
+        return min(max(level, 0), levels - 1)
+
+    ranges = []
+
+    def add_range(start, end, heat):
+        if heat is not None and end > start:
+            ranges.append((start, end - start, heat))
+
+    # Stack of [end, heat, start of the part not yet coloured] of the loops
+    # containing the current one
+    stack = []
+
+    def close_loops(position):
+        while stack and stack[-1][0] <= position:
+            end, loop_heat, uncoloured = stack.pop()
+            add_range(uncoloured, end, loop_heat)
+            if stack:
+                stack[-1][2] = end
+
+    for loop in sorted(profile, key=lambda loop: loop.location[0]):
+        start, chars = loop.location
+        close_loops(start)
+        if stack:
+            add_range(stack[-1][2], start, stack[-1][1])
+        stack.append([start + chars, heat(loop.ops), start])
+    close_loops(math.inf)
+    return ranges
+
+
 class RunnerController:
 
     def __init__(self, code_text: CodeText, code_runner: CodeRunner):
@@ -43,6 +87,10 @@ class RunnerController:
         self._runner_thread.continued.connect(self._runner_continued)
         self._runner_thread.interrupted.connect(self._runner_interrupted)
         self._runner_thread.error.connect(self._runner_error)
+        self._runner_thread.profiled.connect(self._runner_profiled)
+        self._runner_thread.metrics.connect(self._runner_metrics)
+
+        self._profile_table.loop_selected.connect(self._code_text.select_range)
 
         self._output_text.interrupt.connect(self.interrupt)
         self._output_text.completed.connect(self._output_completed)
@@ -50,6 +98,10 @@ class RunnerController:
     def _runner_started(self):
         self._input_text.restart()  # May not be necessary here
         self._output_text.clear()
+        self._code_text.remove_heatmap()
+        self._code_runner.set_metrics_message('')
+        if not self._runner_thread.profile_mode:
+            self._profile_table.hide()
         self._runner_continued()
 
     def _runner_paused(self):
@@ -88,11 +140,27 @@ class RunnerController:
                 message = 'Unmatched closing parentheses'
             elif error_type is interpreters.ErrorTypes.INVALID_TAPE_CELL:
                 message = 'Tape pointer out of bounds'
+            elif error_type is interpreters.ErrorTypes.INVALID_OUTPUT:
+                message = 'Output value is not a valid character'
             if error.location:
                 message = f'{message} at location {error.location}'
 
         self._error_message = message
 
+    def _runner_metrics(self, metrics):
+        metrics = metrics._replace(buffered_chars=self._output_text.buffered_chars())
+        self._code_runner.set_metrics_message(runner_metrics.format_metrics(metrics))
+        runner_metrics.log_metrics(metrics)
+
+    def _runner_profiled(self, profile):
+        self._code_text.show_heatmap(_heat_ranges(profile, self._code_text.heat_levels()))
+        loops = [
+            (*self._code_text.line_index(loop.location[0]), loop)
+            for loop in profile
+        ]
+        self._profile_table.set_profile(loops)
+        self._profile_table.show()
+
     def _output_completed(self):
         if self._error_message:
             self._code_runner.set_error_message(self._error_message)
@@ -100,7 +168,12 @@ class RunnerController:
         if self._status is _RunnerStatus.stopped:
             self._input_text.restart()
 
-    def run_code(self):
+    def run_code(self, in_process=False, profile=False):
+        """Run the code. If `in_process` is True, a newly started program is run
+        in a separate worker process. If `profile` is True, the iterations of each
+        loop of a newly started program are counted and shown as a heatmap."""
+        self._runner_thread.process_mode = in_process
+        self._runner_thread.profile_mode = profile
         self._runner_thread.run_called()
 
     def set_filetype(self, filetype: FileTypes):
@@ -120,3 +193,7 @@ class RunnerController:
     @property
     def _output_text(self):
         return self._code_runner.get_output_text()
+
+    @property
+    def _profile_table(self):
+        return self._code_runner.get_profile_table()
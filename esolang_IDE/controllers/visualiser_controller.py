@@ -1,6 +1,7 @@
+import sys
 from typing import Any, Callable, Optional
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from PyQt5 import QtCore, QtWidgets
 
@@ -28,13 +29,19 @@ TODO:
 @dataclass
 class ModelData:
 
-    output_text: str = ''
+    # Characters of the output, which the interpreter adds to and removes from the
+    # end of one at a time
+    output: list[str] = field(default_factory=list)
+    # Number of characters at the start of the output which have not changed since
+    # the view was last updated
+    output_unchanged: int = 0
     command_position: tuple[int, int] = (0, 0)  # (start_position, num_chars)
     status_message: str = ''
     visual_data: Any = None
 
     def reset(self):
-        self.output_text = ''
+        self.output.clear()
+        self.output_unchanged = 0
         self.command_position = (0, 0)
         self.status_message = ''
         self.visual_data = None
@@ -106,7 +113,7 @@ class VisualiserController:
         # Run the method corresponding to which putton was pressed.
         {
             ButtonType.run: self._pressed_run,
-            ButtonType.continue_: self._pressed_run,
+            ButtonType.continue_: self._pressed_continue,
             ButtonType.step: self._pressed_step,
             ButtonType.pause: self._pressed_pause,
             ButtonType.stop: self._pressed_stop,
@@ -121,11 +128,19 @@ class VisualiserController:
         self._code_text.visualisation_started()
         self._model.run()
 
+    def _pressed_continue(self):
+        self._commands_widget.display_running()
+
+        self._code_text.visualisation_started()
+        self._model.continue_(
+            self._code_text.breakpoint_ranges(), self._visualiser_widget.get_watchpoints()
+        )
+
     def _pressed_step(self):
         self._commands_widget.display_paused()
 
         self._code_text.visualisation_started()
-        self._model.step(1)
+        self._model.step(1, self._visualiser_widget.get_watchpoints())
 
     def _pressed_stop(self):
         self._commands_widget.display_stopped()
@@ -154,7 +169,7 @@ class VisualiserController:
         self._code_text.visualisation_started()
         steps = self._get_jump_steps()
         if steps:
-            self._model.step(steps)
+            self._model.step(steps, self._visualiser_widget.get_watchpoints())
 
     def _pressed_backwards(self):
         self._commands_widget.display_paused()
@@ -198,6 +213,8 @@ class VisualiserController:
                 message = 'Unmatched closing parentheses'
             elif error_type is interpreters.ErrorTypes.INVALID_TAPE_CELL:
                 message = 'Tape pointer out of bounds'
+            elif error_type is interpreters.ErrorTypes.INVALID_OUTPUT:
+                message = 'Output value is not a valid character'
 
         if message is None:
             raise error
@@ -239,13 +256,19 @@ class VisualiserController:
         self._visualiser_widget.reset_visual()
         self._visualiser_widget.update_visual()
 
+    def continue_finished(self):
+        """Called when running to a breakpoint stops without an error."""
+        if self._model.is_active():
+            self._commands_widget.display_paused()
+
     def get_visualiser(self):
         return self._visualiser
 
     def update_view(self):
         data = self._model.get_data()
         self._code_text.highlight_position(*data.command_position)
-        self._output_text.set_text(data.output_text)
+        self._output_text.show_output(data.output, data.output_unchanged)
+        data.output_unchanged = len(data.output)
         self._visualiser.show_status_message(data.status_message)
         self._visualiser_widget.configure_visual(data.visual_data)
         self._visualiser_widget.update_visual()
@@ -285,6 +308,15 @@ class VisualiserController:
 
 
 class Model:
+
+    # Number of steps jumped by each call to the interpreter, so that a long jump
+    # can be interrupted between calls
+    _JUMP_CHUNK_SIZE = 1_000_000
+    # Steps forward of at most this many are run one at a time rather than jumped,
+    # so that they are kept in the interpreter's history (which `jump` clears) and
+    # stepping back over them doesn't replay from a checkpoint
+    _MAX_SINGLE_STEPS = 100
+
     def __init__(self, controller: VisualiserController):
         self._controller = controller
 
@@ -303,11 +335,89 @@ class Model:
         self._run_steps = 0
 
         self._session_active = False
+        # Whether the worker is running to a breakpoint
+        self._continuing = False
 
-    def step(self, steps):
+    def step(self, steps, watchpoints: list[interpreters.Watchpoint] = ()):
+        """Run `steps` steps, or go back if `steps` is negative. Running forwards
+        stops early if a watchpoint is triggered."""
         assert isinstance(steps, int)
         assert steps != 0
 
+        if not self._start_session():
+            return
+
+        interpreter = self._interpreter
+        worker = self._worker
+        if not interpreter.supports_watchpoints:
+            watchpoints = ()
+        # Set before the worker starts, since it may replace the message
+        self._data.status_message = 'During execution'
+
+        def stop_at(position, reached):
+            if reached is not None:
+                self._data.status_message = f'Stopped when {reached.describe()}'
+                worker.stop()
+            return position
+
+        if 0 < steps <= self._MAX_SINGLE_STEPS:
+            if watchpoints:
+                fn = lambda: stop_at(*interpreter.watch_step(watchpoints))
+            else:
+                fn = interpreter.step
+            worker.start(fn=fn, iters=steps)
+        elif steps > 0:
+            chunks = [self._JUMP_CHUNK_SIZE] * (steps // self._JUMP_CHUNK_SIZE)
+            if steps % self._JUMP_CHUNK_SIZE:
+                chunks.append(steps % self._JUMP_CHUNK_SIZE)
+            chunk_iter = iter(chunks)
+            if watchpoints:
+                fn = lambda: stop_at(
+                    *interpreter.run_to_breakpoint((), next(chunk_iter), watchpoints)
+                )
+            else:
+                fn = lambda: interpreter.jump(next(chunk_iter))
+            worker.start(fn=fn, iters=len(chunks))
+        else:
+            # Rewinding many steps at once can replay from a checkpoint (see
+            # `BrainfuckInterpreter.rewind`) instead of undoing them one at a time
+            worker.start(fn=lambda: interpreter.rewind(-steps), iters=1)
+
+    def continue_(
+        self,
+        breakpoints: list[tuple[int, int]],
+        watchpoints: list[interpreters.Watchpoint] = (),
+    ):
+        """Run as fast as possible without updating the view, until a breakpoint
+        is reached or a watchpoint is triggered, or the program needs input,
+        raises an error or ends."""
+        if not self._start_session():
+            return
+
+        interpreter = self._interpreter
+        worker = self._worker
+        if not interpreter.supports_watchpoints:
+            watchpoints = ()
+
+        def run_chunk():
+            position, reached = interpreter.run_to_breakpoint(
+                breakpoints, self._JUMP_CHUNK_SIZE, watchpoints
+            )
+            if reached is not None:
+                if isinstance(reached, interpreters.Watchpoint):
+                    self._data.status_message = f'Stopped when {reached.describe()}'
+                else:
+                    self._data.status_message = 'Stopped at breakpoint'
+                worker.stop()
+            return position
+
+        self._continuing = True
+        self._data.status_message = 'During execution'
+        self._worker.start(fn=run_chunk, iters=sys.maxsize)
+
+    def _start_session(self) -> bool:
+        """Start the interpreter if the visualiser is not already active, and
+        return whether it is active."""
         if not self._session_active:
             self._data.reset()
             self._controller.reset_visualiser()
@@ -316,17 +426,10 @@ class Model:
                 self.restart_interpreter()
             except interpreters.ProgramSyntaxError as e:
                 self._worker_error(e)
-                return
+                return False
             else:
                 self._session_active = True
-
-        if steps > 0:
-            fn = self._interpreter.step
-        else:
-            fn = self._interpreter.back
-
-        self._worker.start(fn=fn, iters=abs(steps))
-        self._data.status_message = 'During execution'
+        return True
 
     def run(self):
         self._run_timer.start()
@@ -334,6 +437,8 @@ class Model:
 
     def pause(self):
         self._run_timer.stop()
+        # Interrupt running to a breakpoint
+        self._worker.stop()
 
     def stop(self):
         self._data.status_message = 'Visualiser not currently active'
@@ -365,6 +470,7 @@ class Model:
             input_func=self._controller.next_input,
             undo_input_func=self._controller.undo_input,
             output_func=self._output_func,
+            truncate_output_func=self._truncate_output,
         )
 
     def set_interpreter_type(self, interpreter_type: type[interpreters.BaseInterpreter]):
@@ -379,12 +485,20 @@ class Model:
 
         self._controller.update_view()
 
+        if self._continuing:
+            self._continuing = False
+            self._controller.continue_finished()
+
     def _worker_error(self, error: interpreters.InterpreterError):
         self._controller.handle_interpreter_error(error)
         self._run_timer.stop()
 
-    def _output_func(self, output: str):
-        self._data.output_text = output
+    def _output_func(self, text: str):
+        self._data.output.extend(text)
+
+    def _truncate_output(self, length: int):
+        del self._data.output[length:]
+        self._data.output_unchanged = min(self._data.output_unchanged, length)
 
     def get_data(self) -> ModelData:
         return self._data
@@ -1,9 +1,22 @@
+"""
+Registry of the languages supported by the IDE.
+
+Each language declares the classes that it uses as entry points of the form
+`'module:attribute'`, which are only imported the first time that they are needed
+(which is when a file of that type is opened), so adding a language does not slow
+down startup.
+"""
+
 import enum
+from typing import TYPE_CHECKING, NamedTuple
+
+from esolang_IDE.lazy_import import resolve
 
-import esolang_IDE.visualisers as visualisers
-import esolang_IDE.interpreters as interpreters
-import esolang_IDE.input_decoders as input_decoders
-import esolang_IDE.lexers as lexers
+if TYPE_CHECKING:
+    import esolang_IDE.input_decoders as input_decoders
+    import esolang_IDE.interpreters as interpreters
+    import esolang_IDE.lexers as lexers
+    import esolang_IDE.visualisers as visualisers
 
 
 class FileTypes(enum.Enum):
@@ -12,40 +25,72 @@ class FileTypes(enum.Enum):
     BRAINFUCK = enum.auto()
     PYTHON = enum.auto()
 
-    def to_visualiser(self) -> type[visualisers.BaseVisualiserWidget]:
-        return {
-            FileTypes.NONE: visualisers.NoVisualiserWidget,
-            FileTypes.BRAINFUCK: visualisers.BrainfuckVisualiserWidget,
-        }.get(self, visualisers.NoVisualiserWidget)
-
-    def to_interpreter(self) -> type[interpreters.BaseInterpreter]:
-        return {
-            FileTypes.NONE: interpreters.BaseInterpreter,
-            FileTypes.BRAINFUCK: interpreters.BrainfuckInterpreter,
-        }.get(self, interpreters.BaseInterpreter)
-
-    def to_runner_interpreter(self) -> type[interpreters.BaseInterpreter]:
-        return {
-            FileTypes.NONE: interpreters.BaseInterpreter,
-            FileTypes.BRAINFUCK: interpreters.FastBrainfuckInterpreter,
-        }.get(self, interpreters.BaseInterpreter)
-
-    def to_input_decoder(self) -> type[input_decoders.BaseDecoder]:
-        return {
-            FileTypes.NONE: input_decoders.BaseDecoder,
-            FileTypes.BRAINFUCK: input_decoders.BrainfuckDecoder,
-        }.get(self, input_decoders.BaseDecoder)
-
-    def to_lexer(self) -> type[lexers.LanguageLexer]:
-        return {
-            FileTypes.NONE: lexers.NoneLexer,
-            FileTypes.BRAINFUCK: lexers.BrainfuckLexer,
-        }.get(self, lexers.NoneLexer)
+    def to_visualiser(self) -> 'type[visualisers.BaseVisualiserWidget]':
+        return resolve(self.language.visualiser)
+
+    def to_interpreter(self) -> 'type[interpreters.BaseInterpreter]':
+        return resolve(self.language.interpreter)
+
+    def to_runner_interpreter(self) -> 'type[interpreters.BaseInterpreter]':
+        return resolve(self.language.runner_interpreter)
+
+    def to_input_decoder(self) -> 'type[input_decoders.BaseDecoder]':
+        return resolve(self.language.input_decoder)
+
+    def to_lexer(self) -> 'type[lexers.LanguageLexer]':
+        return resolve(self.language.lexer)
+
+    @property
+    def language(self) -> 'Language':
+        return _languages.get(self, _DEFAULT_LANGUAGE)
 
     @classmethod
     def from_extension(cls, extension):
-        return {
-            '.txt': cls.TEXT,
-            '.b': cls.BRAINFUCK,
-            '.py': cls.PYTHON,
-        }.get(extension, cls.NONE)
+        return _extensions.get(extension, cls.NONE)
+
+
+class Language(NamedTuple):
+    """Entry points of the classes used for a language.
+
+    Attributes:
+        interpreter -- Interpreter used by the visualiser.
+        runner_interpreter -- Interpreter used by the code runner.
+        input_decoder -- Decoder of the input text.
+        lexer -- Lexer used to highlight the source code.
+        visualiser -- Widget which visualises the state of the interpreter."""
+
+    interpreter: str = 'esolang_IDE.interpreters.base_interpreter:BaseInterpreter'
+    runner_interpreter: str = 'esolang_IDE.interpreters.base_interpreter:BaseInterpreter'
+    input_decoder: str = 'esolang_IDE.input_decoders.base_decoder:BaseDecoder'
+    lexer: str = 'esolang_IDE.lexers:NoneLexer'
+    visualiser: str = (
+        'esolang_IDE.visualisers.visualiser_widgets.base_visualiser_widget:NoVisualiserWidget'
+    )
+
+
+_DEFAULT_LANGUAGE = Language()
+_languages: dict[FileTypes, Language] = {}
+_extensions: dict[str, FileTypes] = {}
+
+
+def register_language(filetype: FileTypes, language: Language, extensions=()):
+    """Use `language` for files of type `filetype`, and open files with any of
+    `extensions` as that type."""
+    _languages[filetype] = language
+    for extension in extensions:
+        _extensions[extension] = filetype
+
+
+register_language(FileTypes.TEXT, _DEFAULT_LANGUAGE, ['.txt'])
+register_language(FileTypes.PYTHON, _DEFAULT_LANGUAGE, ['.py'])
+register_language(
+    FileTypes.BRAINFUCK,
+    Language(
+        interpreter='esolang_IDE.interpreters.brainfuck:BrainfuckInterpreter',
+        runner_interpreter='esolang_IDE.interpreters.brainfuck:CompiledBrainfuckInterpreter',
+        input_decoder='esolang_IDE.input_decoders.brainfuck_decoder:BrainfuckDecoder',
+        lexer='esolang_IDE.lexers:BrainfuckLexer',
+        visualiser='esolang_IDE.visualisers.visualiser_widgets.brainfuck:BrainfuckVisualiserWidget',
+    ),
+    ['.b'],
+)
@@ -1,2 +1,10 @@
+from esolang_IDE.lazy_import import lazy_exports
+
 from .base_decoder import BaseDecoder
-from .brainfuck_decoder import BrainfuckDecoder
\ No newline at end of file
+
+__getattr__ = lazy_exports(
+    __name__,
+    {
+        'BrainfuckDecoder': '.brainfuck_decoder',
+    },
+)
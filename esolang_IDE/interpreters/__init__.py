@@ -1,3 +1,5 @@
+from esolang_IDE.lazy_import import lazy_exports
+
 from .errors import (
     ErrorTypes,
     ExecutionEndedError,
@@ -9,5 +11,26 @@ from .errors import (
     ProgramSyntaxError,
 )
 
-from .brainfuck import BrainfuckInterpreter, FastBrainfuckInterpreter
-from .base_interpreter import BaseInterpreter, VisualiserInterpreter
\ No newline at end of file
+from .base_interpreter import (
+    BaseInterpreter,
+    InterpreterStats,
+    LoopProfile,
+    RunStatus,
+    VisualiserInterpreter,
+    Watchpoint,
+    process_rss_kb,
+)
+
+# The interpreters for each language are only imported when they are first used, as
+# is `process_interpreter`, which imports `multiprocessing`
+__getattr__ = lazy_exports(
+    __name__,
+    {
+        'BrainfuckInterpreter': '.brainfuck',
+        'CompiledBrainfuckInterpreter': '.brainfuck',
+        'FastBrainfuckInterpreter': '.brainfuck',
+        'TapeVisual': '.brainfuck',
+        'ProcessInterpreter': '.process_interpreter',
+        'process_interpreter_type': '.process_interpreter',
+    },
+)
@@ -1,7 +1,110 @@
-from typing import Callable, Optional
+import enum
+import os
+import sys
+import time
+from typing import Callable, NamedTuple, Optional, Sequence, Union
+
+from .errors import ExecutionEndedError, NoInputError, ProgramRuntimeError
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+class RunStatus(enum.Enum):
+    """Reason that `BaseInterpreter.run_for` or `BaseInterpreter.run_until` returned."""
+
+    BUDGET_EXHAUSTED = enum.auto()
+    NEEDS_INPUT = enum.auto()
+    ENDED = enum.auto()
+    ERROR = enum.auto()
+
+
+class LoopProfile(NamedTuple):
+    """Execution counts of a loop in the program.
+
+    Attributes:
+        location -- (start_position, num_chars) of the loop in the source code.
+        iterations -- Number of times that the body of the loop was run.
+        ops -- Number of source instructions run by the iterations of the loop,
+            including its `]` and the first `[` of each loop directly inside it, but
+            not the other instructions of nested loops. Adding up the loops counts
+            every instruction run except those outside any loop (including the
+            first `[` of each loop)."""
+
+    location: tuple[int, int]
+    iterations: int
+    ops: int
+
+
+class Watchpoint(NamedTuple):
+    """Condition on a tape cell which stops `VisualiserInterpreter.run_to_breakpoint`.
+
+    Attributes:
+        cell -- Index of the cell, relative to the cell that the program starts on.
+        value -- Stop when a command sets the cell to this value, or if None, stop
+            when a command changes the value of the cell."""
+
+    cell: int
+    value: Optional[int] = None
+
+    def triggered(self, old: int, new: int) -> bool:
+        """Return whether a command which changed the cell from `old` to `new`
+        triggers the watchpoint."""
+        if self.value is None:
+            return new != old
+        return new == self.value != old
+
+    def describe(self) -> str:
+        if self.value is None:
+            return f'cell {self.cell} changes'
+        return f'cell {self.cell} == {self.value}'
+
+
+class InterpreterStats(NamedTuple):
+    """Counters of a running program.
+
+    Attributes:
+        instructions -- Number of instructions run, as counted by the interpreter.
+        tape_cells -- Number of cells allocated on the tape.
+        rss_kb -- Resident memory of the process running the program in kilobytes,
+            or None if it is not known."""
+
+    instructions: int = 0
+    tape_cells: int = 0
+    rss_kb: Optional[int] = None
+
+
+def process_rss_kb(pid: Optional[int] = None) -> Optional[int]:
+    """Return the resident memory in kilobytes of the process `pid` (by default the
+    current process), or None if it is not known. Where the current memory cannot be
+    read, the peak memory of the current process is returned instead."""
+    try:
+        with open(f'/proc/{pid or "self"}/statm') as file:
+            pages = int(file.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if pid is not None and pid != os.getpid() or resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak // 1024 if sys.platform == 'darwin' else peak
 
 
 class BaseInterpreter:
+
+    # Whether the interpreter takes a `profile` argument, and counts the iterations
+    # of each loop when it is true
+    supports_profiling = False
+
+    # Number of instructions run so far (see `stats`)
+    instruction_count = 0
+
+    # Number of instructions run between checks of the deadline in `run_until`
+    _DEADLINE_CHECK_INTERVAL = 5000
+
     def __init__(
         self,
         code: str,
@@ -18,7 +121,112 @@ class BaseInterpreter:
     def step(self) -> tuple[int, int]:
         pass
 
+    def run_for(self, max_instructions: int) -> RunStatus:
+        """Run `max_instructions` instructions and return why execution stopped.
+        (Interpreters which count instructions in batches can run a few more.) If the
+        status is `RunStatus.ERROR`, the `ProgramRuntimeError` is stored in
+        `self.error`."""
+        try:
+            for _ in range(max_instructions):
+                self.step()
+        except NoInputError:
+            return RunStatus.NEEDS_INPUT
+        except ExecutionEndedError:
+            return RunStatus.ENDED
+        except ProgramRuntimeError as error:
+            self.error = error
+            return RunStatus.ERROR
+        return RunStatus.BUDGET_EXHAUSTED
+
+    def run_until(self, deadline: float) -> RunStatus:
+        """Run until `time.monotonic()` reaches `deadline` and return why execution
+        stopped (see `run_for`)."""
+        while time.monotonic() < deadline:
+            status = self.run_for(self._DEADLINE_CHECK_INTERVAL)
+            if status is not RunStatus.BUDGET_EXHAUSTED:
+                return status
+        return RunStatus.BUDGET_EXHAUSTED
+
+    def stats(self) -> InterpreterStats:
+        """Return the counters of the program so far."""
+        return InterpreterStats(self.instruction_count, 0, process_rss_kb())
+
+    def loop_profile(self) -> Optional[list[LoopProfile]]:
+        """Return the execution counts of every loop in the program so far, or None
+        if the interpreter is not profiling."""
+        return None
+
+    def flush_output(self):
+        """Pass any buffered output to `output_func`"""
+        pass
+
+    def pause(self):
+        """Called when the program stops being run for a while, before `run_for` is
+        called again"""
+        pass
+
+    def close(self):
+        """Release any resources held by the interpreter"""
+        pass
+
+
+def _find_breakpoint(breakpoints, position):
+    for index, (start, chars) in enumerate(breakpoints):
+        if start <= position < start + chars:
+            return index
+    return None
+
 
 class VisualiserInterpreter(BaseInterpreter):
+
+    # Whether `run_to_breakpoint` checks watchpoints
+    supports_watchpoints = False
+
     def back(self) -> tuple[int, int]:
         pass
+
+    def last_position(self) -> Optional[tuple[int, int]]:
+        """Return the position of the last command run, or None if no command has
+        been run."""
+        return None
+
+    def watch_step(
+        self, watchpoints: Sequence[Watchpoint]
+    ) -> tuple[tuple[int, int], Optional[Watchpoint]]:
+        """Run one step like `step`, and return its position and the first of the
+        `watchpoints` that its command triggered (if they are supported), or None."""
+        return self.step(), None
+
+    def jump(self, steps: int) -> tuple[int, int]:
+        """Run `steps` steps and return the position of the last command run."""
+        position = None
+        for _ in range(steps):
+            position = self.step()
+        return position
+
+    def run_to_breakpoint(
+        self,
+        breakpoints: Sequence[tuple[int, int]],
+        steps: int,
+        watchpoints: Sequence[Watchpoint] = (),
+    ) -> tuple[tuple[int, int], Union[tuple[int, int], Watchpoint, None]]:
+        """Run at most `steps` steps, stopping once a command in one of the
+        (position, chars) `breakpoints` is run after a command outside that
+        breakpoint, or once a command triggers one of the `watchpoints` (if they
+        are supported). Return the position of the last command run, and the
+        breakpoint or watchpoint that was reached, or None."""
+        position = self.last_position()
+        region = None if position is None else _find_breakpoint(breakpoints, position[0])
+        for _ in range(steps):
+            position = self.step()
+            last_region, region = region, _find_breakpoint(breakpoints, position[0])
+            if region is not None and region != last_region:
+                return position, breakpoints[region]
+        return position, None
+
+    def rewind(self, steps: int) -> tuple[int, int]:
+        """Go back `steps` steps and return the position of the current command."""
+        position = None
+        for _ in range(steps):
+            position = self.back()
+        return position
@@ -1,7 +1,21 @@
 import functools
+import sys
 from collections import deque
-
-from .base_interpreter import BaseInterpreter, VisualiserInterpreter
+from typing import NamedTuple, Optional, Sequence, Set
+
+from . import brainfuck_codegen, brainfuck_ir, brainfuck_jump, tape
+from .history import Checkpoint, Checkpoints, History
+from .output_buffer import OutputBuffer
+from .program_cache import program_cache
+from .base_interpreter import (
+    BaseInterpreter,
+    InterpreterStats,
+    LoopProfile,
+    RunStatus,
+    VisualiserInterpreter,
+    process_rss_kb,
+)
+from .brainfuck_ir import Op
 from .errors import (
     ErrorTypes,
     ExecutionEndedError,
@@ -12,8 +26,130 @@ from .errors import (
 )
 
 
+class TapeVisual(NamedTuple):
+    """Information for the visualiser of a Brainfuck program.
+
+    It is a snapshot which is not changed as the interpreter runs, so it can be read
+    by another thread while the interpreter runs in the background.
+
+    Attributes:
+        tape -- Read only copy of the cells of the tape.
+        tape_pointer -- Index of the current cell in `tape`.
+        changed_cells -- Indices in `tape` of the cells changed since the last
+            `TapeVisual`, or None if any of them may have changed.
+        version -- Number which is increased each time the tape or the tape pointer
+            changes, so a `TapeVisual` with the same version can be ignored."""
+
+    tape: Sequence[int]
+    tape_pointer: int
+    changed_cells: Optional[Set[int]]
+    version: int
+
+    @property
+    def max_value(self) -> int:
+        """Largest value that a cell can hold."""
+        return (1 << 8 * getattr(self.tape, 'itemsize', 1)) - 1
+
+
+class _BudgetExhausted(Exception):
+    """Raised by `FastBrainfuckInterpreter.close_loop` when the budget of `run_for`
+    has been used up."""
+
+
+def _to_char(value):
+    """Return the character with code point `value`. Raise `ProgramRuntimeError` if
+    there is no such character (which is only possible with 32 bit cells)."""
+    try:
+        return chr(value)
+    except (ValueError, OverflowError):
+        raise ProgramRuntimeError(ErrorTypes.INVALID_OUTPUT, message=f'value: {value}')
+
+
+def _parse(code):
+    """Return the optimised instructions for `code`, their loop table and their
+    `brainfuck_ir.StepCosts`."""
+    instructions = brainfuck_ir.parse_optimised(code)
+    return (
+        instructions,
+        brainfuck_ir.match_loops(instructions),
+        brainfuck_ir.step_costs(code, instructions),
+    )
+
+
+def _parse_cached(code):
+    return program_cache.get(code, 'ir', _parse)
+
+
+def _compile_cached(code, cell_bits, profile=False):
+    def compile_program(code):
+        instructions, _, costs = _parse_cached(code)
+        return brainfuck_codegen.compile_program(
+            instructions, costs, cell_bits=cell_bits, profile=profile
+        )
+
+    return program_cache.get(code, ('compiled', cell_bits, profile), compile_program)
+
+
+def _count_commands(code, start, end):
+    return sum(code.count(command, start, end) for command in '+-<>,.[]')
+
+
+def _loop_table(code):
+    """Return a list of the location of each loop in the program (in the order of
+    `brainfuck_ir.loop_starts`) and the number of source instructions run by each
+    iteration of it (see `LoopProfile`)."""
+    locations = brainfuck_ir.loop_locations(_parse_cached(code)[0])
+    # Steps of a loop after its first `[`, which is counted by the code around it
+    totals = [_count_commands(code, start, start + length) - 1 for start, length in locations]
+    ops = list(totals)
+    # The loops are in order of their starts, so the stack holds the loops which
+    # contain the current one
+    stack = []
+    for i, (start, _) in enumerate(locations):
+        while stack and start >= sum(locations[stack[-1]]):
+            stack.pop()
+        if stack:
+            ops[stack[-1]] -= totals[i]
+        stack.append(i)
+    return list(zip(locations, ops))
+
+
+def _loop_table_cached(code):
+    return program_cache.get(code, 'loops', _loop_table)
+
+
+def _run_to_end(interpreter):
+    """Run `interpreter` until the program ends.
+    Raise `NoInputError` or `ProgramRuntimeError` if it stops before then."""
+    while True:
+        status = interpreter.run_for(100_000)
+        if status is RunStatus.ENDED:
+            return
+        if status is RunStatus.NEEDS_INPUT:
+            raise NoInputError()
+        if status is RunStatus.ERROR:
+            raise interpreter.error
+
+
 class BrainfuckInterpreter(VisualiserInterpreter):
-    """Brainfuck interpreter."""
+    """Brainfuck interpreter which can step backwards to any earlier step.
+
+    The last `maxlen` steps are undone one at a time (see `History`). Going back
+    further restores the nearest earlier checkpoint (see `Checkpoints`) and runs
+    forwards again, reading the input that was read the first time.
+
+    `jump` and `run_to_breakpoint` run many steps at once with the `brainfuck_jump`
+    engine. The steps that they run are not added to the history, so going back over
+    them replays them."""
+
+    # The visualiser displays every allocated cell, so grow the tape a row at a time
+    _TAPE_CHUNK_SIZE = 100
+
+    # Number of steps at the end of a replay which are run one at a time, so that
+    # they can be undone without replaying again
+    _REPLAY_STEPS = 10_000
+
+    supports_watchpoints = True
 
     def __init__(
         self,
@@ -22,18 +158,52 @@ class BrainfuckInterpreter(VisualiserInterpreter):
         output_func=print,
         undo_input_func=None,
         maxlen=1_000_000,
+        cell_bits=8,
+        max_cells=tape.DEFAULT_MAX_CELLS,
+        bidirectional=False,
+        truncate_output_func=None,
     ):
         self.code = code
         self.input_func = input_func
+        # Called with the text added to the output, and with the new length of the
+        # output when steps which added to it are undone
         self.output_func = output_func
+        self.truncate_output_func = truncate_output_func
         self.undo_input_func = undo_input_func
-        self.brackets = self.match_brackets(code)
-        self.tape = [0]
+        self.brackets = program_cache.get(code, 'brackets', self.match_brackets)
+        self.memory = tape.Tape(
+            cell_bits,
+            chunk_size=self._TAPE_CHUNK_SIZE,
+            max_cells=max_cells,
+            bidirectional=bidirectional,
+        )
+        self.tape = self.memory.cells
+        self.mask = self.memory.mask
+        self._tape_end = len(self.tape)
+        # Indices of the cells changed since the last call to `get_visual`, and
+        # whether any cell may have changed
+        self._changed_cells = set()
+        self._all_cells_changed = False
+        # Last `TapeVisual`, which is returned again if nothing has changed
+        self._visual = None
         self.tape_pointer = 0
         self.code_pointer = -1
-        self.output = ''
+        # Characters of the output, so that adding or removing one doesn't copy the
+        # rest of them (see `output`)
+        self._output = []
         self.instruction_count = 0
-        self.past = deque(maxlen=maxlen)
+        self.past = History(maxlen, cell_bits)
+        self.checkpoints = Checkpoints()
+        # Every input character read so far, which is read again when replaying
+        self._inputs = []
+        # Position of the last command run, which is the same as the code pointer
+        # unless it was a bracket that jumped. (Going back only restores the code
+        # pointer, so a bracket which jumped is taken to be the bracket jumped to.)
+        self._last_command = -1
+        self._jump_program = None
+        # Breakpoints of the last call to `run_to_breakpoint` and whether it had
+        # watchpoints, and the program for them
+        self._breakpoint_program = None
         self.commands = {
             '[': self.open_loop,
             ']': self.close_loop,
@@ -49,13 +219,15 @@ class BrainfuckInterpreter(VisualiserInterpreter):
         if self.code_pointer + 1 >= len(self.code):
             raise ExecutionEndedError
 
+        if self.instruction_count >= self.checkpoints.next_step:
+            self._add_checkpoint()
+
+        # The tape pointer is stored relative to cell 0 in case the tape grows left
         self.past.append(
-            (
-                self.code_pointer,
-                self.tape_pointer,
-                self.tape[self.tape_pointer],
-                len(self.output),
-            )
+            self.code_pointer,
+            self.tape_pointer - self.memory.origin,
+            self.tape[self.tape_pointer],
+            len(self._output),
         )
 
         self.code_pointer += 1
@@ -74,29 +246,185 @@ class BrainfuckInterpreter(VisualiserInterpreter):
         # the instruction count without incementing it in the first place.
 
         self.commands[self.current_instruction]()
+        self._last_command = code_pointer
 
         return code_pointer, 1
 
+    def watch_step(self, watchpoints):
+        # Only the cell under the tape pointer can change, and its index is kept
+        # relative to cell 0 in case the step grows the tape to the left
+        cell = self.tape_pointer - self.memory.origin
+        old = self.tape[self.tape_pointer]
+        position = self.step()
+        new = self.tape[cell + self.memory.origin]
+        reached = next((w for w in watchpoints if w.cell == cell and w.triggered(old, new)), None)
+        return position, reached
+
     def back(self):
         try:
             prev_info = self.past.pop()
         except IndexError:
+            # The step is older than the history, so replay from a checkpoint
+            if self.instruction_count:
+                return self.rewind(1)
             raise NoPreviousExecutionError
         assert (
             self.instruction_count != 0
         ), f'prev_info not empty but instruction count = {self.instruction_count}'
 
-        if self.current_instruction == ',' and self.undo_input_func is not None:
-            self.undo_input_func()
+        if self.current_instruction == ',':
+            self._inputs.pop()
+            if self.undo_input_func is not None:
+                self.undo_input_func()
 
-        self.code_pointer, self.tape_pointer, tape_val, output_len = prev_info
+        self.code_pointer, tape_pointer, tape_val, output_len = prev_info
+        self.tape_pointer = tape_pointer + self.memory.origin
 
-        if output_len != len(self.output):
-            self.output = self.output[:-1]
-            self.output_func(self.output)
+        if output_len != len(self._output):
+            self._output.pop()
+            if self.truncate_output_func:
+                self.truncate_output_func(output_len)
         self.tape[self.tape_pointer] = tape_val
+        self._changed_cells.add(self.tape_pointer)
+        self._last_command = self.code_pointer
         self.instruction_count -= 1
-        return (self.code_pointer, 1) if self.code_pointer >= 0 else (0, 0)
+        if self.instruction_count < self.checkpoints.next_step - self.checkpoints.interval:
+            self.checkpoints.discard_after(self.instruction_count)
+        return self._position()
+
+    def rewind(self, steps):
+        """Go back `steps` steps, or to the start if there have been fewer steps."""
+        if not self.instruction_count:
+            raise NoPreviousExecutionError
+        if steps <= len(self.past):
+            for _ in range(steps):
+                self.back()
+            return self._position()
+
+        target = max(self.instruction_count - steps, 0)
+        inputs = self._inputs
+        output_length = len(self._output)
+        self._restore_checkpoint(self.checkpoints.find(target))
+
+        # Replay the steps up to the target with the same input
+        input_func, output_func = self.input_func, self.output_func
+        self.input_func = lambda: inputs[len(self._inputs)]
+        self.output_func = None
+        try:
+            self.jump(max(target - self._REPLAY_STEPS - self.instruction_count, 0))
+            while self.instruction_count < target:
+                self.step()
+        finally:
+            self.input_func, self.output_func = input_func, output_func
+
+        if self.undo_input_func is not None:
+            for _ in range(len(inputs) - len(self._inputs)):
+                self.undo_input_func()
+        if self.truncate_output_func and len(self._output) != output_length:
+            self.truncate_output_func(len(self._output))
+        return self._position()
+
+    def jump(self, steps):
+        """Run `steps` steps, with the same result as calling `step` that many times
+        but much faster, and return the position of the last command run."""
+        if self._jump_program is None:
+            self._jump_program = program_cache.get(
+                self.code, 'jump', brainfuck_jump.JumpProgram
+            )
+        self._run_jump_program(self._jump_program, steps)
+        return self._position()
+
+    def run_to_breakpoint(self, breakpoints, steps, watchpoints=()):
+        key = (tuple(breakpoints), bool(watchpoints))
+        if self._breakpoint_program is None or self._breakpoint_program[0] != key:
+            program = brainfuck_jump.JumpProgram(self.code, breakpoints, watch=bool(watchpoints))
+            self._breakpoint_program = (key, program)
+        reached = self._run_jump_program(self._breakpoint_program[1], steps, watchpoints)
+        return self._position(), reached
+
+    def _run_jump_program(self, program, steps, watchpoints=()):
+        """Run `steps` steps of `program`, and return the breakpoint or watchpoint
+        that it stopped at, or None."""
+        target = self.instruction_count + steps
+        output_length = len(self._output)
+        try:
+            while self.instruction_count < target:
+                if self.instruction_count >= self.checkpoints.next_step:
+                    self._add_checkpoint()
+                # A loop run in one go can pass the next checkpoint, which is then
+                # taken a little late
+                result = program.run(
+                    self.memory,
+                    self.tape_pointer,
+                    self.code_pointer,
+                    min(target, self.checkpoints.next_step) - self.instruction_count,
+                    self._read_input,
+                    self._output.append,
+                    self._last_command,
+                    watchpoints,
+                    max_steps=target - self.instruction_count,
+                )
+                if result.steps:
+                    self._all_cells_changed = True
+                    self.past.clear()
+                    self.instruction_count += result.steps
+                    self.tape_pointer = result.tape_pointer
+                    self.code_pointer = result.code_pointer
+                    self._last_command = result.last_command
+                    self._tape_end = len(self.tape)
+                if result.watchpoint:
+                    return result.watchpoint
+                if result.breakpoint:
+                    # Stop on the first command in the breakpoint, unless it
+                    # triggers a watchpoint
+                    _, reached = self.watch_step(watchpoints)
+                    return reached or result.breakpoint
+                if not result.finished:
+                    # Let `step` raise any error
+                    _, reached = self.watch_step(watchpoints)
+                    if reached:
+                        return reached
+        finally:
+            if self.output_func and len(self._output) != output_length:
+                self.output_func(''.join(self._output[output_length:]))
+        return None
+
+    def _read_input(self):
+        input_ = self.input_func()
+        if input_:
+            self._inputs.append(input_)
+        return input_
+
+    def last_position(self):
+        return (self._last_command, 1) if self._last_command >= 0 else None
+
+    def _position(self):
+        return self.last_position() or (0, 0)
+
+    def _add_checkpoint(self):
+        self.checkpoints.add(
+            Checkpoint(
+                self.instruction_count,
+                self.code_pointer,
+                self.tape_pointer - self.memory.origin,
+                self.memory.snapshot(),
+                len(self._output),
+                len(self._inputs),
+            )
+        )
+
+    def _restore_checkpoint(self, checkpoint: Checkpoint):
+        self.checkpoints.discard_after(checkpoint.step)
+        self.past.clear()
+        self.memory.restore(checkpoint.tape)
+        self._all_cells_changed = True
+        self._tape_end = len(self.tape)
+        self.instruction_count = checkpoint.step
+        self.code_pointer = checkpoint.code_pointer
+        self._last_command = checkpoint.code_pointer
+        self.tape_pointer = checkpoint.tape_pointer + self.memory.origin
+        del self._output[checkpoint.output_length :]
+        self._inputs = self._inputs[: checkpoint.input_position]
 
     def run(self):
         while True:
@@ -106,6 +434,9 @@ class BrainfuckInterpreter(VisualiserInterpreter):
                 break
         return self.output
 
+    def stats(self):
+        return InterpreterStats(self.instruction_count, len(self.memory.cells), process_rss_kb())
+
     def open_loop(self):
         if self.current_cell == 0:
             self.code_pointer = self.brackets[self.code_pointer]
@@ -116,39 +447,83 @@ class BrainfuckInterpreter(VisualiserInterpreter):
 
     def increment_pointer(self):
         self.tape_pointer += 1
-        if self.tape_pointer >= len(self.tape):
-            self.tape.append(0)
+        if self.tape_pointer >= self._tape_end:
+            self._grow_tape()
 
     def decrement_pointer(self):
         self.tape_pointer -= 1
         if self.tape_pointer < 0:
-            error_location = self.code_pointer
+            self._grow_tape()
+
+    def _grow_tape(self):
+        origin = self.memory.origin
+        try:
+            self.tape_pointer = self.memory.grow(self.tape_pointer)
+        except ProgramRuntimeError as error:
+            error.location = (self.code_pointer, 1)
             self.back()  # Reset back to was it was before
-            raise ProgramRuntimeError(ErrorTypes.INVALID_TAPE_CELL, (error_location, 1))
+            raise
+        self._tape_end = len(self.tape)
+        if self.memory.origin != origin:
+            # Every cell moved along the tape
+            self._all_cells_changed = True
 
     def increment_cell(self):
-        self.tape[self.tape_pointer] = (self.tape[self.tape_pointer] + 1) % 256
+        self.tape[self.tape_pointer] = (self.tape[self.tape_pointer] + 1) & self.mask
+        self._changed_cells.add(self.tape_pointer)
 
     def decrement_cell(self):
-        self.tape[self.tape_pointer] = (self.tape[self.tape_pointer] - 1) % 256
+        self.tape[self.tape_pointer] = (self.tape[self.tape_pointer] - 1) & self.mask
+        self._changed_cells.add(self.tape_pointer)
 
     def accept_input(self):
         input_ = self.input_func()
         if input_:
-            self.tape[self.tape_pointer] = ord(input_) % 256
+            self.tape[self.tape_pointer] = ord(input_) & self.mask
+            self._changed_cells.add(self.tape_pointer)
+            self._inputs.append(input_)
         else:
             self.code_pointer = self.past.pop()[0]
             self.instruction_count -= 1
             raise NoInputError
 
     def add_output(self):
-        self.output += chr(self.current_cell)
+        try:
+            char = _to_char(self.current_cell)
+        except ProgramRuntimeError as error:
+            error.location = (self.code_pointer, 1)
+            self.back()  # Reset back to was it was before
+            raise
+        self._output.append(char)
         if self.output_func:
-            self.output_func(self.output)
+            self.output_func(char)
 
-    def get_visual(self):
-        """Information for visualiser"""
-        return self.tape, self.tape_pointer
+    @property
+    def output(self) -> str:
+        return ''.join(self._output)
+
+    def get_visual(self) -> TapeVisual:
+        """Information for visualiser. This should be called between steps."""
+        visual = self._visual
+        if (
+            visual is not None
+            and not self._all_cells_changed
+            and not self._changed_cells
+            and visual.tape_pointer == self.tape_pointer
+            and len(visual.tape) == len(self.tape)
+        ):
+            return visual
+
+        changed_cells = None if self._all_cells_changed else self._changed_cells
+        self._changed_cells = set()
+        self._all_cells_changed = False
+        self._visual = TapeVisual(
+            memoryview(self.tape[:]).toreadonly(),
+            self.tape_pointer,
+            changed_cells,
+            visual.version + 1 if visual is not None else 0,
+        )
+        return self._visual
 
     @property
     def current_cell(self):
@@ -178,130 +553,339 @@ class BrainfuckInterpreter(VisualiserInterpreter):
 
 
 class FastBrainfuckInterpreter(BaseInterpreter):
-    def __init__(self, code, input_func=input, output_func=None):
+
+    # Number of loop iterations between checks for buffered output that is due
+    _POLL_INTERVAL = 10000
+
+    def __init__(
+        self,
+        code,
+        input_func=input,
+        output_func=None,
+        cell_bits=8,
+        max_cells=tape.DEFAULT_MAX_CELLS,
+        bidirectional=False,
+    ):
         self.commands, self.brackets = self._compile(code)
         self.input_func = input_func
         self.output_func = output_func
-        self.tape = [0] * 40000
+        self.cell_bits = cell_bits
+        self.memory = tape.Tape(cell_bits, max_cells=max_cells, bidirectional=bidirectional)
+        self.tape = self.memory.cells
+        self.mask = self.memory.mask
 
         self.reset()
 
     def run(self):
-        self.running = True
-        while self.running:
-            # self.commands[self.command_pointer]()
-            # self.command_pointer += 1
-            self.step()
+        _run_to_end(self)
         return ''.join(self.output)
 
+    def run_for(self, max_instructions):
+        """Run the program until it has run at least `max_instructions` instructions.
+        (The budget is only checked at the end of each loop iteration.)"""
+        if self.finished:
+            return RunStatus.ENDED
+        commands = self.commands
+        self._budget = max_instructions
+        try:
+            while True:
+                commands[self.command_pointer]()
+                self.command_pointer += 1
+        except _BudgetExhausted:
+            self.command_pointer += 1
+        except ExecutionEndedError:
+            return RunStatus.ENDED
+        except NoInputError:
+            return RunStatus.NEEDS_INPUT
+        except ProgramRuntimeError as error:
+            self.flush_output()
+            self.error = error
+            return RunStatus.ERROR
+        finally:
+            self.instruction_count += max_instructions - self._budget
+        return RunStatus.BUDGET_EXHAUSTED
+
     def step(self):
+        """Run the next optimised instruction."""
         if self.finished:
             raise ExecutionEndedError()
-        self.commands[self.command_pointer]()
+        # Large enough that `close_loop` never runs out of it
+        self._budget = sys.maxsize
+        try:
+            self.commands[self.command_pointer]()
+        except ProgramRuntimeError:
+            self.flush_output()
+            raise
+        finally:
+            self.instruction_count += sys.maxsize - self._budget
         self.command_pointer += 1
 
-    def open_loop(self):
+    def stats(self):
+        return InterpreterStats(self.instruction_count, len(self.memory.cells), process_rss_kb())
+
+    def flush_output(self):
+        self._output_buffer.flush()
+
+    def open_loop(self, steps):
+        self._budget -= steps
         if self.current_cell == 0:
             self.command_pointer = self.brackets[self.command_pointer]
 
-    def close_loop(self):
+    def close_loop(self, steps):
+        self._budget -= steps
         if self.current_cell != 0:
             self.command_pointer = self.brackets[self.command_pointer]
+            self._poll_countdown -= 1
+            if not self._poll_countdown:
+                self._poll_countdown = self._POLL_INTERVAL
+                self._output_buffer.poll()
+            if self._budget <= 0:
+                raise _BudgetExhausted()
 
     def pointer_op(self, times):
         self.tape_pointer += times
-        if not 0 <= self.tape_pointer < 40000:
-            raise ProgramRuntimeError(
-                ErrorTypes.INVALID_TAPE_CELL, location=self.tape_pointer
-            )
-
-    def cell_op(self, times):
-        self.tape[self.tape_pointer] = (self.tape[self.tape_pointer] + times) % 256
-
-    def accept_input(self):
+        if not 0 <= self.tape_pointer < self._tape_end:
+            self.tape_pointer = self.memory.grow(self.tape_pointer)
+            self._tape_end = len(self.tape)
+
+    def ensure_op(self, low, high):
+        if self.tape_pointer + high >= self._tape_end:
+            self.memory.grow(self.tape_pointer + high)
+            self._tape_end = len(self.tape)
+        if self.tape_pointer + low < 0:
+            self.tape_pointer = self.memory.grow(self.tape_pointer + low) - low
+            self._tape_end = len(self.tape)
+
+    def cell_op(self, times, offset):
+        index = self.tape_pointer + offset
+        self.tape[index] = (self.tape[index] + times) & self.mask
+
+    def clear_cell(self, offset, steps):
+        index = self.tape_pointer + offset
+        # The loop that was collapsed runs once for each time it subtracts 1
+        self._budget -= self.tape[index] * steps
+        self.tape[index] = 0
+
+    def clear_cell_upwards(self, offset, steps):
+        index = self.tape_pointer + offset
+        # The loop that was collapsed runs once for each time it adds 1
+        self._budget -= (-self.tape[index] & self.mask) * steps
+        self.tape[index] = 0
+
+    def multiply_op(self, offset, factor):
+        value = self.tape[self.tape_pointer]
+        if value:
+            target = self.tape_pointer + offset
+            if not 0 <= target < self._tape_end:
+                new_target = self.memory.grow(target)
+                self.tape_pointer += new_target - target
+                self._tape_end = len(self.tape)
+                target = new_target
+            self.tape[target] = (self.tape[target] + value * factor) & self.mask
+
+    def scan_op(self, stride, steps):
+        if self.tape[self.tape_pointer]:
+            # Relative to cell 0 in case the tape grows to the left
+            start = self.tape_pointer - self.memory.origin
+            self.tape_pointer = self.memory.scan(self.tape_pointer, stride)
+            self._tape_end = len(self.tape)
+            self._budget -= (self.tape_pointer - self.memory.origin - start) // stride * steps
+
+    def accept_input(self, offset):
         input_ = self.input_func()
         if not input_:
+            self.flush_output()
             raise NoInputError(f'input: {input_}')
-        self.tape[self.tape_pointer] = ord(input_) % 256
+        self.tape[self.tape_pointer + offset] = ord(input_) & self.mask
 
-    def add_output(self):
-        self.output.append(chr(self.current_cell))
-        if self.output_func:
-            self.output_func(chr(self.current_cell))
+    def add_output(self, offset):
+        self._output_buffer.write(self.tape[self.tape_pointer + offset])
 
-    def stop(self):
-        self.running = False
+    def stop(self, steps):
+        self._budget -= steps
         self.finished = True
+        self.flush_output()
+        raise ExecutionEndedError()
 
     def reset(self):
-        self.running = False
         self.finished = False
         self.command_pointer = 0
+        self.instruction_count = 0
+        # Number of instructions left to run in the current call to `run_for`, which
+        # is reduced by the instructions that count them (see `brainfuck_ir.StepCosts`)
+        self._budget = 0
         self.tape_pointer = 0
+        self._tape_end = len(self.tape)
+        self._poll_countdown = self._POLL_INTERVAL
+        self._output_buffer = OutputBuffer(self._flushed, self.cell_bits)
         self.output = []
 
+    def _flushed(self, text):
+        self.output.append(text)
+        if self.output_func:
+            self.output_func(text)
+
     @property
     def current_cell(self):
         return self.tape[self.tape_pointer]
 
     def _compile(self, code):
-        command_funcs = {
-            '[': self.open_loop,
-            ']': self.close_loop,
-            '>': self.pointer_op,
-            '<': self.pointer_op,
-            '+': self.cell_op,
-            '-': self.cell_op,
-            ',': self.accept_input,
-            '.': self.add_output,
-        }
+        instructions, brackets, costs = _parse_cached(code)
 
-        pointer_ops = set('<>')
-        cell_ops = set('+-')
+        # Methods called with (instruction.arg, instruction.offset)
+        arg_offset_funcs = {
+            Op.ADD: self.cell_op,
+            Op.ENSURE: self.ensure_op,
+        }
+        # Methods called with (instruction.offset)
+        offset_funcs = {
+            Op.INPUT: self.accept_input,
+            Op.OUTPUT: self.add_output,
+        }
 
-        bracket_stack = []
-        brackets = {}
         final_commands = []
-        code_len = len(code)
-        i = 0
+        for i, instruction in enumerate(instructions):
+            op = instruction.op
+            steps = costs.steps[i]
+            if op is Op.OPEN_LOOP:
+                final_commands.append(functools.partial(self.open_loop, steps))
+            elif op is Op.CLOSE_LOOP:
+                final_commands.append(functools.partial(self.close_loop, steps))
+            elif op is Op.MOVE:
+                final_commands.append(functools.partial(self.pointer_op, instruction.arg))
+            elif op is Op.SCAN:
+                final_commands.append(functools.partial(self.scan_op, instruction.arg, steps))
+            elif op is Op.CLEAR:
+                clear = self.clear_cell_upwards if i in costs.incrementing else self.clear_cell
+                final_commands.append(functools.partial(clear, instruction.offset, steps))
+            elif op is Op.MULTIPLY:
+                final_commands.append(
+                    functools.partial(self.multiply_op, instruction.offset, instruction.arg)
+                )
+            elif op in arg_offset_funcs:
+                final_commands.append(
+                    functools.partial(arg_offset_funcs[op], instruction.arg, instruction.offset)
+                )
+            else:
+                final_commands.append(
+                    functools.partial(offset_funcs[op], instruction.offset)
+                )
 
-        while i < code_len:
-            char = code[i]
-            arg = None
+        final_commands.append(functools.partial(self.stop, costs.tail))
 
-            if char == '[':
-                bracket_stack.append(len(final_commands))
-            elif char == ']':
-                try:
-                    match = bracket_stack.pop()
-                except IndexError:
-                    raise ProgramSyntaxError(ErrorTypes.UNMATCHED_CLOSE_PAREN, (i, 1))
-                current = len(final_commands)
-                brackets[match] = current
-                brackets[current] = match
-
-            if char in pointer_ops:
-                arg = 0
-                while i < code_len and code[i] in pointer_ops:
-                    arg += 1 if code[i] == '>' else -1
-                    i += 1
-            elif char in cell_ops:
-                arg = 0
-                while i < code_len and code[i] in cell_ops:
-                    arg += 1 if code[i] == '+' else -1
-                    i += 1
-            else:
-                i += 1
+        return final_commands, brackets
 
-            if char in command_funcs:
-                command = command_funcs[char]
-                if arg is None:
-                    final_commands.append(command)
-                else:
-                    final_commands.append(functools.partial(command, arg))
 
-        final_commands.append(self.stop)
+class CompiledBrainfuckInterpreter(BaseInterpreter):
+    """Brainfuck interpreter which compiles the program into a Python generator
+    function (see `brainfuck_codegen`). Each call to `step` runs the program until it
+    next yields, which is either after a batch of loop iterations or when it is
+    waiting for input.
 
-        if bracket_stack:
-            raise ProgramSyntaxError(ErrorTypes.UNMATCHED_OPEN_PAREN)
-        return final_commands, brackets
+    `instruction_count` counts the instructions of the source code in the same way as
+    `BrainfuckInterpreter`, although the instructions between loops are only counted
+    when the next loop starts or ends, and none of those run in a batch which ends
+    with an error are counted.
+
+    If `profile` is true, the iterations of each loop are counted (see
+    `loop_profile`), which makes tight loops up to half as slow again."""
+
+    supports_profiling = True
+
+    def __init__(
+        self,
+        code,
+        input_func=input,
+        output_func=None,
+        cell_bits=8,
+        max_cells=tape.DEFAULT_MAX_CELLS,
+        bidirectional=False,
+        profile=False,
+    ):
+        self.input_func = input_func
+        self.output_func = output_func
+        self.memory = tape.Tape(cell_bits, max_cells=max_cells, bidirectional=bidirectional)
+        self.tape = self.memory.cells
+        self.output = []
+        self._output_buffer = OutputBuffer(self._flushed, cell_bits)
+
+        self._loops = _loop_table_cached(code) if profile else None
+        self._counts = [0] * len(self._loops) if profile else None
+        program = _compile_cached(code, cell_bits, profile)
+        self._program = program(
+            self.memory, self.input_func, self._output_buffer.write, counts=self._counts
+        )
+        next(self._program)
+        self.finished = False
+        self.instruction_count = 0
+        # Budget of the current batch of instructions, and whether the program is
+        # waiting for a new budget (rather than for input)
+        self._batch_budget = brainfuck_codegen.DEFAULT_YIELD_INTERVAL
+        self._needs_budget = True
+
+    def run(self):
+        _run_to_end(self)
+        return ''.join(self.output)
+
+    def run_for(self, max_instructions):
+        """Run the program until it has run at least `max_instructions` instructions.
+        (The budget is only checked at the end of each loop iteration.)"""
+        try:
+            self._resume(max_instructions)
+        except ExecutionEndedError:
+            return RunStatus.ENDED
+        except NoInputError:
+            return RunStatus.NEEDS_INPUT
+        except ProgramRuntimeError as error:
+            self.error = error
+            return RunStatus.ERROR
+        return RunStatus.BUDGET_EXHAUSTED
+
+    def step(self):
+        self._resume(None)
+
+    def _resume(self, budget):
+        """Run the program until it next yields. `budget` is the number of
+        instructions to run before yielding, or None for the default."""
+        if self.finished:
+            raise ExecutionEndedError()
+        if self._needs_budget:
+            self._batch_budget = budget or brainfuck_codegen.DEFAULT_YIELD_INTERVAL
+        try:
+            status = self._program.send(budget)
+        except StopIteration as stop:
+            self.finished = True
+            self.instruction_count += self._batch_budget - stop.value
+            self.flush_output()
+            raise ExecutionEndedError()
+        except ProgramRuntimeError:
+            self.finished = True
+            self.flush_output()
+            raise
+        if status is brainfuck_codegen.NEEDS_INPUT:
+            self._needs_budget = False
+            self.flush_output()
+            raise NoInputError()
+        self._needs_budget = True
+        # The generator yields what is left of the budget, which is 0 or less
+        self.instruction_count += self._batch_budget - status
+        self._output_buffer.poll()
+
+    def stats(self):
+        return InterpreterStats(self.instruction_count, len(self.memory.cells), process_rss_kb())
+
+    def loop_profile(self):
+        if self._counts is None:
+            return None
+        return [
+            LoopProfile(location, iterations, iterations * ops)
+            for (location, ops), iterations in zip(self._loops, self._counts)
+        ]
+
+    def flush_output(self):
+        self._output_buffer.flush()
+
+    def _flushed(self, text):
+        self.output.append(text)
+        if self.output_func:
+            self.output_func(text)
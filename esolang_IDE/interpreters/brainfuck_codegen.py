@@ -0,0 +1,256 @@
+"""
+Generate Python source code from the Brainfuck IR.
+
+The program is compiled into a generator function which keeps the tape and the tape
+pointer in local variables and uses native `while` loops for the brackets. When the
+tape pointer moves off the end of the tape, `Tape.grow` is called.
+
+The generator counts the steps of `BrainfuckInterpreter` that it runs (see
+`brainfuck_ir.StepCosts`) by subtracting them from `budget`, and yields:
+
+    - `None` before running anything, so that it must be primed with `next` before
+      it is used.
+    - What is left of `budget` (0 or less) at the end of the first loop iteration
+      which uses it up, so that the caller can check for interrupts. `budget` is the
+      value passed to `send` when the generator is resumed, or `yield_interval` if
+      that is None. (The value sent when resuming after `NEEDS_INPUT` is ignored.)
+    - `NEEDS_INPUT` when `read` returns no input. The input is read again when the
+      generator is resumed.
+
+When the program is generated with `profile=True`, each iteration of a loop adds one
+to its counter in `counts`, a list with an item for each loop in the order of
+`brainfuck_ir.loop_starts`. A loop which was collapsed into a `CLEAR` or `SCAN` adds
+the number of iterations that it replaced.
+
+CPython limits how deeply blocks can be nested, so loops nested more than
+`_MAX_NESTING` deep are moved into a separate generator function which is delegated
+to with `yield from`.
+"""
+
+from .brainfuck_ir import Instruction, Op, StepCosts, loop_starts, match_loops
+from .tape import cell_mask
+
+NEEDS_INPUT = object()
+
+DEFAULT_YIELD_INTERVAL = 100_000
+
+_MAX_NESTING = 16
+_INDENT = '    '
+
+
+def _signed(value):
+    return f'+ {value}' if value >= 0 else f'- {-value}'
+
+
+class _FunctionWriter:
+    def __init__(self, name, mask, yield_interval, primed=False, profile=False):
+        self.name = name
+        self.primed = primed
+        self.profile = profile
+        self.mask = mask
+        self.yield_interval = yield_interval
+        self.lines = []
+        self.depth = 1
+
+    def emit(self, line):
+        self.lines.append(_INDENT * self.depth + line)
+
+    def emit_move(self, amount):
+        self.emit(f'p += {amount}' if amount >= 0 else f'p -= {-amount}')
+        self.emit('if p < 0:' if amount < 0 else 'if p >= end:')
+        self.emit(f'{_INDENT}p = grow(p)')
+        self.emit(f'{_INDENT}end = len(tape)')
+
+    def emit_ensure(self, low, high):
+        if high > 0:
+            self.emit(f'if p + {high} >= end:')
+            self.emit(f'{_INDENT}grow(p + {high})')
+            self.emit(f'{_INDENT}end = len(tape)')
+        if low < 0:
+            self.emit(f'if p - {-low} < 0:')
+            self.emit(f'{_INDENT}p = grow(p - {-low}) + {-low}')
+            self.emit(f'{_INDENT}end = len(tape)')
+
+    def emit_instruction(
+        self, instruction: Instruction, steps=0, incrementing=False, extra_steps=0, loop_id=None
+    ):
+        """Emit `instruction`. `steps` and `incrementing` are its entries in the
+        `StepCosts` of the program, `extra_steps` are counted along with a `CLEAR`,
+        and `loop_id` is the counter of a `CLEAR` or `SCAN` in `counts`."""
+        op = instruction.op
+        cell = f'tape[p {_signed(instruction.offset)}]' if instruction.offset else 'tape[p]'
+        if op is Op.ADD:
+            self.emit(f'{cell} = ({cell} {_signed(instruction.arg)}) & {self.mask}')
+        elif op is Op.MOVE:
+            self.emit_move(instruction.arg)
+        elif op is Op.ENSURE:
+            self.emit_ensure(instruction.arg, instruction.offset)
+        elif op is Op.CLEAR:
+            # The loop that was collapsed runs once for each time it adds 1 to the cell
+            iterations = f'(-{cell} & {self.mask})' if incrementing else cell
+            extra = f' + {extra_steps}' if extra_steps else ''
+            if self.profile:
+                self.emit(f'counts[{loop_id}] += {iterations}')
+            self.emit(f'budget -= {iterations} * {steps}{extra}')
+            self.emit(f'{cell} = 0')
+        elif op is Op.MULTIPLY:
+            offset = instruction.offset
+            target = f'p {_signed(offset)}'
+            self.emit('if tape[p]:')
+            self.depth += 1
+            if offset < 0:
+                # Growing the tape to the left moves the current cell as well
+                self.emit(f'if {target} < 0:')
+                self.emit(f'{_INDENT}p = grow({target}) + {-offset}')
+            else:
+                self.emit(f'if {target} >= end:')
+                self.emit(f'{_INDENT}grow({target})')
+            self.emit(f'{_INDENT}end = len(tape)')
+            self.emit(
+                f'tape[{target}] = (tape[{target}] + tape[p] * {instruction.arg}) & {self.mask}'
+            )
+            self.depth -= 1
+        elif op is Op.SCAN:
+            # The tape pointer is made relative to cell 0 in case the tape grows left
+            self.emit('if tape[p]:')
+            self.emit(f'{_INDENT}start = p - memory.origin')
+            self.emit(f'{_INDENT}p = scan(p, {instruction.arg})')
+            self.emit(f'{_INDENT}end = len(tape)')
+            self.emit(f'{_INDENT}iterations = (p - memory.origin - start) // {instruction.arg}')
+            if self.profile:
+                self.emit(f'{_INDENT}counts[{loop_id}] += iterations')
+            self.emit(f'{_INDENT}budget -= iterations * {steps}')
+        elif op is Op.OUTPUT:
+            self.emit(f'write({cell})')
+        elif op is Op.INPUT:
+            self.emit('char = read()')
+            self.emit('while not char:')
+            self.emit(f'{_INDENT}yield NEEDS_INPUT')
+            self.emit(f'{_INDENT}char = read()')
+            self.emit(f'{cell} = ord(char) & {self.mask}')
+
+    def emit_loop_start(self, loop_id, steps):
+        if steps:
+            self.emit(f'budget -= {steps}')
+        self.emit('while tape[p]:')
+        self.depth += 1
+        if self.profile:
+            self.emit(f'counts[{loop_id}] += 1')
+
+    def emit_loop_end(self, steps):
+        if steps:
+            self.emit(f'budget -= {steps}')
+        self.emit('if budget <= 0:')
+        self.emit(f'{_INDENT}budget = (yield budget) or {self.yield_interval}')
+        self.depth -= 1
+
+    def source(self, tail_steps=0):
+        if self.primed:
+            signature = f'def {self.name}(memory, read, write, p=0, counts=None):'
+            start = [f'{_INDENT}budget = (yield) or {self.yield_interval}']
+            result = f'budget - {tail_steps}' if tail_steps else 'budget'
+            finish = [f'{_INDENT}return {result}', '']
+        else:
+            signature = f'def {self.name}(memory, read, write, p, budget, counts):'
+            start = []
+            finish = [f'{_INDENT}return p, budget', '']
+        header = [
+            signature,
+            f'{_INDENT}tape = memory.cells',
+            f'{_INDENT}grow = memory.grow',
+            f'{_INDENT}scan = memory.scan',
+            f'{_INDENT}end = len(tape)',
+        ]
+        return '\n'.join(header + start + self.lines + finish)
+
+
+def generate_source(
+    instructions: list[Instruction],
+    costs: StepCosts,
+    *,
+    cell_bits: int = 8,
+    yield_interval: int = DEFAULT_YIELD_INTERVAL,
+    name: str = 'program',
+    profile: bool = False,
+) -> str:
+    """Return the source code of a generator function called `name` which executes
+    `instructions`, whose steps are counted according to `costs`. The function has
+    the signature `name(memory, read, write, p=0, counts=None)`, where `memory` is a
+    `Tape` and `counts` is only used if `profile` is true, and returns the budget
+    that was left when the program ended (which can be less than 0). Loops nested
+    too deeply are moved into helper functions which are not primed, and take and
+    return the tape pointer and budget."""
+    brackets = match_loops(instructions)
+    loop_ids = {i: loop_id for loop_id, i in enumerate(loop_starts(instructions))}
+    # The steps of a loop instruction (or the end of the program) are counted by the
+    # last `CLEAR` before it, if there is one since the previous loop instruction,
+    # since every instruction between them runs the same number of times
+    steps = list(costs.steps) + [costs.tail]
+    extra_steps = {}
+    last_clear = None
+    for i, instruction in enumerate([*instructions, None]):
+        if instruction is None or instruction.op in (Op.OPEN_LOOP, Op.CLOSE_LOOP):
+            if last_clear is not None:
+                extra_steps[last_clear] = steps[i]
+                steps[i] = 0
+            last_clear = None
+        elif instruction.op is Op.CLEAR:
+            last_clear = i
+    functions = []
+
+    def write_function(function_name, start, end):
+        writer = _FunctionWriter(
+            function_name,
+            cell_mask(cell_bits),
+            yield_interval,
+            primed=function_name == name,
+            profile=profile,
+        )
+        # Nesting depth relative to the start of this function
+        nesting = 0
+        i = start
+        while i < end:
+            instruction = instructions[i]
+            if instruction.op is Op.OPEN_LOOP:
+                if nesting == _MAX_NESTING:
+                    close = brackets[i]
+                    helper = f'_{name}_loop_{i}'
+                    write_function(helper, i, close + 1)
+                    writer.emit(
+                        f'p, budget = yield from {helper}(memory, read, write, p, budget, counts)'
+                    )
+                    writer.emit('end = len(tape)')
+                    i = close + 1
+                    continue
+                nesting += 1
+                writer.emit_loop_start(loop_ids[i], steps[i])
+            elif instruction.op is Op.CLOSE_LOOP:
+                nesting -= 1
+                writer.emit_loop_end(steps[i])
+            else:
+                writer.emit_instruction(
+                    instruction,
+                    steps[i],
+                    i in costs.incrementing,
+                    extra_steps.get(i, 0),
+                    loop_ids.get(i),
+                )
+            i += 1
+        functions.append(writer)
+
+    write_function(name, 0, len(instructions))
+
+    return '\n'.join(
+        writer.source(steps[-1] if writer.primed else 0) for writer in functions
+    )
+
+
+def compile_program(
+    instructions: list[Instruction], costs: StepCosts, filename='<brainfuck>', **kwargs
+):
+    """Compile `instructions` and return the generator function.
+    Keyword arguments are passed to `generate_source`."""
+    name = kwargs.setdefault('name', 'program')
+    namespace = {'NEEDS_INPUT': NEEDS_INPUT}
+    exec(compile(generate_source(instructions, costs, **kwargs), filename, 'exec'), namespace)
+    return namespace[name]
@@ -0,0 +1,352 @@
+"""
+Intermediate representation of Brainfuck programs used by the fast interpreters.
+
+`parse` turns source code into a list of `Instruction`s, folding runs of `+-` and `<>`
+into a single instruction. `optimise` then rewrites common loop idioms into single
+instructions:
+
+    - Clear loops such as `[-]` and `[+]` become `CLEAR`.
+    - Balanced multiply / copy loops such as `[->+>++<<]` become one `MULTIPLY` per
+      target cell followed by a `CLEAR`.
+    - Scan loops such as `[>]` and `[<<<]` become `SCAN`.
+
+`defer_moves` then rewrites straight-line code so that cells are addressed by their
+offset from the tape pointer, and the pointer is only moved before loops.
+
+`step_costs` works out how many steps of `BrainfuckInterpreter` (one per command of
+the source code) the instructions stand for, so that the engines which run them can
+count instructions in the same way.
+"""
+
+import enum
+import itertools
+from typing import NamedTuple
+
+from .errors import ErrorTypes, ProgramSyntaxError
+
+
+class Op(enum.Enum):
+    OPEN_LOOP = enum.auto()
+    CLOSE_LOOP = enum.auto()
+    MOVE = enum.auto()
+    ADD = enum.auto()
+    INPUT = enum.auto()
+    OUTPUT = enum.auto()
+    CLEAR = enum.auto()
+    MULTIPLY = enum.auto()
+    SCAN = enum.auto()
+    ENSURE = enum.auto()
+
+
+class Instruction(NamedTuple):
+    """A single operation of the IR.
+
+    Attributes:
+        op -- The kind of operation.
+        arg -- Amount to add / move by, the factor for `MULTIPLY`, the stride for
+            `SCAN`, or the lowest offset for `ENSURE`.
+        offset -- Offset from the tape pointer of the cell that is operated on,
+            or the highest offset for `ENSURE`.
+        location -- (start_position, num_chars) of the source this was compiled from."""
+
+    op: Op
+    arg: int = 0
+    offset: int = 0
+    location: tuple[int, int] = (0, 0)
+
+
+_SIMPLE_OPS = {
+    '[': Op.OPEN_LOOP,
+    ']': Op.CLOSE_LOOP,
+    ',': Op.INPUT,
+    '.': Op.OUTPUT,
+}
+_RUN_OPS = {
+    '>': (Op.MOVE, 1),
+    '<': (Op.MOVE, -1),
+    '+': (Op.ADD, 1),
+    '-': (Op.ADD, -1),
+}
+_COMMANDS = set(_SIMPLE_OPS) | set(_RUN_OPS)
+
+
+def parse(code: str) -> list[Instruction]:
+    """Return the list of instructions for `code`.
+    Raise `ProgramSyntaxError` if the brackets are unmatched."""
+    instructions = []
+    bracket_stack = []
+    code_len = len(code)
+    i = 0
+
+    while i < code_len:
+        char = code[i]
+
+        if char in _RUN_OPS:
+            # Fold the run, skipping over any comment characters inside it.
+            op = _RUN_OPS[char][0]
+            start = end = i
+            arg = 0
+            while i < code_len:
+                char = code[i]
+                if char in _RUN_OPS and _RUN_OPS[char][0] is op:
+                    arg += _RUN_OPS[char][1]
+                    end = i + 1
+                elif char in _COMMANDS:
+                    break
+                i += 1
+            instructions.append(Instruction(op, arg, location=(start, end - start)))
+            continue
+
+        if char in _SIMPLE_OPS:
+            if char == '[':
+                bracket_stack.append(i)
+            elif char == ']':
+                if not bracket_stack:
+                    raise ProgramSyntaxError(ErrorTypes.UNMATCHED_CLOSE_PAREN, (i, 1))
+                bracket_stack.pop()
+            instructions.append(Instruction(_SIMPLE_OPS[char], location=(i, 1)))
+        i += 1
+
+    if bracket_stack:
+        raise ProgramSyntaxError(ErrorTypes.UNMATCHED_OPEN_PAREN, (bracket_stack[-1], 1))
+    return instructions
+
+
+def optimise(instructions: list[Instruction]) -> list[Instruction]:
+    """Return a new list of instructions with recognised loop idioms collapsed."""
+    optimised = []
+    loop_starts = []
+
+    for instruction in instructions:
+        if instruction.op in (Op.ADD, Op.MOVE) and instruction.arg == 0:
+            continue
+
+        if instruction.op is Op.OPEN_LOOP:
+            loop_starts.append(len(optimised))
+        elif instruction.op is Op.CLOSE_LOOP:
+            start = loop_starts.pop()
+            replacement = _collapse_loop(optimised[start], optimised[start + 1 :], instruction)
+            if replacement is not None:
+                del optimised[start:]
+                optimised.extend(replacement)
+                continue
+
+        optimised.append(instruction)
+
+    return optimised
+
+
+def _collapse_loop(open_instruction, body, close_instruction):
+    """Return the instructions replacing the loop `[body]`, or None if the loop
+    cannot be collapsed."""
+    start = open_instruction.location[0]
+    location = (start, close_instruction.location[0] - start + 1)
+
+    if len(body) == 1 and body[0].op is Op.MOVE:
+        return [Instruction(Op.SCAN, body[0].arg, location=location)]
+
+    deltas = {}
+    pointer = 0
+    for instruction in body:
+        if instruction.op is Op.ADD:
+            deltas[pointer] = deltas.get(pointer, 0) + instruction.arg
+        elif instruction.op is Op.MOVE:
+            pointer += instruction.arg
+        else:
+            return None
+
+    # The loop must be balanced, and must decrement or increment the current cell by
+    # exactly one, otherwise the number of iterations is not simply the cell value.
+    if pointer != 0 or deltas.get(0) not in (-1, 1):
+        return None
+
+    # With wraparound, a loop that increments the current cell runs `-value` times.
+    sign = -deltas.pop(0)
+    replacement = [
+        Instruction(Op.MULTIPLY, delta * sign, offset, location)
+        for offset, delta in deltas.items()
+        if delta
+    ]
+    replacement.append(Instruction(Op.CLEAR, location=location))
+    return replacement
+
+
+_OFFSET_OPS = {Op.ADD, Op.CLEAR, Op.INPUT, Op.OUTPUT}
+_IO_OPS = {Op.INPUT, Op.OUTPUT}
+
+
+def defer_moves(instructions: list[Instruction]) -> list[Instruction]:
+    """Return a new list of instructions where `MOVE`s are deferred until the next
+    loop, `SCAN` or `MULTIPLY`, and `ADD`, `CLEAR`, `INPUT` and `OUTPUT` instead
+    operate on the cell at their `offset` from the tape pointer.
+
+    Rather than checking the bounds of the tape at every move, an `ENSURE` is
+    inserted before each run of instructions, which makes sure that every cell from
+    `arg` to `offset` from the tape pointer is on the tape. (An offset of 0 means
+    that side does not need checking.) Runs end after `INPUT` and `OUTPUT` so that a
+    program which moves off the tape still produces all of the output before that
+    move."""
+    deferred = []
+    run = []
+    run_location = None
+    pointer = low = high = 0
+    checked_low = checked_high = 0
+
+    def end_run():
+        nonlocal run_location, checked_low, checked_high
+        if low < checked_low or high > checked_high:
+            ensure_low = low if low < checked_low else 0
+            ensure_high = high if high > checked_high else 0
+            deferred.append(Instruction(Op.ENSURE, ensure_low, ensure_high, run_location))
+            checked_low, checked_high = low, high
+        deferred.extend(run)
+        run.clear()
+        run_location = None
+
+    for instruction in instructions:
+        op = instruction.op
+        if run_location is None:
+            run_location = instruction.location
+
+        if op is Op.MOVE:
+            pointer += instruction.arg
+            low = min(low, pointer)
+            high = max(high, pointer)
+        elif op in _OFFSET_OPS:
+            run.append(instruction._replace(offset=pointer))
+            if op in _IO_OPS:
+                end_run()
+        else:
+            end_run()
+            if pointer:
+                deferred.append(Instruction(Op.MOVE, pointer, location=instruction.location))
+            deferred.append(instruction)
+            pointer = low = high = checked_low = checked_high = 0
+
+    end_run()
+    return deferred
+
+
+def parse_optimised(code: str) -> list[Instruction]:
+    """Return the instructions for `code` with all of the optimisations applied."""
+    return defer_moves(optimise(parse(code)))
+
+
+def match_loops(instructions: list[Instruction]) -> dict[int, int]:
+    """Return a dict mapping the index of each loop instruction to the index of
+    its matching instruction."""
+    stack = []
+    brackets = {}
+    for i, instruction in enumerate(instructions):
+        if instruction.op is Op.OPEN_LOOP:
+            stack.append(i)
+        elif instruction.op is Op.CLOSE_LOOP:
+            match = stack.pop()
+            brackets[match] = i
+            brackets[i] = match
+    return brackets
+
+
+def loop_starts(instructions: list[Instruction]) -> list[int]:
+    """Return the index in `instructions` of each loop of the source code, in the
+    order of the loops in the source code. The index of a loop is that of its
+    `OPEN_LOOP`, or of the `CLEAR` or `SCAN` that it was collapsed into."""
+    return sorted(
+        (
+            i
+            for i, instruction in enumerate(instructions)
+            if instruction.op in (Op.OPEN_LOOP, Op.CLEAR, Op.SCAN)
+        ),
+        key=lambda i: instructions[i].location[0],
+    )
+
+
+def loop_locations(instructions: list[Instruction]) -> list[tuple[int, int]]:
+    """Return the location in the source code of each loop in `instructions`, from
+    its `[` to its `]`, in the order of `loop_starts`."""
+    brackets = match_loops(instructions)
+    locations = []
+    for i in loop_starts(instructions):
+        instruction = instructions[i]
+        if instruction.op is Op.OPEN_LOOP:
+            start = instruction.location[0]
+            close = instructions[brackets[i]].location[0]
+            locations.append((start, close - start + 1))
+        else:
+            locations.append(instruction.location)
+    return locations
+
+
+class StepCosts(NamedTuple):
+    """Number of steps of `BrainfuckInterpreter` (one per command of the source code)
+    that running the instructions of a program takes.
+
+    The commands between two loop instructions are counted together by the second
+    one, so a loop which runs `n` times costs the steps of its `OPEN_LOOP` once and
+    the steps of its `CLOSE_LOOP` `n` times. The `OPEN_LOOP` of a loop inside another
+    loop runs once for each iteration of the outer loop, so its steps are counted by
+    the `CLOSE_LOOP` of the outer loop instead, which saves counting them separately.
+    A loop which was collapsed into a `CLEAR` or `SCAN` costs its steps per iteration
+    times the number of iterations, on top of the step of its `[`, which is counted
+    with the commands around it.
+
+    Attributes:
+        steps -- For each instruction: the steps counted by it for a loop instruction,
+            the steps of each iteration of the loop that it replaced for a `CLEAR` or
+            `SCAN`, and otherwise 0.
+        tail -- Steps of the commands after the last loop instruction.
+        incrementing -- Indices of the `CLEAR`s whose loop increments the cell, which
+            therefore runs `-value` times (wrapping around) rather than `value` times."""
+
+    steps: list[int]
+    tail: int
+    incrementing: frozenset[int]
+
+
+def _increments(body: str) -> bool:
+    """Return whether the balanced loop `body` increments the cell that it starts on."""
+    pointer = delta = 0
+    for char in body:
+        if char in '<>':
+            pointer += 1 if char == '>' else -1
+        elif char in '+-' and not pointer:
+            delta += 1 if char == '+' else -1
+    return delta > 0
+
+
+def step_costs(code: str, instructions: list[Instruction]) -> StepCosts:
+    """Return the `StepCosts` of `instructions`, which were compiled from `code`."""
+    commands = [0, *itertools.accumulate(char in _COMMANDS for char in code)]
+    steps = [0] * len(instructions)
+    incrementing = set()
+    # Start of the source code since the last loop instruction, and the steps of the
+    # iterations of the loops collapsed since then, which are counted separately
+    start = 0
+    collapsed = 0
+    # Steps of the `OPEN_LOOP`s directly inside each open loop
+    inner_steps = []
+
+    for i, instruction in enumerate(instructions):
+        op = instruction.op
+        if op is Op.OPEN_LOOP or op is Op.CLOSE_LOOP:
+            end = instruction.location[0] + 1
+            steps[i] = commands[end] - commands[start] - collapsed
+            start = end
+            collapsed = 0
+            if op is Op.OPEN_LOOP:
+                if inner_steps:
+                    inner_steps[-1] += steps[i]
+                    steps[i] = 0
+                inner_steps.append(0)
+            else:
+                steps[i] += inner_steps.pop()
+        elif op is Op.CLEAR or op is Op.SCAN:
+            # `MULTIPLY`s are always followed by the `CLEAR` of the same loop
+            loop_start, length = instruction.location
+            steps[i] = commands[loop_start + length] - commands[loop_start] - 1
+            collapsed += steps[i]
+            if op is Op.CLEAR and _increments(code[loop_start + 1 : loop_start + length - 1]):
+                incrementing.add(i)
+
+    tail = commands[len(code)] - commands[start] - collapsed
+    return StepCosts(steps, tail, frozenset(incrementing))
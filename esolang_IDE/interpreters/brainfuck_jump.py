@@ -0,0 +1,504 @@
+"""
+Run a Brainfuck program for an exact number of the steps of `BrainfuckInterpreter`
+(where each step is one command in the source code), much faster than calling
+`step` that many times, so that the visualiser can jump a long way forwards.
+
+Each run of the same command is one instruction which costs as many steps as there
+are commands in it, and brackets jump straight to their matching instruction. A run
+is only partly executed if the jump ends in the middle of it.
+
+Loops which only change cells by fixed amounts with the tape pointer ending where
+it started (such as `[-]` and `[->+<]`), or which only move the tape pointer (such
+as `[>]`), are run in one go like those collapsed by `brainfuck_ir.optimise`, with
+the number of iterations worked out from the current cell or the scan. This only
+happens if the jump has enough steps left for all of the iterations. Otherwise the
+loop is stepped through as usual.
+
+The engine works on the state of a `BrainfuckInterpreter` in place. It stops before
+any step that `BrainfuckInterpreter.step` has to handle itself: a move which is not
+allowed, input which is not available yet, or output which is not a valid
+character. The interpreter then runs that step so that it raises the same error
+with the same location as it would have done otherwise.
+
+A program can also have breakpoints, which are ranges of the source code (usually
+lines). The engine stops before running a command in a breakpoint when the last
+command run was not in that same breakpoint, so a loop inside a single breakpoint
+only stops once, while a loop which goes through a breakpoint stops each time
+around. Runs of commands are split where breakpoints start and end.
+
+A program compiled with `watch=True` checks watchpoints (see `Watchpoint`) whenever
+it changes a cell, and stops straight after the command which triggers one. Its
+instructions which change cells are separate types, which are checked after all of
+the others, so a program without watchpoints runs exactly as fast as before.
+"""
+
+import bisect
+from typing import NamedTuple, Optional, Sequence
+
+from .base_interpreter import Watchpoint
+from .errors import ProgramRuntimeError
+
+# Instruction types
+_ADD = 0
+_MOVE = 1
+_OPEN_LOOP = 2
+_CLOSE_LOOP = 3
+_INPUT = 4
+_OUTPUT = 5
+# Instructions which check watchpoints
+_WATCHED_ADD = 6
+_WATCHED_INPUT = 7
+
+_RUN_COMMANDS = {'+': (_ADD, 1), '-': (_ADD, -1), '>': (_MOVE, 1), '<': (_MOVE, -1)}
+_SINGLE_COMMANDS = {'[': _OPEN_LOOP, ']': _CLOSE_LOOP, ',': _INPUT, '.': _OUTPUT}
+_COMMANDS = set(_RUN_COMMANDS) | set(_SINGLE_COMMANDS)
+_WATCHED_OPS = {_ADD: _WATCHED_ADD, _INPUT: _WATCHED_INPUT}
+
+_MAX_CHAR = 0x10FFFF
+
+
+class _CollapsedLoop(NamedTuple):
+    """Loop which can be run in one go.
+
+    Attributes:
+        iteration_steps -- Steps of each iteration, including the `]`.
+        stride -- Amount that each iteration moves the tape pointer, or 0 if the
+            loop changes cells instead.
+        sign -- Amount (1 or -1) that each iteration adds to the current cell.
+        changes -- (offset, amount) that each iteration adds to the other cells.
+        touched -- Offsets of the cells changed by the loop, including 0."""
+
+    iteration_steps: int
+    stride: int = 0
+    sign: int = 0
+    changes: tuple[tuple[int, int], ...] = ()
+    touched: tuple[int, ...] = ()
+
+
+class JumpResult(NamedTuple):
+    """
+    Attributes:
+        tape_pointer -- New tape pointer.
+        code_pointer -- New code pointer, which is the position of the last command
+            run, or of the bracket that it jumped to.
+        last_command -- Position of the last command run.
+        steps -- Number of steps run.
+        finished -- Whether all of the steps were run. Otherwise, the next step
+            has to be run by `BrainfuckInterpreter.step`, or the program has ended.
+        breakpoint -- (position, chars) of the breakpoint if the run stopped
+            because the next command is the first one run in it.
+        watchpoint -- Watchpoint triggered by the last command run, if any."""
+
+    tape_pointer: int
+    code_pointer: int
+    last_command: int
+    steps: int
+    finished: bool
+    breakpoint: Optional[tuple[int, int]] = None
+    watchpoint: Optional[Watchpoint] = None
+
+
+def _steps_to_trigger(watchpoint, value, sign, count, mask):
+    """Return how many of the `count` commands of a run of + (`sign` 1) or - (`sign`
+    -1) are run when `watchpoint` triggers, starting from the cell `value`, or 0 if
+    it doesn't trigger during the run."""
+    if watchpoint.value is None:
+        # Every + or - changes the cell
+        return 1
+    if watchpoint.value > mask:
+        return 0
+    steps = ((watchpoint.value - value) * sign) & mask or mask + 1
+    return steps if steps <= count else 0
+
+
+def _first_to_trigger(watchpoints, value, sign, count, mask):
+    """Return the first of `watchpoints` (which are all on the same cell) that a run
+    of + or - triggers, and how many of its commands are run when it does (see
+    `_steps_to_trigger`), or (None, 0) if none of them trigger."""
+    first, first_steps = None, 0
+    for watchpoint in watchpoints:
+        steps = _steps_to_trigger(watchpoint, value, sign, count, mask)
+        if steps and (not first_steps or steps < first_steps):
+            first, first_steps = watchpoint, steps
+    return first, first_steps
+
+
+class JumpProgram:
+    """Instructions of a program for jumping. The brackets of the program must
+    match, which `BrainfuckInterpreter` has already checked.
+
+    `breakpoints` are (position, chars) ranges of the code, which must not overlap.
+    `watch` is whether the program checks watchpoints."""
+
+    def __init__(
+        self, code: str, breakpoints: Sequence[tuple[int, int]] = (), watch: bool = False
+    ):
+        self.code = code
+        self.breakpoints = sorted(breakpoints)
+        self.ops = []
+        self.args = []
+        # Number of commands in each instruction, and the positions of the first
+        # and last of them
+        self.costs = []
+        self.starts = []
+        self.ends = []
+
+        # Runs are not folded across these positions
+        boundaries = set()
+        for position, chars in breakpoints:
+            boundaries.update((position, position + chars))
+
+        i = 0
+        code_len = len(code)
+        while i < code_len:
+            char = code[i]
+            if char in _RUN_COMMANDS:
+                op, sign = _RUN_COMMANDS[char]
+                start = end = i
+                count = 0
+                # Fold the run, skipping over any comment characters inside it
+                while (
+                    i < code_len
+                    and (code[i] == char or code[i] not in _COMMANDS)
+                    and (i == start or i not in boundaries)
+                ):
+                    if code[i] == char:
+                        count += 1
+                        end = i
+                    i += 1
+                self._add(op, sign * count, count, start, end)
+                continue
+            if char in _SINGLE_COMMANDS:
+                self._add(_SINGLE_COMMANDS[char], 0, 1, i, i)
+            i += 1
+
+        if watch:
+            self.ops = [_WATCHED_OPS.get(op, op) for op in self.ops]
+
+        # Index of the matching bracket of each bracket
+        self.targets = [0] * len(self.ops)
+        stack = []
+        for index, op in enumerate(self.ops):
+            if op == _OPEN_LOOP:
+                stack.append(index)
+            elif op == _CLOSE_LOOP:
+                match = stack.pop()
+                self.targets[match] = index
+                self.targets[index] = match
+
+        # Number of the breakpoint (counting from 1) which each instruction is in, or
+        # 0 if it is not in one
+        self.regions = [0] * len(self.ops)
+        for number, (position, chars) in enumerate(self.breakpoints, 1):
+            first = bisect.bisect_left(self.starts, position)
+            last = bisect.bisect_left(self.starts, position + chars)
+            self.regions[first:last] = [number] * (last - first)
+
+        # `_CollapsedLoop` of each `[` which starts one, or None. Loops which cross
+        # the edge of a breakpoint are stepped through so that they stop there
+        self.collapsed = [None] * len(self.ops)
+        for index, op in enumerate(self.ops):
+            if op == _OPEN_LOOP:
+                close = self.targets[index]
+                if len(set(self.regions[index : close + 1])) == 1:
+                    self.collapsed[index] = self._collapse(index + 1, close)
+
+    def _add(self, op, arg, cost, start, end):
+        self.ops.append(op)
+        self.args.append(arg)
+        self.costs.append(cost)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def _collapse(self, start, end):
+        """Return the `_CollapsedLoop` of the loop whose body is the instructions
+        from `start` to `end` (exclusive), or None if it can't be run in one go."""
+        body = range(start, end)
+        if not body or any(self.ops[i] not in (_ADD, _WATCHED_ADD, _MOVE) for i in body):
+            return None
+        iteration_steps = sum(self.costs[start:end]) + 1
+        if all(self.ops[i] == _MOVE for i in body):
+            return _CollapsedLoop(iteration_steps, stride=sum(self.args[start:end]))
+
+        offset = 0
+        amounts = {}
+        for i in body:
+            if self.ops[i] == _MOVE:
+                offset += self.args[i]
+            else:
+                amounts[offset] = amounts.get(offset, 0) + self.args[i]
+        if offset or amounts.get(0) not in (1, -1):
+            return None
+        return _CollapsedLoop(
+            iteration_steps,
+            sign=amounts[0],
+            changes=tuple((offset, amount) for offset, amount in amounts.items() if offset),
+            touched=tuple(amounts),
+        )
+
+    def run(
+        self,
+        memory,
+        tape_pointer,
+        code_pointer,
+        steps,
+        read,
+        write,
+        last_command=-1,
+        watchpoints: Sequence[Watchpoint] = (),
+        max_steps=None,
+    ) -> JumpResult:
+        """Run at most `steps` steps on `memory` (a `Tape`), starting after the
+        command at `code_pointer`. `read` is called for each input character, and
+        `write` with each output character. `last_command` is the position of the
+        last command run (or -1 if there was none), which decides whether the next
+        command enters a breakpoint. `watchpoints` are only checked if the program
+        was compiled with `watch`. A loop which is run in one go can take the run
+        past `steps`, up to `max_steps` (which defaults to `steps`)."""
+        ops, args, costs, targets, regions, collapsed = (
+            self.ops, self.args, self.costs, self.targets, self.regions, self.collapsed
+        )
+        p = tape_pointer
+        remaining = steps
+        # Steps that a loop run in one go can take beyond `remaining`
+        slack = 0 if max_steps is None else max_steps - steps
+        n = len(ops)
+        region = 0
+        if last_command >= 0:
+            region = regions[bisect.bisect_right(self.starts, last_command) - 1]
+
+        # Finish the run that the last step was in the middle of
+        pc = bisect.bisect_right(self.starts, code_pointer)
+        if pc and code_pointer < self.ends[pc - 1]:
+            pc -= 1
+            command = self.code[self.starts[pc]]
+            left = self.code.count(command, code_pointer + 1, self.ends[pc] + 1)
+            p, ran, watchpoint = self._run_partial(
+                memory, p, pc, min(left, remaining), watchpoints
+            )
+            remaining -= ran
+            if ran < left or watchpoint:
+                code_pointer = self._nth_command(pc, ran, code_pointer)
+                return JumpResult(
+                    p,
+                    code_pointer,
+                    code_pointer,
+                    steps - remaining,
+                    not remaining,
+                    watchpoint=watchpoint,
+                )
+            pc += 1
+        last = pc - 1
+        # Index of the bracket that the last bracket run jumped to, or -1 if it
+        # didn't jump. (If `last` is this bracket, the last instruction run is its
+        # matching bracket.)
+        jumped_to = -1
+
+        tape = memory.cells
+        mask = memory.mask
+        end = len(tape)
+        # Lists of watchpoints by the index of their cell in `tape`
+        watched = self._watched(watchpoints, memory)
+        breakpoint = None
+        watchpoint = None
+        while remaining > 0 and pc < n:
+            if regions[pc] != region:
+                region = regions[pc]
+                if region:
+                    breakpoint = self.breakpoints[region - 1]
+                    break
+
+            cost = costs[pc]
+            if cost > remaining:
+                p, ran, watchpoint = self._run_partial(memory, p, pc, remaining, watchpoints)
+                if ran:
+                    code_pointer = self._nth_command(pc, ran, self.starts[pc] - 1)
+                    return JumpResult(
+                        p,
+                        code_pointer,
+                        code_pointer,
+                        steps - remaining + ran,
+                        ran == remaining,
+                        watchpoint=watchpoint,
+                    )
+                break
+
+            op = ops[pc]
+            if op == _ADD:
+                tape[p] = (tape[p] + args[pc]) & mask
+            elif op == _MOVE:
+                p += args[pc]
+                if p < 0 or p >= end:
+                    try:
+                        p = memory.grow(p)
+                    except ProgramRuntimeError:
+                        p -= args[pc]
+                        break
+                    end = len(tape)
+                    # The tape may have grown to the left
+                    watched = self._watched(watchpoints, memory)
+            elif op == _OPEN_LOOP:
+                if tape[p]:
+                    jumped_to = -1
+                    loop = collapsed[pc]
+                    if loop is not None:
+                        p, ran = self._run_collapsed(memory, p, loop, remaining + slack, watched)
+                        if len(tape) != end:
+                            end = len(tape)
+                            # The tape may have grown to the left
+                            watched = self._watched(watchpoints, memory)
+                        if ran:
+                            # Continue from the `]`, as if the loop had ended normally
+                            cost = ran
+                            pc = targets[pc]
+                else:
+                    pc = jumped_to = targets[pc]
+            elif op == _CLOSE_LOOP:
+                if tape[p]:
+                    pc = jumped_to = targets[pc]
+                else:
+                    jumped_to = -1
+            elif op == _INPUT:
+                char = read()
+                if not char:
+                    break
+                tape[p] = ord(char) & mask
+            elif op == _OUTPUT:
+                value = tape[p]
+                if value > _MAX_CHAR:
+                    break
+                write(chr(value))
+            elif op == _WATCHED_ADD:
+                if p in watched:
+                    triggered, ran = _first_to_trigger(
+                        watched[p], tape[p], args[pc] // cost, cost, mask
+                    )
+                    if ran and ran < cost:
+                        p, ran, watchpoint = self._run_partial(memory, p, pc, ran, watchpoints)
+                        code_pointer = self._nth_command(pc, ran, self.starts[pc] - 1)
+                        return JumpResult(
+                            p,
+                            code_pointer,
+                            code_pointer,
+                            steps - remaining + ran,
+                            ran == remaining,
+                            watchpoint=watchpoint,
+                        )
+                    watchpoint = triggered
+                tape[p] = (tape[p] + args[pc]) & mask
+                if watchpoint:
+                    remaining -= cost
+                    last = pc
+                    break
+            else:
+                char = read()
+                if not char:
+                    break
+                old = tape[p]
+                tape[p] = ord(char) & mask
+                watchpoint = next(
+                    (w for w in watched.get(p, ()) if w.triggered(old, tape[p])), None
+                )
+                if watchpoint:
+                    remaining -= cost
+                    last = pc
+                    break
+            remaining -= cost
+            last = pc
+            pc += 1
+
+        if remaining == steps:
+            return JumpResult(p, code_pointer, last_command, 0, False, breakpoint)
+        last_command = self.ends[targets[last] if last == jumped_to else last]
+        return JumpResult(
+            p,
+            self.ends[last],
+            last_command,
+            steps - remaining,
+            remaining <= 0,
+            breakpoint,
+            watchpoint,
+        )
+
+    def _run_collapsed(self, memory, p, loop, limit, watched):
+        """Run every iteration of the `_CollapsedLoop` `loop` from the tape pointer `p`
+        (whose cell is not 0) if they take at most `limit` steps, counting its `[`.
+        Return the new tape pointer and the number of steps run, which is 0 if the
+        loop was not run. The tape is only changed if the loop is run, so that when
+        it isn't, stepping through it has the same result as it would otherwise."""
+        tape = memory.cells
+        if loop.stride:
+            found = memory.scan(p, loop.stride, grow=False)
+            steps = 1 + (found - p) // loop.stride * loop.iteration_steps
+            if steps > limit:
+                return p, 0
+            try:
+                return memory.grow(found), steps
+            except ProgramRuntimeError:
+                return p, 0
+
+        if any(p + offset in watched for offset in loop.touched):
+            # Step through the loop to stop at the step which triggers the watchpoint
+            return p, 0
+        # The loop runs once for each time that it adds `sign` to the cell
+        iterations = -tape[p] * loop.sign & memory.mask
+        steps = 1 + iterations * loop.iteration_steps
+        if steps > limit:
+            return p, 0
+        low, high = min(loop.touched), max(loop.touched)
+        size = len(tape)
+        try:
+            if p + high >= size:
+                memory.grow(p + high)
+            if p + low < 0:
+                p = memory.grow(p + low) - low
+        except ProgramRuntimeError:
+            # Only growing to the left can fail after the tape has grown
+            del tape[size:]
+            return p, 0
+        mask = memory.mask
+        for offset, amount in loop.changes:
+            tape[p + offset] = (tape[p + offset] + iterations * amount) & mask
+        tape[p] = 0
+        return p, steps
+
+    def _watched(self, watchpoints, memory):
+        watched = {}
+        for watchpoint in watchpoints:
+            watched.setdefault(watchpoint.cell + memory.origin, []).append(watchpoint)
+        return watched
+
+    def _nth_command(self, index, count, position):
+        """Return the position of the `count`th command of the run `index` after
+        `position`."""
+        command = self.code[self.starts[index]]
+        for _ in range(count):
+            position = self.code.index(command, position + 1)
+        return position
+
+    def _run_partial(self, memory, p, index, count, watchpoints=()):
+        """Run `count` of the commands of the run `index`, or fewer if a watchpoint
+        is triggered first. Return the new tape pointer, the number of commands that
+        were run and the watchpoint triggered (or None)."""
+        sign = 1 if self.args[index] > 0 else -1
+        if self.ops[index] != _MOVE:
+            watchpoint = None
+            if self.ops[index] == _WATCHED_ADD:
+                watchpoint, ran = _first_to_trigger(
+                    self._watched(watchpoints, memory).get(p, ()),
+                    memory.cells[p],
+                    sign,
+                    count,
+                    memory.mask,
+                )
+                if ran:
+                    count = ran
+            memory.cells[p] = (memory.cells[p] + sign * count) & memory.mask
+            return p, count, watchpoint
+        target = p + sign * count
+        if 0 <= target < len(memory.cells):
+            return target, count, None
+        try:
+            return memory.grow(target), count, None
+        except ProgramRuntimeError:
+            return p, 0, None
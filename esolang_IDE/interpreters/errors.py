@@ -5,6 +5,7 @@ class ErrorTypes(enum.Enum):
     UNMATCHED_CLOSE_PAREN = enum.auto()
     UNMATCHED_OPEN_PAREN = enum.auto()
     INVALID_TAPE_CELL = enum.auto()
+    INVALID_OUTPUT = enum.auto()
 
 
 class InterpreterError(Exception):
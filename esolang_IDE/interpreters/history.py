@@ -0,0 +1,174 @@
+"""
+History of the steps of a visualiser interpreter, used to step backwards.
+
+`History` records the recent steps. Each entry is the state needed to undo a step:
+the code pointer, the tape pointer, the old value of the cell and the length of the
+output before the step. The fields are stored in parallel typed arrays with a fixed
+number of bytes per entry, rather than as tuples of Python ints, and the arrays are
+used as a ring buffer so that once `maxlen` entries are stored, each new entry
+overwrites the oldest one.
+
+`Checkpoints` records the full state of the interpreter every so many steps, so that
+it can go back further than `History` reaches by restoring a checkpoint and running
+forwards again.
+"""
+
+import bisect
+from array import array
+from typing import NamedTuple
+
+from .tape import TapeSnapshot, create_cells
+
+# Number of entries allocated at first. The arrays double in size as they fill up,
+# until they can hold `maxlen` entries.
+_INITIAL_CAPACITY = 4096
+
+
+def _zeros(typecode, size):
+    return array(typecode, [0]) * size
+
+
+class History:
+    """Stack of the states before each step, which forgets the oldest states once
+    it holds `maxlen` of them.
+
+    Attributes:
+        maxlen -- Maximum number of entries.
+        cell_bits -- Number of bits in each cell value."""
+
+    def __init__(self, maxlen: int, cell_bits: int = 8):
+        self.maxlen = maxlen
+        self.cell_bits = cell_bits
+        capacity = min(_INITIAL_CAPACITY, maxlen)
+        self._code_pointers = _zeros('i', capacity)
+        self._tape_pointers = _zeros('i', capacity)
+        self._cells = create_cells(capacity, cell_bits)
+        self._output_lengths = _zeros('q', capacity)
+        # Index of the oldest entry, and the number of entries
+        self._start = 0
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def append(self, code_pointer: int, tape_pointer: int, cell: int, output_length: int):
+        """Add an entry, overwriting the oldest one if the history is full."""
+        capacity = len(self._code_pointers)
+        if self._length == capacity:
+            if capacity < self.maxlen:
+                # The history has never been full, so the oldest entry is at index 0
+                self._grow(min(capacity * 2, self.maxlen))
+                capacity = len(self._code_pointers)
+            elif not capacity:
+                return
+        if self._length == capacity:
+            i = self._start
+            self._start = (i + 1) % capacity
+        else:
+            i = (self._start + self._length) % capacity
+            self._length += 1
+        self._code_pointers[i] = code_pointer
+        self._tape_pointers[i] = tape_pointer
+        self._cells[i] = cell
+        self._output_lengths[i] = output_length
+
+    def pop(self) -> tuple[int, int, int, int]:
+        """Remove the newest entry and return it as
+        (code_pointer, tape_pointer, cell, output_length).
+        Raise `IndexError` if the history is empty."""
+        if not self._length:
+            raise IndexError('pop from an empty history')
+        self._length -= 1
+        i = (self._start + self._length) % len(self._code_pointers)
+        return (
+            self._code_pointers[i],
+            self._tape_pointers[i],
+            self._cells[i],
+            self._output_lengths[i],
+        )
+
+    def clear(self):
+        self._start = 0
+        self._length = 0
+
+    def _grow(self, capacity):
+        extra = capacity - len(self._code_pointers)
+        self._code_pointers.extend(_zeros('i', extra))
+        self._tape_pointers.extend(_zeros('i', extra))
+        self._cells.extend(create_cells(extra, self.cell_bits))
+        self._output_lengths.extend(_zeros('q', extra))
+
+
+class Checkpoint(NamedTuple):
+    """Full state of an interpreter after a number of steps.
+
+    Attributes:
+        step -- Number of steps run before the checkpoint.
+        code_pointer -- Code pointer.
+        tape_pointer -- Tape pointer, relative to cell 0.
+        tape -- Snapshot of the tape.
+        output_length -- Length of the output.
+        input_position -- Number of input characters read."""
+
+    step: int
+    code_pointer: int
+    tape_pointer: int
+    tape: TapeSnapshot
+    output_length: int
+    input_position: int
+
+
+class Checkpoints:
+    """Checkpoints taken every `interval` steps, starting from step 0.
+
+    When there are more than `max_count` checkpoints, or their tapes take more than
+    `max_bytes`, every other checkpoint is dropped and the interval doubles, so the
+    spacing of the checkpoints grows geometrically with the length of the run while
+    the memory that they use stays bounded.
+
+    Attributes:
+        interval -- Number of steps between checkpoints.
+        next_step -- Step at which the next checkpoint is due."""
+
+    def __init__(self, interval=1 << 16, max_count=64, max_bytes=64 << 20):
+        self.interval = interval
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.next_step = 0
+        self._checkpoints: list[Checkpoint] = []
+        self._nbytes = 0
+
+    def __len__(self):
+        return len(self._checkpoints)
+
+    def add(self, checkpoint: Checkpoint):
+        self._checkpoints.append(checkpoint)
+        self._nbytes += checkpoint.tape.nbytes
+        while len(self._checkpoints) > 1 and (
+            len(self._checkpoints) > self.max_count or self._nbytes > self.max_bytes
+        ):
+            self._thin()
+        self.next_step = self._checkpoints[-1].step + self.interval
+
+    def find(self, step: int) -> Checkpoint:
+        """Return the latest checkpoint at or before `step`.
+        Raise `IndexError` if there is none."""
+        steps = [checkpoint.step for checkpoint in self._checkpoints]
+        i = bisect.bisect_right(steps, step)
+        if not i:
+            raise IndexError(f'no checkpoint before step {step}')
+        return self._checkpoints[i - 1]
+
+    def discard_after(self, step: int):
+        """Forget the checkpoints after `step`, since the run may go differently
+        from there (for example if the input is changed)."""
+        while self._checkpoints and self._checkpoints[-1].step > step:
+            self._nbytes -= self._checkpoints.pop().tape.nbytes
+        self.next_step = self._checkpoints[-1].step + self.interval if self._checkpoints else 0
+
+    def _thin(self):
+        # Keep the first checkpoint so that every step can be reached
+        kept = self._checkpoints[::2]
+        self._checkpoints = kept
+        self._nbytes = sum(checkpoint.tape.nbytes for checkpoint in kept)
+        self.interval *= 2
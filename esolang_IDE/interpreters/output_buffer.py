@@ -0,0 +1,83 @@
+"""
+Batched delivery of program output.
+
+Interpreters write each output value into an `OutputBuffer`, which stores the values
+in compact cell storage and passes them on to the output function as a single string
+once enough output has built up, or enough time has passed since the last flush.
+"""
+
+import time
+
+from . import tape
+from .errors import ErrorTypes, ProgramRuntimeError
+
+DEFAULT_FLUSH_SIZE = 4096
+DEFAULT_FLUSH_INTERVAL = 0.02
+
+# Highest code point that `chr` accepts
+_MAX_CHAR = 0x10FFFF
+
+
+class OutputBuffer:
+    """Buffer of output values which are passed to `output_func` as a string.
+
+    The buffer is flushed when `flush_size` values have been written, or when a value
+    is written or `poll` is called at least `flush_interval` seconds after the last
+    flush. Interpreters must also call `flush` before waiting for input and when the
+    program ends.
+
+    Attributes:
+        output_func -- Function called with each flushed string.
+        flush_size -- Number of buffered values which causes a flush.
+        flush_interval -- Number of seconds after which buffered values are flushed."""
+
+    def __init__(
+        self,
+        output_func,
+        cell_bits: int = 8,
+        *,
+        flush_size: int = DEFAULT_FLUSH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ):
+        self.output_func = output_func
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+
+        self._values = tape.create_cells(0, cell_bits)
+        # Only 32 bit cells can hold values which are not valid characters
+        self._max_value = _MAX_CHAR if cell_bits == 32 else tape.cell_mask(cell_bits)
+        self._last_flush = time.monotonic()
+
+    def __len__(self):
+        return len(self._values)
+
+    def write(self, value: int):
+        """Buffer the character with code point `value`. Raise `ProgramRuntimeError`
+        if there is no such character."""
+        if value > self._max_value:
+            raise ProgramRuntimeError(ErrorTypes.INVALID_OUTPUT, message=f'value: {value}')
+        values = self._values
+        values.append(value)
+        if len(values) >= self.flush_size or self._flush_due():
+            self.flush()
+
+    def poll(self):
+        """Flush the buffer if it has not been flushed for `flush_interval` seconds."""
+        if self._values and self._flush_due():
+            self.flush()
+
+    def flush(self):
+        """Pass all of the buffered output to `output_func`."""
+        self._last_flush = time.monotonic()
+        values = self._values
+        if not values:
+            return
+        if isinstance(values, bytearray):
+            text = values.decode('latin-1')
+        else:
+            text = ''.join(map(chr, values))
+        del values[:]
+        self.output_func(text)
+
+    def _flush_due(self):
+        return time.monotonic() - self._last_flush >= self.flush_interval
@@ -0,0 +1,255 @@
+"""
+Run an interpreter in a separate worker process, so that a CPU heavy program does not
+compete with the GUI for the GIL.
+
+The worker runs the program freely and communicates with the parent over a pipe:
+
+    worker -> parent:
+        ('output', text) -- Output from the program.
+        ('input',) -- Request for the next input character.
+        ('stats', instructions, tape_cells) -- Counters of the program, which are sent
+            every `_STATS_INTERVAL` seconds and before each status.
+        ('status', status, error) -- The program stopped with `RunStatus` `status`.
+            If the status is `NEEDS_INPUT`, the worker waits for a 'resume' message.
+    parent -> worker:
+        ('input', char) -- Reply to an input request (`char` is empty if there is none).
+        ('pause',) -- Stop running the program until a 'resume' message.
+        ('resume',) -- Continue after `NEEDS_INPUT` or 'pause'.
+        ('cancel',) -- Stop running the program.
+
+The worker only imports the interpreters, so the entry point of the application must
+not import Qt at module level, since the worker re-imports it when it is spawned.
+"""
+
+import functools
+import multiprocessing
+import time
+
+from .base_interpreter import BaseInterpreter, InterpreterStats, RunStatus, process_rss_kb
+from .errors import (
+    ExecutionEndedError,
+    NoInputError,
+    ProgramRuntimeError,
+    ProgramSyntaxError,
+)
+
+# Number of instructions the worker runs between checks for cancellation
+_WORKER_BATCH_SIZE = 100_000
+
+# Number of seconds between the counters sent by the worker
+_STATS_INTERVAL = 0.25
+
+
+class _Cancelled(Exception):
+    pass
+
+
+def _worker(conn, interpreter_type, code, kwargs):
+    def read():
+        conn.send(('input',))
+        while True:
+            message = conn.recv()
+            if message[0] == 'cancel':
+                raise _Cancelled
+            # The parent only pauses between replies, so pauses are ignored
+            if message[0] == 'input':
+                return message[1]
+
+    def wait_for_resume():
+        # 'resume' messages which end a pause don't count
+        pauses = 0
+        while True:
+            kind = conn.recv()[0]
+            if kind == 'cancel':
+                raise _Cancelled
+            if kind == 'pause':
+                pauses += 1
+            elif kind == 'resume':
+                if not pauses:
+                    return
+                pauses -= 1
+
+    def write(text):
+        conn.send(('output', text))
+
+    def send_stats():
+        stats = interpreter.stats()
+        conn.send(('stats', stats.instructions, stats.tape_cells))
+
+    try:
+        try:
+            interpreter = interpreter_type(code, input_func=read, output_func=write, **kwargs)
+        except ProgramSyntaxError as error:
+            conn.send(('status', RunStatus.ERROR, error))
+            return
+
+        stats_time = time.monotonic() + _STATS_INTERVAL
+        while True:
+            status = interpreter.run_for(_WORKER_BATCH_SIZE)
+            if conn.poll():
+                kind = conn.recv()[0]
+                if kind == 'cancel':
+                    return
+                if kind == 'pause':
+                    wait_for_resume()
+            if status is RunStatus.BUDGET_EXHAUSTED:
+                if time.monotonic() >= stats_time:
+                    send_stats()
+                    stats_time = time.monotonic() + _STATS_INTERVAL
+                continue
+
+            send_stats()
+            error = interpreter.error if status is RunStatus.ERROR else None
+            conn.send(('status', status, error))
+            if status is not RunStatus.NEEDS_INPUT:
+                return
+            wait_for_resume()
+    except (_Cancelled, EOFError, BrokenPipeError):
+        # Cancelled, or the parent has gone away
+        pass
+    finally:
+        conn.close()
+
+
+class ProcessInterpreter(BaseInterpreter):
+    """Interpreter which runs `interpreter_type` in a worker process. Input is requested
+    from `input_func` as the program needs it, and output is passed to `output_func` in
+    the chunks that the worker's interpreter flushes. The worker keeps running between
+    calls to `run_for` unless `pause` is called.
+
+    Use `process_interpreter_type` to get a subclass for a particular interpreter type.
+
+    Syntax errors are reported by `run_for` as a `RunStatus.ERROR` rather than raised
+    by the constructor, so that the program is only parsed in the worker.
+
+    Attributes:
+        interpreter_type -- Type of the interpreter run in the worker process.
+        output -- List of the strings of output received so far."""
+
+    interpreter_type = None
+
+    # Number of seconds that `run_for` waits for the worker to stop
+    _RUN_TIMEOUT = 0.05
+
+    def __init__(self, code, input_func=input, output_func=None, **kwargs):
+        self.input_func = input_func
+        self.output_func = output_func
+        self.output = []
+        self.finished = False
+        self._waiting_for_resume = False
+        self._paused = False
+        self._tape_cells = 0
+
+        context = multiprocessing.get_context('spawn')
+        self._conn, child_conn = context.Pipe()
+        self._process = context.Process(
+            target=_worker,
+            args=(child_conn, self.interpreter_type, code, kwargs),
+            daemon=True,
+        )
+        self._process.start()
+        child_conn.close()
+
+    def run(self):
+        while True:
+            status = self.run_for(0)
+            if status is RunStatus.ENDED:
+                return ''.join(self.output)
+            if status is not RunStatus.BUDGET_EXHAUSTED:
+                self._raise_for_status(status)
+
+    def step(self):
+        status = self.run_for(0)
+        if status is not RunStatus.BUDGET_EXHAUSTED:
+            self._raise_for_status(status)
+
+    def run_for(self, max_instructions):
+        """Relay input and output for the worker until it stops, or for at most
+        `_RUN_TIMEOUT` seconds. The worker is not limited to `max_instructions`.
+        If the pipe to the worker breaks, the program stops with `RunStatus.ERROR`."""
+        if self.finished:
+            return RunStatus.ENDED
+        try:
+            return self._relay()
+        except (EOFError, OSError):
+            # The worker has exited, or the pipe was closed under us
+            self.finished = True
+            self.error = ProgramRuntimeError(message='worker process exited unexpectedly')
+            return RunStatus.ERROR
+
+    def _relay(self):
+        if self._paused:
+            self._paused = False
+            self._conn.send(('resume',))
+        if self._waiting_for_resume:
+            self._waiting_for_resume = False
+            self._conn.send(('resume',))
+
+        deadline = time.monotonic() + self._RUN_TIMEOUT
+        while self._conn.poll(max(deadline - time.monotonic(), 0)):
+            message = self._conn.recv()
+            kind = message[0]
+            if kind == 'output':
+                self.output.append(message[1])
+                if self.output_func:
+                    self.output_func(message[1])
+            elif kind == 'input':
+                self._conn.send(('input', self.input_func() or ''))
+            elif kind == 'stats':
+                _, self.instruction_count, self._tape_cells = message
+            else:
+                _, status, error = message
+                if status is RunStatus.NEEDS_INPUT:
+                    self._waiting_for_resume = True
+                else:
+                    self.finished = True
+                    self._process.join()
+                    self.error = error
+                return status
+
+        return RunStatus.BUDGET_EXHAUSTED
+
+    def stats(self):
+        """Return the counters last sent by the worker, and its memory."""
+        rss_kb = process_rss_kb(self._process.pid) if self._process.is_alive() else None
+        return InterpreterStats(self.instruction_count, self._tape_cells, rss_kb)
+
+    def pause(self):
+        """Stop the worker until `run_for` is called again."""
+        if not self.finished and not self._paused:
+            self._paused = True
+            try:
+                self._conn.send(('pause',))
+            except (BrokenPipeError, OSError):
+                # The worker has already stopped
+                pass
+
+    def close(self):
+        if self._process.is_alive():
+            try:
+                self._conn.send(('cancel',))
+            except (BrokenPipeError, OSError):
+                pass
+            self._process.join(timeout=1)
+            if self._process.is_alive():
+                self._process.terminate()
+        self._conn.close()
+        self.finished = True
+
+    def _raise_for_status(self, status):
+        if status is RunStatus.NEEDS_INPUT:
+            raise NoInputError()
+        if status is RunStatus.ENDED:
+            raise ExecutionEndedError()
+        raise self.error
+
+
+@functools.cache
+def process_interpreter_type(interpreter_type: type[BaseInterpreter]) -> type[ProcessInterpreter]:
+    """Return the subclass of `ProcessInterpreter` which runs `interpreter_type`.
+    (The same class is returned for the same `interpreter_type`.)"""
+    return type(
+        f'Process{interpreter_type.__name__}',
+        (ProcessInterpreter,),
+        {'interpreter_type': interpreter_type},
+    )
@@ -0,0 +1,74 @@
+"""
+Cache of the results of compiling programs, so that running an unchanged program
+again (or the same program in another tab) does not compile it again.
+
+Entries are keyed by a hash of the source code together with the kind of result and
+any options that it depends on, and the least recently used entries are evicted once
+the total size of the cached sources is over `max_size` characters.
+"""
+
+import collections
+import hashlib
+import threading
+from typing import Any, Callable, Hashable
+
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+
+def source_hash(code: str) -> bytes:
+    """Return a hash which identifies the source code `code`."""
+    return hashlib.blake2b(code.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+
+class ProgramCache:
+    """LRU cache of compiled programs.
+
+    Attributes:
+        max_size -- Maximum total length of the sources of the cached entries.
+        size -- Current total length of the sources of the cached entries."""
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        self.size = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, code: str, options: Hashable, create: Callable[[str], Any]) -> Any:
+        """Return the cached result for `code` and `options`, or if there is none,
+        cache and return `create(code)`. `options` must identify both the kind of
+        result and every option that it depends on.
+
+        Exceptions raised by `create` are not cached."""
+        key = (source_hash(code), len(code), options)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        # Compile outside of the lock, since this can take a long time
+        value = create(code)
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = value
+                self.size += len(code)
+                self._evict()
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _evict(self):
+        # Always keep the most recent entry, even if it is bigger than `max_size`
+        while self.size > self.max_size and len(self._entries) > 1:
+            (_, code_len, _), _ = self._entries.popitem(last=False)
+            self.size -= code_len
+
+
+# Cache shared by all interpreters
+program_cache = ProgramCache()
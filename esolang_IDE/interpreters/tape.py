@@ -0,0 +1,183 @@
+"""
+Compact storage for the tape of cell based languages.
+
+8 bit cells are stored in a `bytearray`, and 16 and 32 bit cells in an `array.array`
+of the matching item size, so that the tape uses a fixed number of bytes per cell
+rather than a pointer to a Python int.
+
+`Tape` wraps this storage and grows it a chunk at a time.
+"""
+
+from array import array
+from typing import NamedTuple
+
+from .errors import ErrorTypes, ProgramRuntimeError
+
+CELL_BITS = (8, 16, 32)
+
+
+def _array_typecode(cell_bits):
+    for typecode in 'BHIL':
+        if array(typecode).itemsize * 8 == cell_bits:
+            return typecode
+    raise ValueError(f'no array typecode with {cell_bits} bit items')
+
+
+def create_cells(size: int, cell_bits: int = 8):
+    """Return storage for `size` cells of `cell_bits` bits, all set to 0."""
+    if cell_bits not in CELL_BITS:
+        raise ValueError(f'cell_bits must be one of {CELL_BITS}, not {cell_bits}')
+    if cell_bits == 8:
+        return bytearray(size)
+    return array(_array_typecode(cell_bits), [0]) * size
+
+
+def cell_mask(cell_bits: int) -> int:
+    """Return the mask that wraps a value around to fit in a cell of `cell_bits` bits.
+    (`value & mask` is equivalent to `value % 2 ** cell_bits`.)"""
+    return (1 << cell_bits) - 1
+
+
+DEFAULT_CHUNK_SIZE = 4096
+DEFAULT_MAX_CELLS = 1 << 24
+
+# Number of cells compared per slice when scanning with a stride
+_SCAN_WINDOW = 4096
+
+
+class TapeSnapshot(NamedTuple):
+    """Copy of the state of a `Tape`.
+
+    Attributes:
+        cells -- Copy of the storage of the cells.
+        origin -- Index in `cells` of cell 0."""
+
+    cells: object
+    origin: int
+
+    @property
+    def nbytes(self):
+        return len(self.cells) * getattr(self.cells, 'itemsize', 1)
+
+
+class Tape:
+    """Tape which is allocated in chunks of `chunk_size` cells as it is used.
+
+    Interpreters index `cells` directly. `origin` is the index in `cells` of cell 0,
+    which only changes when the tape grows to the left. `cells` is always grown in
+    place, so references to it stay valid.
+
+    Attributes:
+        cells -- Storage of the cells (see `create_cells`).
+        origin -- Index in `cells` of cell 0.
+        mask -- Mask that wraps a value around to fit in a cell.
+        max_cells -- Maximum number of cells that the tape can grow to.
+        bidirectional -- Whether the tape can grow to the left of cell 0."""
+
+    def __init__(
+        self,
+        cell_bits: int = 8,
+        *,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        max_cells: int = DEFAULT_MAX_CELLS,
+        bidirectional: bool = False,
+    ):
+        self.cell_bits = cell_bits
+        self.mask = cell_mask(cell_bits)
+        self.chunk_size = chunk_size
+        self.max_cells = max_cells
+        self.bidirectional = bidirectional
+
+        self.cells = create_cells(min(chunk_size, max_cells), cell_bits)
+        self.origin = 0
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __getitem__(self, index):
+        return self.cells[index]
+
+    def grow(self, index: int) -> int:
+        """Allocate enough chunks for `index` to be a valid index of `cells`, and
+        return the index of that same cell after growing. (This is only different
+        from `index` if the tape grew to the left.)
+
+        Raise `ProgramRuntimeError` if the tape is not allowed to grow that far."""
+        size = len(self.cells)
+        if 0 <= index < size:
+            return index
+
+        if index >= size:
+            new_size = self._chunked(index + 1)
+            if index >= self.max_cells:
+                self._out_of_bounds(index)
+            self.cells.extend(create_cells(min(new_size, self.max_cells) - size, self.cell_bits))
+            return index
+
+        if not self.bidirectional:
+            self._out_of_bounds(index)
+        shift = self._chunked(-index)
+        if size + shift > self.max_cells:
+            shift = self.max_cells - size
+            if index + shift < 0:
+                self._out_of_bounds(index)
+        self.cells[0:0] = create_cells(shift, self.cell_bits)
+        self.origin += shift
+        return index + shift
+
+    def snapshot(self) -> TapeSnapshot:
+        return TapeSnapshot(self.cells[:], self.origin)
+
+    def restore(self, snapshot: TapeSnapshot):
+        """Set the cells and origin back to those of `snapshot`. (`cells` is changed
+        in place, so references to it stay valid.)"""
+        self.cells[:] = snapshot.cells
+        self.origin = snapshot.origin
+
+    def scan(self, index: int, stride: int, grow: bool = True) -> int:
+        """Return the index of the first cell with a value of 0 out of
+        `index`, `index + stride`, `index + 2 * stride`... (`stride` can be negative.)
+
+        If there is no such cell, grow the tape as if the tape pointer moved off the
+        end of the tape and return the index of the new cell. If `grow` is false,
+        return the index that the cell would have without growing the tape, which is
+        outside the tape."""
+        cells = self.cells
+        if stride == 1 and isinstance(cells, bytearray):
+            found = cells.find(0, index)
+        elif stride == -1 and isinstance(cells, bytearray):
+            found = cells.rfind(0, 0, index + 1)
+        else:
+            found = self._scan_windows(index, stride)
+
+        if found != -1:
+            return found
+
+        # Every cell off the end of the tape is 0, so the scan stops at the first one
+        if stride > 0:
+            found = index + -(-(len(cells) - index) // stride) * stride
+        else:
+            found = index - (index // -stride + 1) * -stride
+        return self.grow(found) if grow else found
+
+    def _scan_windows(self, index, stride):
+        """Scan in slices of `_SCAN_WINDOW` cells so that the comparisons are
+        done in C without copying the whole tape."""
+        cells = self.cells
+        size = len(cells)
+        window = _SCAN_WINDOW * stride
+        while 0 <= index < size:
+            stop = index + window
+            cells_slice = cells[index : stop if stop >= 0 else None : stride]
+            try:
+                return index + cells_slice.index(0) * stride
+            except ValueError:
+                index = stop
+        return -1
+
+    def _chunked(self, cells):
+        """Return `cells` rounded up to a whole number of chunks."""
+        return -(-cells // self.chunk_size) * self.chunk_size
+
+    def _out_of_bounds(self, index):
+        raise ProgramRuntimeError(ErrorTypes.INVALID_TAPE_CELL, location=index - self.origin)
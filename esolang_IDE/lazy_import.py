@@ -0,0 +1,29 @@
+"""
+Helpers for importing modules only when they are first used, so that the languages
+registered in `filetypes` and the classes exported by each package don't slow down
+startup.
+"""
+
+import functools
+import importlib
+
+
+@functools.cache
+def resolve(entry_point: str):
+    """Import and return the object named by `entry_point` ('module:attribute')."""
+    module_name, _, attribute = entry_point.partition(':')
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def lazy_exports(package: str, exports: dict[str, str]):
+    """Return a module `__getattr__` for `package` which imports each of the names
+    in `exports` from its module (relative to `package`) when it is first used, so
+    that a package can export the classes of each language without importing them.
+    """
+
+    def __getattr__(name):
+        if name in exports:
+            return getattr(importlib.import_module(exports[name], package), name)
+        raise AttributeError(f'module {package!r} has no attribute {name!r}')
+
+    return __getattr__
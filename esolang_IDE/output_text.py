@@ -1,4 +1,7 @@
 import collections
+import threading
+from typing import Sequence
+
 from PyQt5 import QtCore, QtGui, QtWidgets
 
 
@@ -12,22 +15,59 @@ class OutputText(QtWidgets.QPlainTextEdit):
         self.setFont(font)
         self.setReadOnly(True)
         self.setMaximumBlockCount(1000)
-        # self.setMaximumBlockCount(100)
         self.setLineWrapMode(QtWidgets.QPlainTextEdit.NoWrap)
 
+        # Length of the output shown, including any lines which were removed from
+        # the start of the document because of the maximum block count
+        self._output_length = 0
+
     def add_text(self, text):
         self.moveCursor(QtGui.QTextCursor.End)
         self.insertPlainText(text)
         self.ensureCursorVisible()
+        self._output_length += len(text)
 
     def set_text(self, text):
         self.setPlainText(text)
         self.moveCursor(QtGui.QTextCursor.End)
         self.ensureCursorVisible()
+        self._output_length = len(text)
+
+    def clear(self):
+        self._output_length = 0
+        return super().clear()
+
+    def show_output(self, output: Sequence[str], unchanged: int):
+        """Show `output` (a sequence of strings, such as characters), where the
+        first `unchanged` characters are the same as the output last shown, by
+        removing the rest of the old output and adding the rest of the new one."""
+        removed = self._output_length - unchanged
+        if removed <= 0 and len(output) == self._output_length:
+            return
+        if removed > self.document().characterCount() - 1:
+            # The characters to remove were already dropped from the document by
+            # the maximum block count, so `_output_length` no longer matches what
+            # is left of it. Showing all of `output` again sets it back to the
+            # length of the output, and the document trims itself as usual
+            self.set_text(''.join(output))
+            return
+
+        if removed > 0:
+            cursor = self.textCursor()
+            cursor.movePosition(QtGui.QTextCursor.End)
+            cursor.movePosition(
+                QtGui.QTextCursor.PreviousCharacter, QtGui.QTextCursor.KeepAnchor, removed
+            )
+            cursor.removeSelectedText()
+            self._output_length = unchanged
+        self.add_text(''.join(output[unchanged:]))
 
 
 class RunnerOutputText(OutputText):
 
+    # Maximum number of characters added to the text each time the timer fires
+    _MAX_UPDATE_CHARS = 500
+
     interrupt = QtCore.pyqtSignal()
     completed = QtCore.pyqtSignal()
 
@@ -38,7 +78,11 @@ class RunnerOutputText(OutputText):
         self._timer.setInterval(10)
         self._timer.timeout.connect(self._add_from_buffer)
 
+        # Output of the runner thread waiting to be added to the text, and the
+        # number of characters in it. Both are only changed with `_lock` held
         self._buffer = collections.deque()
+        self._buffered_chars = 0
+        self._lock = threading.Lock()
 
         self._stopped = False
 
@@ -54,12 +98,24 @@ class RunnerOutputText(OutputText):
 
     def clear(self):
 
-        self._buffer.clear()
+        self._clear_buffer()
 
         return super().clear()
 
     def buffer_text(self, text):
-        self._buffer.appendleft(text)
+        """Add `text` to the buffer. Called from the runner thread."""
+        with self._lock:
+            self._buffer.appendleft(text)
+            self._buffered_chars += len(text)
+
+    def buffered_chars(self):
+        """Return the number of characters waiting to be added to the text."""
+        return self._buffered_chars
+
+    def _clear_buffer(self):
+        with self._lock:
+            self._buffer.clear()
+            self._buffered_chars = 0
 
     def _add_from_buffer(self):
         if not self._buffer:
@@ -67,16 +123,26 @@ class RunnerOutputText(OutputText):
                 self.completed.emit()
                 self._timer.stop()
             return
-        length = min(100, len(self._buffer))
-        text = ''.join(self._buffer.pop() for _ in range(length))
-        self.add_text(text)
+        # Interpreters buffer their output in chunks, so split up large chunks
+        chunks = []
+        remaining = self._MAX_UPDATE_CHARS
+        with self._lock:
+            while self._buffer and remaining > 0:
+                chunk = self._buffer.pop()
+                if len(chunk) > remaining:
+                    self._buffer.append(chunk[remaining:])
+                    chunk = chunk[:remaining]
+                chunks.append(chunk)
+                remaining -= len(chunk)
+            self._buffered_chars -= self._MAX_UPDATE_CHARS - remaining
+        self.add_text(''.join(chunks))
 
     def stop(self):
         self._stopped = True
 
     def stop_immediate(self):
         self._stopped = True
-        self._buffer.clear()
+        self._clear_buffer()
 
     def continue_(self):
         self._stopped = False
@@ -0,0 +1,54 @@
+from PyQt5 import QtCore, QtWidgets
+
+import esolang_IDE.interpreters as interpreters
+
+
+class ProfileTable(QtWidgets.QTableWidget):
+    """Sortable table of the loops which ran the most instructions."""
+
+    # Emitted with the (position, chars) of a loop when its row is double clicked
+    loop_selected = QtCore.pyqtSignal(int, int)
+
+    _HEADERS = ('Line', 'Column', 'Iterations', 'Instructions', '% of instructions')
+    _OPS_COLUMN = 3
+
+    # Maximum number of loops shown
+    _MAX_ROWS = 100
+
+    def __init__(self, parent=None):
+        super().__init__(0, len(self._HEADERS), parent)
+
+        self.setHorizontalHeaderLabels(self._HEADERS)
+        self.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.ResizeToContents)
+        self.verticalHeader().hide()
+        self.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.setSortingEnabled(True)
+
+        self.cellDoubleClicked.connect(self._row_double_clicked)
+
+    def set_profile(self, loops: list[tuple[int, int, interpreters.LoopProfile]]):
+        """Show the loops with the most instructions out of `loops`, which are
+        (line, column, profile) tuples."""
+        total_ops = sum(loop.ops for _, _, loop in loops) or 1
+        loops = sorted(loops, key=lambda item: item[2].ops, reverse=True)[: self._MAX_ROWS]
+
+        # Rows would be moved while they are filled in if sorting was enabled
+        self.setSortingEnabled(False)
+        self.setRowCount(len(loops))
+        for row, (line, column, loop) in enumerate(loops):
+            values = (line + 1, column + 1, loop.iterations, loop.ops, loop.ops / total_ops * 100)
+            for column_index, value in enumerate(values):
+                item = QtWidgets.QTableWidgetItem()
+                if isinstance(value, float):
+                    item.setData(QtCore.Qt.DisplayRole, round(value, 1))
+                else:
+                    item.setData(QtCore.Qt.DisplayRole, value)
+                item.setData(QtCore.Qt.UserRole, loop.location)
+                self.setItem(row, column_index, item)
+        self.setSortingEnabled(True)
+        self.sortItems(self._OPS_COLUMN, QtCore.Qt.DescendingOrder)
+
+    def _row_double_clicked(self, row, column):
+        position, chars = self.item(row, column).data(QtCore.Qt.UserRole)
+        self.loop_selected.emit(position, chars)
@@ -0,0 +1,201 @@
+"""
+Run a program from the command line without the GUI:
+
+    python -m esolang_IDE.run prog.b < input > output
+
+Input is read from stdin and output is written to stdout as bytes. With 8 bit cells,
+each byte is a cell value. With wider cells, input and output are encoded as UTF-8,
+so each character is a cell value. Only `esolang_IDE.interpreters` is imported, so
+PyQt does not need to be installed.
+
+Exit status:
+    0 -- The program ended.
+    1 -- The program stopped with a runtime error, or ran out of input with
+        `--eof error`.
+    2 -- The command line arguments or the program's syntax are invalid, or the
+        program could not be read.
+"""
+
+import argparse
+import codecs
+import sys
+
+import esolang_IDE.interpreters as interpreters
+from esolang_IDE.interpreters import tape
+
+ENGINES = {
+    'compiled': interpreters.CompiledBrainfuckInterpreter,
+    'fast': interpreters.FastBrainfuckInterpreter,
+}
+
+EOF_BEHAVIOURS = ('zero', 'error')
+
+_ERROR_MESSAGES = {
+    interpreters.ErrorTypes.UNMATCHED_OPEN_PAREN: 'Unmatched opening parentheses',
+    interpreters.ErrorTypes.UNMATCHED_CLOSE_PAREN: 'Unmatched closing parentheses',
+    interpreters.ErrorTypes.INVALID_TAPE_CELL: 'Tape pointer out of bounds',
+    interpreters.ErrorTypes.INVALID_OUTPUT: 'Output value is not a valid character',
+}
+
+# Number of instructions run between checks for the end of the program
+_BATCH_SIZE = 100_000
+_READ_SIZE = 65536
+
+
+def error_message(error: interpreters.ProgramError) -> str:
+    """Return a message describing `error`."""
+    message = _ERROR_MESSAGES.get(error.error, 'Error')
+    if error.location is not None:
+        message = f'{message} at location {error.location}'
+    return message
+
+
+class _StreamInput:
+    """Input function which reads stdin a chunk at a time and decodes it with
+    `encoding`. All of the output is flushed before reading, since reading can block
+    until the user types. Bytes which are invalid in `encoding` are read as U+FFFD."""
+
+    def __init__(self, stream, flush, eof_char, encoding='latin-1'):
+        self.stream = stream
+        self.flush = flush
+        self.eof_char = eof_char
+        self._decoder = codecs.getincrementaldecoder(encoding)('replace')
+        self._chunk = ''
+        self._index = 0
+        self._eof = False
+
+    def __call__(self):
+        while self._index == len(self._chunk):
+            if self._eof:
+                return self.eof_char
+            self.flush()
+            data = self.stream.read1(_READ_SIZE)
+            # A chunk can end part way through a character, which is decoded with
+            # the next chunk
+            self._chunk = self._decoder.decode(data, final=not data)
+            self._index = 0
+            if not data:
+                self._eof = True
+        char = self._chunk[self._index]
+        self._index += 1
+        return char
+
+
+def run_program(
+    code: str,
+    stdin,
+    stdout,
+    stderr,
+    *,
+    engine: str = 'compiled',
+    cell_bits: int = 8,
+    max_cells: int = tape.DEFAULT_MAX_CELLS,
+    bidirectional: bool = False,
+    eof: str = 'zero',
+) -> int:
+    """Run `code`, reading input from the binary stream `stdin` and writing output to
+    the binary stream `stdout`. Errors are written to the text stream `stderr`.
+    Return the exit status."""
+    # Input and output of 8 bit cells are raw bytes
+    encoding = 'latin-1' if cell_bits == 8 else 'utf-8'
+    eof_char = '\0' if eof == 'zero' else ''
+
+    def write(text):
+        stdout.write(text.encode(encoding, 'surrogatepass'))
+
+    def flush():
+        interpreter.flush_output()
+        stdout.flush()
+
+    try:
+        interpreter = ENGINES[engine](
+            code,
+            input_func=_StreamInput(stdin, flush, eof_char, encoding),
+            output_func=write,
+            cell_bits=cell_bits,
+            max_cells=max_cells,
+            bidirectional=bidirectional,
+        )
+    except interpreters.ProgramSyntaxError as error:
+        print(f'error: {error_message(error)}', file=stderr)
+        return 2
+
+    status = interpreters.RunStatus.BUDGET_EXHAUSTED
+    while status is interpreters.RunStatus.BUDGET_EXHAUSTED:
+        status = interpreter.run_for(_BATCH_SIZE)
+    stdout.flush()
+
+    if status is interpreters.RunStatus.NEEDS_INPUT:
+        print('error: No input', file=stderr)
+        return 1
+    if status is interpreters.RunStatus.ERROR:
+        print(f'error: {error_message(interpreter.error)}', file=stderr)
+        return 1
+    return 0
+
+
+def _parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m esolang_IDE.run',
+        description='Run a Brainfuck program, reading input from stdin and '
+        'writing output to stdout.',
+    )
+    parser.add_argument('program', help='path of the program to run')
+    parser.add_argument(
+        '--engine', choices=ENGINES, default='compiled', help='interpreter to use'
+    )
+    parser.add_argument(
+        '--cell-bits',
+        type=int,
+        choices=tape.CELL_BITS,
+        default=8,
+        help='size of each cell. With 8 bits, input and output are raw bytes, and with '
+        'more bits they are UTF-8 characters',
+    )
+    parser.add_argument(
+        '--max-cells',
+        type=int,
+        default=tape.DEFAULT_MAX_CELLS,
+        help='maximum number of cells that the tape can grow to',
+    )
+    parser.add_argument(
+        '--bidirectional',
+        action='store_true',
+        help='allow the tape to grow to the left of the first cell',
+    )
+    parser.add_argument(
+        '--eof',
+        choices=EOF_BEHAVIOURS,
+        default='zero',
+        help='read 0 at the end of the input, or stop with an error',
+    )
+    return parser
+
+
+def main(argv=None) -> int:
+    args = _parser().parse_args(argv)
+    try:
+        with open(args.program, encoding='utf-8') as file:
+            code = file.read()
+    except OSError as error:
+        print(f'error: {error}', file=sys.stderr)
+        return 2
+
+    try:
+        return run_program(
+            code,
+            sys.stdin.buffer,
+            sys.stdout.buffer,
+            sys.stderr,
+            engine=args.engine,
+            cell_bits=args.cell_bits,
+            max_cells=args.max_cells,
+            bidirectional=args.bidirectional,
+            eof=args.eof,
+        )
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Metrics of a program run by the code runner, which are published periodically
+while it runs.
+
+They are shown in the status bar of the code runner, and logged to the
+`esolang_IDE.runner_metrics` logger at INFO level. The metrics are also attached to
+each log record as a dict in its `metrics` attribute, so that a handler can record
+them without parsing the message.
+"""
+
+import logging
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RunnerMetrics(NamedTuple):
+    """
+    Attributes:
+        instructions -- Number of commands of the source code run, which is the same
+            for every engine (see `interpreters.brainfuck_ir.StepCosts`).
+        instructions_per_second -- Rate of instructions since the last metrics.
+        output_chars -- Number of characters output by the program.
+        buffered_chars -- Number of output characters not yet shown by the runner.
+        tape_cells -- Number of cells allocated on the tape.
+        rss_kb -- Resident memory of the process running the program in kilobytes,
+            or None if it is not known."""
+
+    instructions: int = 0
+    instructions_per_second: float = 0.0
+    output_chars: int = 0
+    buffered_chars: int = 0
+    tape_cells: int = 0
+    rss_kb: Optional[int] = None
+
+
+def _abbreviate(value):
+    for divisor, suffix in ((1e9, 'G'), (1e6, 'M'), (1e3, 'k')):
+        if value >= divisor:
+            return f'{value / divisor:.1f}{suffix}'
+    return f'{value:.0f}'
+
+
+def format_metrics(metrics: RunnerMetrics) -> str:
+    parts = [
+        f'{_abbreviate(metrics.instructions)} instructions'
+        f' ({_abbreviate(metrics.instructions_per_second)}/s)',
+        f'output {_abbreviate(metrics.output_chars)} chars'
+        f' ({_abbreviate(metrics.buffered_chars)} buffered)',
+        f'tape {_abbreviate(metrics.tape_cells)} cells',
+    ]
+    if metrics.rss_kb is not None:
+        parts.append(f'memory {metrics.rss_kb / 1024:.1f} MB')
+    return ' | '.join(parts)
+
+
+def log_metrics(metrics: RunnerMetrics):
+    logger.info('%s', format_metrics(metrics), extra={'metrics': metrics._asdict()})
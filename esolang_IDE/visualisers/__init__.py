@@ -1,8 +1,13 @@
+from esolang_IDE.lazy_import import lazy_exports
+
 from .main_visualiser import MainVisualiser
 from .commands_widget import CommandsWidget
 from .io_widget import IOWidget
-from .visualiser_widgets import (
-    BaseVisualiserWidget,
-    NoVisualiserWidget,
-    BrainfuckVisualiserWidget,
+from .visualiser_widgets import BaseVisualiserWidget, NoVisualiserWidget
+
+__getattr__ = lazy_exports(
+    __name__,
+    {
+        'BrainfuckVisualiserWidget': '.visualiser_widgets.brainfuck',
+    },
 )
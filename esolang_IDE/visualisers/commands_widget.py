@@ -138,6 +138,7 @@ class CommandsWidget(QtWidgets.QWidget):
         self._display_buttons(
             self._run_button,
             self._step_button,
+            self._continue_button,
         )
 
     def _display_buttons(self, a=None, b=None, c=None, d=None):
@@ -1,2 +1,10 @@
+from esolang_IDE.lazy_import import lazy_exports
+
 from .base_visualiser_widget import BaseVisualiserWidget, NoVisualiserWidget
-from .brainfuck import BrainfuckVisualiserWidget
+
+__getattr__ = lazy_exports(
+    __name__,
+    {
+        'BrainfuckVisualiserWidget': '.brainfuck',
+    },
+)
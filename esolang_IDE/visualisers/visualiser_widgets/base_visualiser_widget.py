@@ -33,6 +33,12 @@ class BaseVisualiserWidget(QtWidgets.QWidget):
         # Should be overidden in a subclass
         pass
 
+    def get_watchpoints(self):
+        """Return the watchpoints set on the visual, as a list of
+        `interpreters.Watchpoint`."""
+        # Should be overidden in a subclass that supports watchpoints
+        return []
+
 
 class NoVisualiserWidget(BaseVisualiserWidget):
     pass
@@ -1,5 +1,7 @@
 from PyQt5 import QtCore, QtWidgets, QtGui
 
+import esolang_IDE.interpreters as interpreters
+
 from .base_visualiser_widget import BaseVisualiserWidget
 
 
@@ -15,6 +17,8 @@ class BrainfuckVisualiserWidget(BaseVisualiserWidget):
         self.table_model = BrainfuckTableModel()
         self.table.setModel(self.table_model)
         self.table.size_changed.connect(self.table_model.set_columns)
+        self.table.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
+        self.table.customContextMenuRequested.connect(self._show_cell_menu)
 
         layout = QtWidgets.QHBoxLayout()
         layout.addWidget(self.table)
@@ -30,9 +34,45 @@ class BrainfuckVisualiserWidget(BaseVisualiserWidget):
             self.reset_visual()
 
     def update_visual(self):
+        if not self.table_model.has_changes():
+            return
         self.table_model.display_changes()
         self.table.scrollTo(self.table_model.get_current_index())
 
+    def get_watchpoints(self):
+        return self.table_model.get_watchpoints()
+
+    def _show_cell_menu(self, point):
+        index = self.table.indexAt(point)
+        if not index.isValid():
+            return
+        cell = self.table_model.cell_index(index)
+
+        menu = QtWidgets.QMenu(self.table)
+        changes_action = menu.addAction(f'Stop when cell {cell} changes')
+        equals_action = menu.addAction(f'Stop when cell {cell} equals...')
+        remove_action = menu.addAction('Remove watchpoint')
+        remove_action.setEnabled(self.table_model.get_watchpoint(cell) is not None)
+
+        action = menu.exec_(self.table.viewport().mapToGlobal(point))
+        if action is changes_action:
+            self.table_model.set_watchpoint(interpreters.Watchpoint(cell))
+        elif action is equals_action:
+            # `getInt` only goes up to 2**31 - 1, which is less than a 32 bit cell
+            value, ok = QtWidgets.QInputDialog.getDouble(
+                self,
+                'Watchpoint',
+                f'Stop when cell {cell} equals:',
+                0,
+                0,
+                self.table_model.max_value(),
+                0,
+            )
+            if ok:
+                self.table_model.set_watchpoint(interpreters.Watchpoint(cell, int(value)))
+        elif action is remove_action:
+            self.table_model.remove_watchpoint(cell)
+
 
 class BrainfuckTable(QtWidgets.QTableView):
     """Table that displays the tape.
@@ -70,22 +110,40 @@ class BrainfuckTable(QtWidgets.QTableView):
 
 
 class BrainfuckTableModel(QtCore.QAbstractTableModel):
-    """AbstractTableModel for BrainfuckTable"""
+    """AbstractTableModel for BrainfuckTable
+
+    Only the cells which changed are updated by `display_changes`, using the
+    `changed_cells` of each `interpreters.TapeVisual`. The model keeps the snapshot
+    of the tape in the last `interpreters.TapeVisual`, rather than the tape of the
+    interpreter, which may be changed by another thread while the view is drawn."""
 
     _current_cell_brush = QtGui.QBrush(QtGui.QColor('red'))
+    _watched_cell_brush = QtGui.QBrush(QtGui.QColor('lightblue'))
+
+    # Largest value of a cell until a tape is shown, which is that of the 8 bit
+    # cells that `interpreters.BrainfuckInterpreter` has by default
+    _DEFAULT_MAX_VALUE = 255
+
+    # Maximum number of changed cells which are updated separately. If more cells
+    # changed, the rectangle containing all of them is updated instead.
+    _MAX_SEPARATE_CHANGES = 50
 
     def __init__(self, parent=None):
         super().__init__(parent=parent)
 
         self._columns = 5
+        # Watchpoints by cell, which are kept when the data is reset
+        self._watchpoints = {}
+        self._max_value = self._DEFAULT_MAX_VALUE
 
         self.reset()
 
     def rowCount(self, parent):
         """Return the number of rows."""
-        return len(self._tape) // self._columns + (
-            1 if len(self._tape) % self._columns else 0
-        )
+        return self._rows
+
+    def _rows_for(self, cells):
+        return cells // self._columns + (1 if cells % self._columns else 0)
 
     def columnCount(self, parent):
         """Return the number of columns."""
@@ -94,14 +152,19 @@ class BrainfuckTableModel(QtCore.QAbstractTableModel):
     def data(self, index, role):
         """If `role` is `DisplayRole`, then return value of the cell at `index`.
         If `role` is `BackgroundRole`, then return a coloured background if `index`
-        if the current cell."""
-        cell_index = index.row() * self._columns + index.column()
+        if the current cell or a watched cell."""
+        cell_index = self.cell_index(index)
         if role == QtCore.Qt.DisplayRole:
             if 0 <= cell_index < len(self._tape):
                 return self._tape[cell_index]
         elif role == QtCore.Qt.BackgroundRole:
             if cell_index == self._current_cell_index:
                 return self._current_cell_brush
+            if cell_index in self._watchpoints:
+                return self._watched_cell_brush
+        elif role == QtCore.Qt.ToolTipRole:
+            if cell_index in self._watchpoints:
+                return f'Stop when {self._watchpoints[cell_index].describe()}'
         return QtCore.QVariant()
 
     def headerData(self, section, orientation, role):
@@ -115,22 +178,80 @@ class BrainfuckTableModel(QtCore.QAbstractTableModel):
 
     def reset(self):
         """Reset data."""
+        self.beginResetModel()
         self._tape = [0] * 20
         self._current_cell_index = -1
-
-    def set_tape(self, visual_info):
-        """`interpreter` should be a BFInterpreter.
-        Set the current data according to the data of the interpreter."""
-        self._tape, self._current_cell_index = visual_info
+        # Version of the last `interpreters.TapeVisual`
+        self._version = None
+        self._rows = self._rows_for(len(self._tape))
+        # Cells to update when the changes are displayed, or None to update all
+        # of them
+        self._changed_cells = set()
+        self.endResetModel()
+
+    def set_tape(self, visual_info: interpreters.TapeVisual):
+        """Set the current data according to the visual information of the
+        interpreter. Do nothing if it is the same version as the last one."""
+        tape, current_cell_index, changed_cells, version = visual_info
+        if version == self._version:
+            return
+        self._version = version
+        if changed_cells is None or self._changed_cells is None:
+            self._changed_cells = None
+        else:
+            self._changed_cells |= changed_cells
+            # The current cell is highlighted
+            self._changed_cells.update((self._current_cell_index, current_cell_index))
+        self._tape, self._current_cell_index = tape, current_cell_index
+        self._max_value = visual_info.max_value
+
+    def has_changes(self) -> bool:
+        """Return whether there are changes which `display_changes` would show."""
+        return (
+            self._changed_cells is None
+            or bool(self._changed_cells)
+            or self._rows != self._rows_for(len(self._tape))
+        )
 
     def display_changes(self):
         """Method called when changed to layout should be displayed."""
-        self.layoutChanged.emit()
+        changed_cells = self._changed_cells
+        self._changed_cells = set()
+
+        rows = self._rows_for(len(self._tape))
+        if rows > self._rows:
+            if changed_cells is not None:
+                # The last row may not have been full
+                changed_cells.update(
+                    range((self._rows - 1) * self._columns, self._rows * self._columns)
+                )
+            self.beginInsertRows(QtCore.QModelIndex(), self._rows, rows - 1)
+            self._rows = rows
+            self.endInsertRows()
+        elif rows < self._rows:
+            self.beginRemoveRows(QtCore.QModelIndex(), rows, self._rows - 1)
+            self._rows = rows
+            self.endRemoveRows()
+
+        if not self._rows:
+            return
+        if changed_cells is None:
+            self.dataChanged.emit(
+                self.createIndex(0, 0), self.createIndex(self._rows - 1, self._columns - 1)
+            )
+            return
 
-        # TODO:
-        #   Store the specific changes whenever `set_tape` is called, then
-        #   emit dataChanged instead: https://doc.qt.io/qtforpython/PySide2/QtCore/QAbstractItemModel.html?highlight=qabstractitemmodel#PySide2.QtCore.PySide2.QtCore.QAbstractItemModel.dataChanged
-        #   This may make it more efficient
+        cells = [cell for cell in changed_cells if 0 <= cell < self._rows * self._columns]
+        if len(cells) <= self._MAX_SEPARATE_CHANGES:
+            for cell in cells:
+                self._cell_changed(cell)
+            return
+        rows = [cell // self._columns for cell in cells]
+        columns = [cell % self._columns for cell in cells]
+        self.dataChanged.emit(
+            self.createIndex(min(rows), min(columns)),
+            self.createIndex(max(rows), max(columns)),
+        )
 
     def set_columns(self, columns):
         """Set the number of columns.
@@ -138,9 +259,39 @@ class BrainfuckTableModel(QtCore.QAbstractTableModel):
         if columns == self._columns:
             return
 
+        self.layoutAboutToBeChanged.emit()
         self._columns = columns
+        self._rows = self._rows_for(len(self._tape))
         self.layoutChanged.emit()
 
+    def cell_index(self, index):
+        """Return the index of the cell at the QModelIndex `index`."""
+        return index.row() * self._columns + index.column()
+
+    def get_watchpoints(self) -> list[interpreters.Watchpoint]:
+        return list(self._watchpoints.values())
+
+    def get_watchpoint(self, cell):
+        return self._watchpoints.get(cell)
+
+    def max_value(self) -> int:
+        """Return the largest value of a cell of the tape, which a watchpoint can
+        wait for."""
+        return self._max_value
+
+    def set_watchpoint(self, watchpoint: interpreters.Watchpoint):
+        """Set the watchpoint of a cell, replacing any it already had."""
+        self._watchpoints[watchpoint.cell] = watchpoint
+        self._cell_changed(watchpoint.cell)
+
+    def remove_watchpoint(self, cell):
+        if self._watchpoints.pop(cell, None) is not None:
+            self._cell_changed(cell)
+
+    def _cell_changed(self, cell):
+        index = self.createIndex(cell // self._columns, cell % self._columns)
+        self.dataChanged.emit(index, index)
+
     def get_current_index(self):
         """Return a QModelIndex of the current cell."""
         return self.createIndex(
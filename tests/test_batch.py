@@ -0,0 +1,113 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from esolang_IDE import batch
+from esolang_IDE.interpreters import BrainfuckInterpreter, RunStatus
+
+SAMPLE_PROGRAMS_PATH = (Path(__file__).parent / 'sample_programs').resolve()
+
+
+def write_program(tmp_path, name, code):
+    path = tmp_path / name
+    path.write_text(code)
+    return str(path)
+
+
+@pytest.mark.parametrize('engine', ['compiled', 'fast'])
+@pytest.mark.parametrize(
+    'code, options, status, error',
+    [
+        (',>,>,.<.<.', {}, 'ended', None),
+        ('+[,.]', {'eof': 'error'}, 'needs_input', None),
+        ('+<', {}, 'error', 'INVALID_TAPE_CELL'),
+        ('[', {}, 'error', 'UNMATCHED_OPEN_PAREN'),
+        ('+[>+[-]<]', {'max_instructions': 50000}, 'instruction_limit', None),
+        ('+[>+[-]<]', {'timeout': 0.05}, 'timeout', None),
+    ],
+)
+def test_run_job(engine, code, options, status, error):
+    job = batch.Job(0, 'program.b', 'abc', 'job')
+    result = batch.run_job(code, job, batch.JobOptions(engine, **options))
+    assert (result['status'], result['error']) == (status, error)
+    assert result['id'] == 'job'
+    if status == 'ended':
+        assert result['output'] == 'cba'
+    if status == 'instruction_limit':
+        assert 50000 <= result['instructions'] < 50010
+
+
+@pytest.mark.parametrize('engine', ['compiled', 'fast'])
+def test_instruction_limit_matches_reference(engine):
+    code = (SAMPLE_PROGRAMS_PATH / 'hello world.b').read_text()
+    reference = BrainfuckInterpreter(code, output_func=None)
+    assert reference.run_for(10**7) is RunStatus.ENDED
+    steps = reference.instruction_count
+
+    job = batch.Job(0, 'hello world.b')
+    result = batch.run_job(code, job, batch.JobOptions(engine, max_instructions=steps))
+    assert (result['status'], result['instructions']) == ('ended', steps)
+
+    limit = steps // 2
+    result = batch.run_job(code, job, batch.JobOptions(engine, max_instructions=limit))
+    assert result['status'] == 'instruction_limit'
+    # The limit is only checked at loops, so it can be overrun by the commands between
+    # two loops, which are all on one line of the program
+    assert limit <= result['instructions'] < limit + len(code.splitlines()[0])
+
+
+def test_run_batch(tmp_path):
+    reverse = write_program(tmp_path, 'reverse.b', ',>,>,.<.<.')
+    hello = str(SAMPLE_PROGRAMS_PATH / 'hello world.b')
+    jobs = [batch.Job(i, reverse, text) for i, text in enumerate(['abc', 'xyz', '123'])]
+    jobs.append(batch.Job(3, hello))
+    jobs.append(batch.Job(4, str(tmp_path / 'missing.b')))
+
+    results = sorted(batch.run_batch(jobs, workers=2, chunk_size=2), key=lambda r: r['index'])
+    assert [result['output'] for result in results] == [
+        'cba',
+        'zyx',
+        '321',
+        'Hello World!' * 20,
+        '',
+    ]
+    assert results[4]['error'] == 'FileNotFoundError'
+
+
+def test_run_batch_exceptions(tmp_path):
+    reverse = write_program(tmp_path, 'reverse.b', ',>,>,.<.<.')
+    jobs = [batch.Job(0, reverse, 'abc'), batch.Job(1, reverse, 'xyz', id=lambda: None)]
+    # The second chunk can't be sent to a worker since its job can't be pickled
+    results = sorted(batch.run_batch(jobs, workers=1, chunk_size=1), key=lambda r: r['index'])
+    assert [(result['status'], result['output']) for result in results] == [
+        ('ended', 'cba'),
+        ('error', ''),
+    ]
+    assert 'pickle' in results[1]['message']
+
+    # An exception while running a job only fails that job
+    options = batch.JobOptions(engine='missing')
+    results = list(batch.run_batch(jobs[:1], options, workers=1))
+    assert [(result['status'], result['error']) for result in results] == [
+        ('error', 'KeyError')
+    ]
+
+
+def test_main(tmp_path):
+    write_program(tmp_path, 'reverse.b', ',>,>,.<.<.')
+    (tmp_path / 'input.txt').write_text('def')
+    jobs = tmp_path / 'jobs.jsonl'
+    jobs.write_text(
+        json.dumps({'program': 'reverse.b', 'input': 'abc', 'id': 'a'})
+        + '\n'
+        + json.dumps({'program': 'reverse.b', 'input_file': 'input.txt', 'id': 'b'})
+        + '\n'
+    )
+    output = tmp_path / 'results.jsonl'
+
+    assert batch.main([str(jobs), '-o', str(output), '--workers', '1']) == 0
+
+    results = [json.loads(line) for line in output.read_text().splitlines()]
+    assert {result['id']: result['output'] for result in results} == {'a': 'cba', 'b': 'fed'}
+    assert all(result['status'] == 'ended' for result in results)
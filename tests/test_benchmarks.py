@@ -0,0 +1,51 @@
+import pytest
+
+import benchmarks
+
+
+def make_results(*results):
+    return {
+        'results': [
+            {'workload': workload, 'engine': engine, 'wall_time': wall_time, 'output_ok': ok}
+            for workload, engine, wall_time, ok in results
+        ]
+    }
+
+
+def test_workloads_exist():
+    workloads = benchmarks.load_workloads()
+    assert {workload.name for workload in workloads} >= {'counter', 'primes', 'output', 'cat'}
+    for workload in workloads:
+        assert workload.code()
+        assert workload.instructions and workload.output_sha256
+        assert (benchmarks.BENCHMARKS_PATH / workload.program).parent.name == 'programs'
+
+
+@pytest.mark.parametrize('workload', benchmarks.load_workloads(), ids=lambda w: w.name)
+def test_workload_output(workload):
+    _, output, _ = benchmarks._measure('compiled', workload.code(), workload.input)
+    assert benchmarks.output_hash(output) == workload.output_sha256
+
+
+def test_run_workload():
+    workload = next(w for w in benchmarks.load_workloads() if w.name == 'hello')
+    result = benchmarks.run_workload(workload, 'fast', repeat=1)
+    assert result['output_ok']
+    assert result['instructions_per_second'] == workload.instructions / result['wall_time']
+    assert len(result['wall_times']) == 1
+
+
+def test_compare():
+    old = make_results(('a', 'fast', 1.0, True), ('b', 'fast', 1.0, True))
+    new = make_results(
+        ('a', 'fast', 1.05, True), ('b', 'fast', 0.5, True), ('c', 'fast', 1.0, True)
+    )
+    lines, regressed = benchmarks.compare(old, new, threshold=0.1)
+    assert not regressed
+    assert len(lines) == 4
+
+    slower = make_results(('a', 'fast', 1.5, True), ('b', 'fast', 1.0, True))
+    assert benchmarks.compare(old, slower, threshold=0.1)[1]
+
+    wrong = make_results(('a', 'fast', 1.0, False))
+    assert benchmarks.compare(old, wrong)[1]
@@ -7,13 +7,18 @@ from pytestqt import qtbot
 from PyQt5 import QtCore, QtGui, QtWidgets
 from PyQt5.QtTest import QTest
 
-from esolang_IDE.controllers.runner_controller import RunnerController, _RunnerStatus
+from esolang_IDE.controllers.runner_controller import (
+    RunnerController,
+    _heat_ranges,
+    _RunnerStatus,
+)
 from esolang_IDE.code_text import CodeText
 from esolang_IDE.code_runner import CodeRunner
 
 from esolang_IDE.file_info import FileInfo
 
 from esolang_IDE.filetypes import FileTypes
+from esolang_IDE.interpreters import BrainfuckInterpreter, LoopProfile
 
 SHORT_TEST = False
 SKIPTEXT = 'SHORT_TEST is True'
@@ -82,11 +87,11 @@ class _BaseTest:
     def assert_empty_output(self):
         assert self.get_raw_output_text() == ''
 
-    def run_code(self, timeout=1000):
+    def run_code(self, timeout=1000, in_process=False, profile=False):
         with self.qtbot.waitSignal(
             self.runner_controller._output_text.completed, timeout=timeout
         ) as blocker:
-            self.runner_controller.run_code()
+            self.runner_controller.run_code(in_process, profile)
 
     def input_key_click(self, key):
         self.qtbot.keyClick(self.code_runner.get_input_text(), key)
@@ -247,6 +252,121 @@ class TestThreeInput(_BaseTest):
         assert self.get_raw_output_text() == '5bA'
 
 
+class TestRunInProcess(_BaseTest):
+    filename = 'three input.b'
+
+    def test_valid_input(self):
+        self.input_key_clicks('AbC')
+        self.run_code(timeout=5000, in_process=True)
+        self.assert_stopped()
+        assert self.get_raw_output_text() == 'CbA'
+
+    def test_unfinished_input(self):
+        self.input_key_clicks('Ab')
+        self.run_code(timeout=5000, in_process=True)
+        self.assert_need_input()
+
+        self.input_key_clicks('5')
+        self.run_code(timeout=5000, in_process=True)
+        self.assert_stopped()
+        assert self.get_raw_output_text() == '5bA'
+
+
+class TestStop(_BaseTest):
+    filename = 'forever output.b'
+
+    def test_stop_in_process(self):
+        thread = self.runner_controller._runner_thread
+        errors = []
+        thread.error.connect(errors.append)
+        self.runner_controller.run_code(in_process=True)
+        self.qtbot.wait(300)
+        interpreter = thread._interpreter
+
+        with self.qtbot.waitSignal(thread.stopped, timeout=5000):
+            thread.stop()
+        assert not thread.isRunning()
+        assert not interpreter._process.is_alive()
+        assert self.runner_controller._status == _RunnerStatus.stopped
+        self.qtbot.wait(100)
+        assert errors == []
+
+
+class TestProfile(_BaseTest):
+    filename = 'hello world.b'
+
+    def test_profile_table(self):
+        self.run_code(profile=True)
+        assert self.get_raw_output_text() == 'Hello World!' * 20
+
+        table = self.code_runner.get_profile_table()
+        assert not table.isHidden()
+        assert table.rowCount() > 0
+        # Sorted with the loop that ran the most instructions first
+        ops = [table.item(row, 3).data(QtCore.Qt.DisplayRole) for row in range(table.rowCount())]
+        assert ops == sorted(ops, reverse=True)
+        assert self.code_text._heatmap_shown
+
+    def test_heatmap_removed_on_edit(self):
+        self.run_code(profile=True)
+        self.code_text.append(' ')
+        assert not self.code_text._heatmap_shown
+
+    def test_not_profiled_by_default(self):
+        self.run_code()
+        assert self.code_runner.get_profile_table().isHidden()
+        assert not self.code_text._heatmap_shown
+
+    def test_non_ascii_positions(self):
+        # Profile locations are indices of the text, but Scintilla counts bytes
+        code_text = self.code_text
+        code_text.setText('é ü\n+[->+<]')
+        code_text.show_heatmap([(5, 6, 4)])
+        heat = 1 << code_text._HEAT_INDICATORS[4]
+        indicators = [
+            code_text.SendScintilla(code_text.SCI_INDICATORALLONFOR, position)
+            for position in range(code_text.length())
+        ]
+        assert [bool(value & heat) for value in indicators] == [False] * 7 + [True] * 6
+        code_text.select_range(5, 6)
+        assert code_text.selectedText() == '[->+<]'
+        assert code_text.line_index(5) == (1, 1)
+
+    def test_heat_ranges(self):
+        profile = [
+            LoopProfile((0, 20), 1, 10),
+            LoopProfile((5, 5), 100, 1000),
+            LoopProfile((12, 3), 0, 0),
+            LoopProfile((30, 2), 1, 1),
+        ]
+        # The nested loop is coloured instead of the loop containing it, and loops
+        # which never ran are not coloured
+        assert _heat_ranges(profile, 5) == [
+            (0, 5, 1),
+            (5, 5, 4),
+            (10, 2, 1),
+            (15, 5, 1),
+            (30, 2, 0),
+        ]
+
+
+class TestMetrics(_BaseTest):
+    filename = 'hello world.b'
+
+    def test_metrics(self, caplog):
+        with caplog.at_level('INFO', logger='esolang_IDE.runner_metrics'):
+            self.run_code()
+
+        metrics = caplog.records[-1].metrics
+        assert metrics['output_chars'] == len('Hello World!' * 20)
+        # The same count as the reference interpreter, whichever engine ran it
+        reference = BrainfuckInterpreter(self.source_code, output_func=None)
+        reference.run()
+        assert metrics['instructions'] == reference.instruction_count
+        assert metrics['tape_cells'] > 0
+        assert 'instructions' in self.code_runner._metrics_label.text()
+
+
 class TestForeverInput(_BaseTest):
     filename = 'forever input.b'
 
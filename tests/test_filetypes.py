@@ -0,0 +1,45 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from esolang_IDE.filetypes import FileTypes
+
+
+def test_import_is_lazy():
+    check = (
+        'import sys, esolang_IDE.filetypes, esolang_IDE.interpreters; '
+        'assert not any(name.startswith("PyQt5") for name in sys.modules); '
+        'assert "esolang_IDE.interpreters.brainfuck" not in sys.modules; '
+        'assert "esolang_IDE.interpreters.process_interpreter" not in sys.modules; '
+        'assert "multiprocessing" not in sys.modules; '
+        'esolang_IDE.filetypes.FileTypes.BRAINFUCK.to_runner_interpreter(); '
+        'assert "esolang_IDE.interpreters.brainfuck" in sys.modules'
+    )
+    subprocess.run([sys.executable, '-c', check], cwd=Path(__file__).parent.parent, check=True)
+
+
+@pytest.mark.parametrize(
+    'method, name',
+    [
+        ('to_interpreter', 'BrainfuckInterpreter'),
+        ('to_runner_interpreter', 'CompiledBrainfuckInterpreter'),
+        ('to_input_decoder', 'BrainfuckDecoder'),
+        ('to_lexer', 'BrainfuckLexer'),
+        ('to_visualiser', 'BrainfuckVisualiserWidget'),
+    ],
+)
+def test_brainfuck(method, name):
+    assert getattr(FileTypes.BRAINFUCK, method)().__name__ == name
+
+
+def test_defaults():
+    assert FileTypes.TEXT.to_visualiser().__name__ == 'NoVisualiserWidget'
+    assert FileTypes.NONE.to_lexer().__name__ == 'NoneLexer'
+
+
+def test_from_extension():
+    assert FileTypes.from_extension('.b') is FileTypes.BRAINFUCK
+    assert FileTypes.from_extension('.txt') is FileTypes.TEXT
+    assert FileTypes.from_extension('.unknown') is FileTypes.NONE
@@ -0,0 +1,1072 @@
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from esolang_IDE.interpreters import (
+    BrainfuckInterpreter,
+    CompiledBrainfuckInterpreter,
+    ErrorTypes,
+    ExecutionEndedError,
+    NoInputError,
+    NoPreviousExecutionError,
+    FastBrainfuckInterpreter,
+    LoopProfile,
+    ProgramRuntimeError,
+    ProgramSyntaxError,
+    RunStatus,
+    VisualiserInterpreter,
+    Watchpoint,
+    process_interpreter_type,
+    process_rss_kb,
+)
+from esolang_IDE.interpreters import brainfuck_ir, history, output_buffer, program_cache, tape
+from esolang_IDE.interpreters.brainfuck_ir import Instruction, Op
+
+SAMPLE_PROGRAMS_PATH = (Path(__file__).parent / 'sample_programs').resolve()
+
+INTERPRETERS = [BrainfuckInterpreter, FastBrainfuckInterpreter, CompiledBrainfuckInterpreter]
+FAST_INTERPRETERS = [FastBrainfuckInterpreter, CompiledBrainfuckInterpreter]
+
+PROGRAMS = {
+    'clear': ('+++++[-]++.', '', '\x02'),
+    'clear up': ('+++++[+]++.', '', '\x02'),
+    'copy': ('+++++[->+>+<<]>.>.', '', '\x05\x05'),
+    'multiply': ('++++++++[->++++++++<]>+.', '', 'A'),
+    'negative multiply': ('+++[->---<]>.', '', chr(256 - 9)),
+    'increment loop': ('-[+>++<]>.', '', '\x02'),
+    'nested': ('++[>+++[->++<]<-]>>.', '', '\x0c'),
+    'reverse input': (',>,>,.<.<.', 'AbC', 'CbA'),
+    'scan right': ('+>+>+>>+<<<<[>]>.<<.', '', '\x01\x01'),
+    'scan left': ('>+>+>+>>+<[<]+.>.', '', '\x01\x01'),
+    'strided scan': ('+>>+>>+>+<<<<<[>>]+<.>.', '', '\x01\x01'),
+    'scan off end': ('+[>]+.', '', '\x01'),
+}
+
+
+def make_input_func(text):
+    chars = iter(text)
+    return lambda: next(chars, '')
+
+
+def run(interpreter_type, code, input_text=''):
+    output = []
+    interpreter = interpreter_type(
+        code, input_func=make_input_func(input_text), output_func=output.append
+    )
+    interpreter.run()
+    return ''.join(output)
+
+
+@pytest.mark.parametrize('interpreter_type', INTERPRETERS)
+@pytest.mark.parametrize('name', PROGRAMS)
+def test_programs(interpreter_type, name):
+    code, input_text, expected = PROGRAMS[name]
+    assert run(interpreter_type, code, input_text) == expected
+
+
+@pytest.mark.parametrize('interpreter_type', INTERPRETERS)
+def test_hello_world(interpreter_type):
+    code = (SAMPLE_PROGRAMS_PATH / 'hello world.b').read_text()
+    assert run(interpreter_type, code) == 'Hello World!' * 20
+
+
+class TestOptimise:
+    def optimise(self, code):
+        return [
+            (instruction.op, instruction.arg, instruction.offset)
+            for instruction in brainfuck_ir.optimise(brainfuck_ir.parse(code))
+        ]
+
+    def test_runs_folded(self):
+        assert self.optimise('++a+-->>x<') == [(Op.ADD, 1, 0), (Op.MOVE, 1, 0)]
+
+    def test_clear_loop(self):
+        assert self.optimise('[-]') == [(Op.CLEAR, 0, 0)]
+
+    def test_multiply_loop(self):
+        assert self.optimise('[->++>>+++<<<]') == [
+            (Op.MULTIPLY, 2, 1),
+            (Op.MULTIPLY, 3, 3),
+            (Op.CLEAR, 0, 0),
+        ]
+
+    def test_scan_loop(self):
+        assert self.optimise('[>>]<[<]') == [
+            (Op.SCAN, 2, 0),
+            (Op.MOVE, -1, 0),
+            (Op.SCAN, -1, 0),
+        ]
+
+    def test_deferred_moves(self):
+        instructions = brainfuck_ir.parse_optimised('>+>++<<-[>.<-]')
+        assert [(i.op, i.arg, i.offset) for i in instructions] == [
+            (Op.ENSURE, 0, 2),
+            (Op.ADD, 1, 1),
+            (Op.ADD, 2, 2),
+            (Op.ADD, -1, 0),
+            (Op.OPEN_LOOP, 0, 0),
+            (Op.ENSURE, 0, 1),
+            (Op.OUTPUT, 0, 1),
+            (Op.ADD, -1, 0),
+            (Op.CLOSE_LOOP, 0, 0),
+        ]
+
+    def test_unbalanced_loop_kept(self):
+        assert self.optimise('[->+]') == [
+            (Op.OPEN_LOOP, 0, 0),
+            (Op.ADD, -1, 0),
+            (Op.MOVE, 1, 0),
+            (Op.ADD, 1, 0),
+            (Op.CLOSE_LOOP, 0, 0),
+        ]
+
+    def test_location(self):
+        instructions = brainfuck_ir.optimise(brainfuck_ir.parse('+ [->+<]'))
+        assert instructions[-1] == Instruction(Op.CLEAR, location=(2, 6))
+
+    def test_step_costs(self):
+        code = '+>[-]<[>+.<-]>[+]+[>]<'
+        instructions = brainfuck_ir.parse_optimised(code)
+        costs = brainfuck_ir.step_costs(code, instructions)
+        assert [
+            (instruction.op, steps)
+            for instruction, steps in zip(instructions, costs.steps)
+            if steps
+        ] == [
+            (Op.CLEAR, 2),
+            (Op.OPEN_LOOP, 5),
+            (Op.CLOSE_LOOP, 6),
+            (Op.CLEAR, 2),
+            (Op.SCAN, 2),
+        ]
+        assert costs.tail == 5
+        assert [instructions[i].location for i in costs.incrementing] == [(14, 3)]
+
+    def test_nested_step_costs(self):
+        # The steps of the inner `[` are counted by the outer `]`
+        code = '+[>+[.-]<-]'
+        instructions = brainfuck_ir.parse_optimised(code)
+        costs = brainfuck_ir.step_costs(code, instructions)
+        assert [
+            (instruction.op, steps)
+            for instruction, steps in zip(instructions, costs.steps)
+            if instruction.op in (Op.OPEN_LOOP, Op.CLOSE_LOOP)
+        ] == [(Op.OPEN_LOOP, 2), (Op.OPEN_LOOP, 0), (Op.CLOSE_LOOP, 3), (Op.CLOSE_LOOP, 6)]
+
+    @pytest.mark.parametrize(
+        'code, error, location',
+        [
+            ('+[[-]', ErrorTypes.UNMATCHED_OPEN_PAREN, (1, 1)),
+            ('+[-]]', ErrorTypes.UNMATCHED_CLOSE_PAREN, (4, 1)),
+        ],
+    )
+    def test_unmatched_brackets(self, code, error, location):
+        with pytest.raises(ProgramSyntaxError) as excinfo:
+            brainfuck_ir.parse(code)
+        assert excinfo.value.error is error
+        assert excinfo.value.location == location
+
+
+@pytest.mark.parametrize('interpreter_type', FAST_INTERPRETERS)
+def test_multiply_out_of_bounds(interpreter_type):
+    with pytest.raises(ProgramRuntimeError):
+        run(interpreter_type, '+[-<+>]')
+    assert run(interpreter_type, '[-<+>]+.') == '\x01'
+
+
+def test_compiled_deep_nesting():
+    code = '+' + '[>+' * 40 + '.' + '-]<' * 40
+    assert run(CompiledBrainfuckInterpreter, code) == '\x01'
+
+
+def test_compiled_resumes_after_input():
+    input_text = []
+    output = []
+    interpreter = CompiledBrainfuckInterpreter(
+        '+[,.]',
+        input_func=lambda: input_text.pop(0) if input_text else '',
+        output_func=output.append,
+    )
+    with pytest.raises(NoInputError):
+        while True:
+            interpreter.step()
+    input_text.extend('ab')
+    with pytest.raises(NoInputError):
+        while True:
+            interpreter.step()
+    assert ''.join(output) == 'ab'
+
+
+@pytest.mark.parametrize('interpreter_type', INTERPRETERS)
+@pytest.mark.parametrize(
+    'cell_bits, expected',
+    [(8, '\xff\x01'), (16, chr(0xFFFF) + chr(0x101))],
+)
+def test_cell_bits(interpreter_type, cell_bits, expected):
+    output = []
+    interpreter = interpreter_type(
+        '-.>' + '+' * 16 + '[->' + '+' * 16 + '<]>+.',
+        input_func=make_input_func(''),
+        output_func=output.append,
+        cell_bits=cell_bits,
+    )
+    interpreter.run()
+    assert ''.join(output) == expected
+
+
+@pytest.mark.parametrize('interpreter_type', INTERPRETERS)
+def test_invalid_output(interpreter_type):
+    interpreter = interpreter_type('-.', input_func=make_input_func(''), cell_bits=32)
+    with pytest.raises(ProgramRuntimeError) as excinfo:
+        interpreter.run()
+    assert excinfo.value.error is ErrorTypes.INVALID_OUTPUT
+
+
+@pytest.mark.parametrize('interpreter_type', INTERPRETERS)
+def test_tape_grows(interpreter_type):
+    # Move well past the old fixed size of 40000 cells, then come back to the start
+    code = '+' + '>' * 50000 + '++.' + '<' * 50000 + '.'
+    assert run(interpreter_type, code) == '\x02\x01'
+
+
+@pytest.mark.parametrize('interpreter_type', INTERPRETERS)
+def test_tape_left_of_start(interpreter_type):
+    with pytest.raises(ProgramRuntimeError) as excinfo:
+        run(interpreter_type, '+<+.')
+    assert excinfo.value.error is ErrorTypes.INVALID_TAPE_CELL
+
+
+@pytest.mark.parametrize('interpreter_type', INTERPRETERS)
+def test_bidirectional_tape(interpreter_type):
+    output = []
+    interpreter = interpreter_type(
+        '+++[-<<+>>]<<.<<<<++.>>>>>>.',
+        input_func=make_input_func(''),
+        output_func=output.append,
+        bidirectional=True,
+    )
+    interpreter.run()
+    assert ''.join(output) == '\x03\x02\x00'
+
+
+@pytest.mark.parametrize('interpreter_type', INTERPRETERS)
+def test_max_cells(interpreter_type):
+    interpreter = interpreter_type(
+        '+[>+]', input_func=make_input_func(''), max_cells=5000
+    )
+    with pytest.raises(ProgramRuntimeError) as excinfo:
+        interpreter.run()
+    assert excinfo.value.error is ErrorTypes.INVALID_TAPE_CELL
+
+
+@pytest.mark.parametrize('interpreter_type', FAST_INTERPRETERS)
+def test_output_batched(interpreter_type):
+    output = []
+    interpreter = interpreter_type('+' * 65 + '.' * 10000, output_func=output.append)
+    interpreter.run()
+    assert ''.join(output) == 'A' * 10000
+    assert len(output) < 10
+
+
+@pytest.mark.parametrize('interpreter_type', FAST_INTERPRETERS)
+def test_output_flushed_before_input(interpreter_type):
+    output = []
+    interpreter = interpreter_type(
+        '+' * 65 + '.,', input_func=make_input_func(''), output_func=output.append
+    )
+    with pytest.raises(NoInputError):
+        while True:
+            interpreter.step()
+    assert output == ['A']
+
+
+@pytest.mark.parametrize('interpreter_type', FAST_INTERPRETERS)
+def test_output_flushed_before_error(interpreter_type):
+    output = []
+    interpreter = interpreter_type('+.<', output_func=output.append)
+    with pytest.raises(ProgramRuntimeError):
+        interpreter.run()
+    assert output == ['\x01']
+
+
+@pytest.mark.parametrize('interpreter_type', INTERPRETERS)
+@pytest.mark.parametrize(
+    'code, status',
+    [
+        ('+[]', RunStatus.BUDGET_EXHAUSTED),
+        ('+.', RunStatus.ENDED),
+        ('+[,]', RunStatus.NEEDS_INPUT),
+        ('<', RunStatus.ERROR),
+    ],
+)
+def test_run_for(interpreter_type, code, status):
+    interpreter = interpreter_type(code, input_func=make_input_func(''), output_func=None)
+    assert interpreter.run_for(1000) is status
+    if status is RunStatus.ERROR:
+        assert interpreter.error.error is ErrorTypes.INVALID_TAPE_CELL
+
+
+@pytest.mark.parametrize('interpreter_type', INTERPRETERS)
+def test_run_for_resumes(interpreter_type):
+    output = []
+    interpreter = interpreter_type('+' * 5 + '[>++<-]>.', output_func=output.append)
+    while interpreter.run_for(3) is RunStatus.BUDGET_EXHAUSTED:
+        pass
+    assert output[-1] == '\x0a'
+
+
+@pytest.mark.parametrize('interpreter_type', INTERPRETERS)
+def test_run_until(interpreter_type):
+    interpreter = interpreter_type('+[]', output_func=None)
+    start = time.monotonic()
+    assert interpreter.run_until(start + 0.05) is RunStatus.BUDGET_EXHAUSTED
+    assert time.monotonic() - start < 1
+
+
+@pytest.mark.parametrize('interpreter_type', FAST_INTERPRETERS)
+@pytest.mark.parametrize(
+    'code',
+    [
+        '+++[-.]',
+        # Nested more deeply than the compiled interpreter nests Python blocks
+        '+' + '[>+' * 40 + '.' + '-]<' * 40,
+        # Clear, multiply and scan loops, including ones which don't run
+        '[-]+++[>++[+]>+++[->++<]<<-]>>>>+>+[<]>[>]<<[<<]',
+        '+>>+<<[->+>x->+<<<]+>comment[-]>>---[+]<-[-<+>]',
+        '++[>++[>+++[-]<-]<-]>>>.',
+    ],
+)
+def test_instruction_count(interpreter_type, code):
+    # Instructions are counted in the same way as by the reference interpreter
+    reference = BrainfuckInterpreter(code, output_func=None, bidirectional=True)
+    assert reference.run_for(10000) is RunStatus.ENDED
+    interpreter = interpreter_type(code, output_func=None, bidirectional=True)
+    while interpreter.run_for(7) is RunStatus.BUDGET_EXHAUSTED:
+        pass
+    assert interpreter.instruction_count == reference.instruction_count
+
+
+@pytest.mark.parametrize('interpreter_type', FAST_INTERPRETERS)
+def test_run_for_budget(interpreter_type):
+    # The budget is checked at the end of each iteration of 4 instructions
+    interpreter = interpreter_type('+[>+<]', output_func=None)
+    assert interpreter.run_for(1000) is RunStatus.BUDGET_EXHAUSTED
+    assert 1000 <= interpreter.instruction_count < 1004
+
+
+@pytest.mark.parametrize('interpreter_type', INTERPRETERS)
+def test_stats(interpreter_type):
+    interpreter = interpreter_type('+++[-]>>>', output_func=None)
+    interpreter.run()
+    stats = interpreter.stats()
+    assert stats.instructions == interpreter.instruction_count
+    assert stats.tape_cells >= 4
+    assert stats.rss_kb is None or stats.rss_kb > 0
+
+
+def test_process_rss():
+    assert process_rss_kb() > 0
+
+
+def test_loop_profile():
+    # The inner loop is collapsed into a multiply, which runs 3 iterations each time
+    code = '++[>+++[>++<-]<-]>>.,[.,]'
+    interpreter = CompiledBrainfuckInterpreter(
+        code, input_func=make_input_func('ab\0'), output_func=None, profile=True
+    )
+    assert interpreter.run() == '\x0cab'
+    assert interpreter.loop_profile() == [
+        LoopProfile((2, 15), 2, 2 * 8),
+        LoopProfile((7, 7), 6, 6 * 6),
+        LoopProfile((21, 4), 2, 2 * 3),
+    ]
+
+
+def test_loop_profile_nested():
+    code = '++[>++[-<.>]<-] comment'
+    interpreter = CompiledBrainfuckInterpreter(code, output_func=None, profile=True)
+    interpreter.run()
+    # Each iteration of the outer loop runs 7 instructions outside the inner loop
+    assert interpreter.loop_profile() == [
+        LoopProfile((2, 13), 2, 2 * 7),
+        LoopProfile((6, 6), 4, 4 * 5),
+    ]
+
+
+def test_loop_profile_deep_nesting():
+    code = '+' + '[>+' * 40 + '.' + '-]<' * 40
+    interpreter = CompiledBrainfuckInterpreter(code, output_func=None, profile=True)
+    interpreter.run()
+    assert [loop.iterations for loop in interpreter.loop_profile()] == [1] * 40
+
+
+@pytest.mark.parametrize(
+    'code',
+    [
+        # Scans to the end of a growing trail and back
+        '+[>++++++++[>++++++++<-]>[[>]+[<]>-]<<[-]]',
+        # Multiplies, and clears a cell by incrementing it
+        '+[>++++++++[>++++++++[>+>++<<-]<-]>>>[+]<<<<[-]]',
+    ],
+)
+def test_loop_profile_total(code):
+    interpreter = CompiledBrainfuckInterpreter(code, output_func=None, profile=True)
+    interpreter.run()
+    # Everything but the + and [ at the start is in a loop
+    total = sum(loop.ops for loop in interpreter.loop_profile())
+    assert total == interpreter.instruction_count - 2
+
+
+def test_loop_profile_off():
+    interpreter = CompiledBrainfuckInterpreter('+[-]', output_func=None)
+    assert interpreter.loop_profile() is None
+    assert FastBrainfuckInterpreter('+[-]', output_func=None).loop_profile() is None
+
+
+class TestProcessInterpreter:
+    interpreter_type = process_interpreter_type(CompiledBrainfuckInterpreter)
+
+    def run_to_stop(self, interpreter):
+        while True:
+            status = interpreter.run_for(1000)
+            if status is not RunStatus.BUDGET_EXHAUSTED:
+                return status
+
+    def test_type_cached(self):
+        assert process_interpreter_type(CompiledBrainfuckInterpreter) is self.interpreter_type
+
+    def test_output(self):
+        code = (SAMPLE_PROGRAMS_PATH / 'hello world.b').read_text()
+        assert run(self.interpreter_type, code) == 'Hello World!' * 20
+
+    def test_input(self):
+        input_text = []
+        output = []
+        interpreter = self.interpreter_type(
+            '+[,.]',
+            input_func=lambda: input_text.pop(0) if input_text else '',
+            output_func=output.append,
+        )
+        try:
+            assert self.run_to_stop(interpreter) is RunStatus.NEEDS_INPUT
+            input_text.extend('ab')
+            assert self.run_to_stop(interpreter) is RunStatus.NEEDS_INPUT
+            assert ''.join(output) == 'ab'
+        finally:
+            interpreter.close()
+
+    @pytest.mark.parametrize(
+        'code, error',
+        [('+<', ErrorTypes.INVALID_TAPE_CELL), ('[', ErrorTypes.UNMATCHED_OPEN_PAREN)],
+    )
+    def test_error(self, code, error):
+        interpreter = self.interpreter_type(code, output_func=None)
+        assert self.run_to_stop(interpreter) is RunStatus.ERROR
+        assert interpreter.error.error is error
+
+    def test_stats(self):
+        interpreter = self.interpreter_type('+++[.-]', output_func=None)
+        assert self.run_to_stop(interpreter) is RunStatus.ENDED
+        local = CompiledBrainfuckInterpreter('+++[.-]', output_func=None)
+        local.run()
+        assert interpreter.stats()[:2] == local.stats()[:2] == (13, len(local.memory.cells))
+
+    def test_close(self):
+        interpreter = self.interpreter_type('+[]', output_func=None)
+        assert interpreter.run_for(1000) is RunStatus.BUDGET_EXHAUSTED
+        interpreter.close()
+        assert not interpreter._process.is_alive()
+
+    def test_pause(self):
+        interpreter = self.interpreter_type('+[]', output_func=None)
+        try:
+            assert interpreter.run_for(1000) is RunStatus.BUDGET_EXHAUSTED
+            interpreter.pause()
+            # The worker sends its counters regularly until it is paused
+            for _ in range(10):
+                if not interpreter._conn.poll(1):
+                    break
+                interpreter._conn.recv()
+            else:
+                pytest.fail('the worker kept running while it was paused')
+            instructions = interpreter.stats().instructions
+            while interpreter.stats().instructions == instructions:
+                assert interpreter.run_for(1000) is RunStatus.BUDGET_EXHAUSTED
+        finally:
+            interpreter.close()
+
+    def test_worker_killed(self):
+        interpreter = self.interpreter_type('+[]', output_func=None)
+        try:
+            assert interpreter.run_for(1000) is RunStatus.BUDGET_EXHAUSTED
+            interpreter.pause()
+            interpreter._process.kill()
+            interpreter._process.join()
+            # Resuming writes to the broken pipe
+            assert self.run_to_stop(interpreter) is RunStatus.ERROR
+            assert isinstance(interpreter.error, ProgramRuntimeError)
+        finally:
+            interpreter.close()
+
+    def test_spawned_from_entry_point(self):
+        # The worker imports the `__main__` module of the parent, which is the
+        # entry point of the package when it is run with `python -m esolang_IDE`
+        check = (
+            'import sys, importlib; '
+            'sys.modules["__main__"] = importlib.import_module("esolang_IDE.__main__"); '
+            'assert not any(name.startswith("PyQt5") for name in sys.modules); '
+            'from esolang_IDE.interpreters import CompiledBrainfuckInterpreter, '
+            'process_interpreter_type; '
+            'interpreter = process_interpreter_type(CompiledBrainfuckInterpreter)('
+            '"+" * 65 + ".", output_func=None); '
+            'assert interpreter.run() == "A"'
+        )
+        subprocess.run(
+            [sys.executable, '-c', check], cwd=SAMPLE_PROGRAMS_PATH.parent.parent, check=True
+        )
+
+
+class TestHistory:
+    def test_stack(self):
+        past = history.History(10)
+        past.append(-1, 0, 0, 0)
+        past.append(0, 1, 255, 3)
+        assert len(past) == 2
+        assert past.pop() == (0, 1, 255, 3)
+        assert past.pop() == (-1, 0, 0, 0)
+        with pytest.raises(IndexError):
+            past.pop()
+
+    def test_grows(self):
+        past = history.History(10_000, cell_bits=16)
+        for i in range(10_000):
+            past.append(i, -i, i, i)
+        assert len(past) == 10_000
+        popped = [past.pop() for _ in range(10_000)]
+        assert popped == [(i, -i, i, i) for i in reversed(range(10_000))]
+
+    def test_overwrites_oldest(self):
+        past = history.History(3)
+        for i in range(5):
+            past.append(i, i, i, i)
+        assert len(past) == 3
+        assert [past.pop()[0] for _ in range(3)] == [4, 3, 2]
+        past.append(7, 7, 7, 7)
+        assert past.pop()[0] == 7
+
+    def test_zero_maxlen(self):
+        past = history.History(0)
+        past.append(0, 0, 0, 0)
+        assert len(past) == 0
+
+
+def _visualiser_state(interpreter):
+    return (
+        interpreter.instruction_count,
+        interpreter.code_pointer,
+        interpreter.tape_pointer,
+        bytes(interpreter.tape),
+        interpreter.output,
+    )
+
+
+def test_back_past_history():
+    interpreter = BrainfuckInterpreter('+++++.', output_func=lambda output: None, maxlen=3)
+    interpreter.run()
+    assert interpreter.output == '\x05'
+    for _ in range(3):
+        interpreter.back()
+    assert (interpreter.code_pointer, interpreter.tape[0], interpreter.output) == (2, 3, '')
+    # Older steps are replayed from the checkpoint at the start
+    interpreter.back()
+    assert (interpreter.code_pointer, interpreter.tape[0]) == (1, 2)
+    assert interpreter.instruction_count == 2
+    interpreter.rewind(5)
+    assert (interpreter.code_pointer, interpreter.instruction_count) == (-1, 0)
+    with pytest.raises(NoPreviousExecutionError):
+        interpreter.back()
+
+
+def test_rewind_replays_input():
+    code = ',[>>+<<.-]>,.' * 3
+    input_text = list('\x30a\x31b\x32c')
+    position = 0
+    undone = []
+
+    def read():
+        nonlocal position
+        position += 1
+        return input_text[position - 1]
+
+    def undo():
+        nonlocal position
+        position -= 1
+        undone.append(input_text[position])
+
+    interpreter = BrainfuckInterpreter(
+        code, input_func=read, output_func=lambda output: None, undo_input_func=undo, maxlen=10
+    )
+    interpreter.checkpoints.interval = 50
+    states = []
+    while True:
+        try:
+            interpreter.step()
+        except ExecutionEndedError:
+            break
+        states.append((_visualiser_state(interpreter), position))
+    assert len(interpreter.checkpoints) > 1
+
+    for state, input_position in reversed(states[::37]):
+        interpreter.rewind(interpreter.instruction_count - state[0])
+        assert (_visualiser_state(interpreter), position) == (state, input_position)
+    assert ''.join(reversed(undone)) == ''.join(input_text[states[0][1] :])
+
+
+def _run_visualiser(code, advance, input_text='', **kwargs):
+    """Run `code` in a visualiser interpreter by calling `advance(interpreter)` until
+    it raises an error, and return the states after each call and the error."""
+    chars = iter(input_text)
+    interpreter = BrainfuckInterpreter(
+        code, input_func=lambda: next(chars, ''), output_func=lambda output: None, **kwargs
+    )
+    states = []
+    for _ in range(10_000):
+        try:
+            advance(interpreter)
+        except (ExecutionEndedError, NoInputError, ProgramRuntimeError) as error:
+            return states, (type(error), getattr(error, 'location', None)), interpreter
+        states.append(_visualiser_state(interpreter))
+    return states, None, interpreter
+
+
+@pytest.mark.parametrize(
+    'code, input_text, kwargs',
+    [
+        ('++>+++[<+>-]comment<.', '', {}),
+        ('+++[>++[>+++<-]<-]>>.', '', {}),
+        (',[.,]', 'abc', {}),
+        ('<<+', '', {}),
+        ('<<+>>>+.', '', {'bidirectional': True}),
+        ('>' * 40 + '+', '', {'max_cells': 32}),
+        ('+' * 300 + '.', '', {'cell_bits': 32}),
+        ('-.', '', {'cell_bits': 32}),
+        # Loops which are run in one go
+        ('+++++[>+++++<-]>[[>]+[<]>-]>[>]<[-]<<[->>+<<].', '', {}),
+        ('++[>+>++<<-]>[+]>[-<+>]>-[+++[-]]', '', {}),
+        ('+' * 300 + '[-]>' + '-' * 300 + '[>+<+]', '', {'cell_bits': 16}),
+        ('+>+>+<<[>]<[<]+[<]', '', {}),
+        ('+>+>+<<[<]+[-<+>]', '', {'bidirectional': True}),
+        ('+[-<+>]', '', {}),
+        ('+' + '>+' * 20 + '<' * 20 + '[>]', '', {'max_cells': 21}),
+    ],
+)
+@pytest.mark.parametrize('steps', [1, 2, 3, 7, 1000])
+def test_jump_matches_stepping(code, input_text, kwargs, steps):
+    def step(interpreter):
+        for _ in range(steps):
+            interpreter.step()
+
+    expected, expected_error, _ = _run_visualiser(code, step, input_text, **kwargs)
+    states, error, _ = _run_visualiser(
+        code, lambda interpreter: interpreter.jump(steps), input_text, **kwargs
+    )
+    # A jump which fails part way keeps the steps before the error, unlike the
+    # stepping above which only records the state after all of the steps
+    assert states[: len(expected)] == expected
+    assert error == expected_error
+
+
+def test_jump_then_rewind():
+    code = '++++++++[>++++++++<-]>[.-]'
+    stepped, _, _ = _run_visualiser(code, lambda interpreter: interpreter.step())
+
+    interpreter = BrainfuckInterpreter(code, output_func=lambda output: None, maxlen=10)
+    interpreter.checkpoints.interval = 16
+    interpreter.jump(len(stepped))
+    assert _visualiser_state(interpreter) == stepped[-1]
+    for state in reversed(stepped[::13]):
+        interpreter.rewind(interpreter.instruction_count - state[0])
+        assert _visualiser_state(interpreter) == state
+
+
+def test_output_callbacks():
+    # The output shown by the visualiser is only updated by the callbacks
+    shown = []
+    interpreter = BrainfuckInterpreter(
+        '+' * 48 + '[.+]',
+        output_func=shown.extend,
+        truncate_output_func=lambda length: shown.__delitem__(slice(length, None)),
+        maxlen=50,
+    )
+    interpreter.checkpoints.interval = 40
+    for advance in (
+        lambda: interpreter.jump(300),
+        lambda: interpreter.rewind(20),
+        lambda: [interpreter.step() for _ in range(5)],
+        lambda: [interpreter.back() for _ in range(8)],
+        lambda: interpreter.rewind(200),
+        lambda: interpreter.jump(400),
+    ):
+        advance()
+        assert ''.join(shown) == interpreter.output
+    assert len(interpreter.output) > 100
+
+
+def test_visual_snapshots():
+    interpreter = BrainfuckInterpreter('+>++<[->+<]', output_func=lambda output: None)
+    interpreter.step()
+    visual = interpreter.get_visual()
+    assert visual.tape[0] == 1
+    assert interpreter.get_visual() is visual
+
+    # The snapshot doesn't change as the interpreter runs
+    interpreter.step()
+    interpreter.step()
+    assert visual.tape[1] == 0
+    with pytest.raises(TypeError):
+        visual.tape[1] = 1
+
+    new_visual = interpreter.get_visual()
+    assert new_visual.version > visual.version
+    assert (new_visual.tape_pointer, new_visual.tape[1]) == (1, 1)
+    assert new_visual.changed_cells == {1}
+
+    interpreter.jump(5)
+    assert interpreter.get_visual().changed_cells is None
+
+
+def _line_ranges(code, lines):
+    starts = [0] + [i + 1 for i, char in enumerate(code) if char == '\n']
+    ends = starts[1:] + [len(code) + 1]
+    return [(starts[line], ends[line] - starts[line] - 1) for line in lines]
+
+
+def _breakpoint_stops(code, breakpoints, steps, run_to_breakpoint):
+    interpreter = BrainfuckInterpreter(code, output_func=lambda output: None)
+    stops = []
+    while True:
+        try:
+            position, reached = run_to_breakpoint(interpreter, breakpoints, steps)
+        except ExecutionEndedError:
+            return stops, _visualiser_state(interpreter)
+        if reached:
+            stops.append((position, _visualiser_state(interpreter)))
+
+
+@pytest.mark.parametrize(
+    'code, lines',
+    [
+        ('++\n[>+\n<-]\n>.', [1]),
+        ('++\n[>+\n<-]\n>.', [2, 3]),
+        ('+++\n[>++[>+<-]<-]\n>>.', [1]),
+        ('++++\n++++\n[-\n]', [1, 3]),
+        ('+[->\n++\n\n+<]', [1]),
+    ],
+)
+def test_run_to_breakpoint(code, lines):
+    breakpoints = _line_ranges(code, lines)
+    expected = _breakpoint_stops(
+        code, breakpoints, 1000, VisualiserInterpreter.run_to_breakpoint
+    )
+    assert expected[0]
+    # Stopping part way through doesn't change where the breakpoints are reached
+    for steps in (1000, 3, 1):
+        for run_to_breakpoint in (
+            VisualiserInterpreter.run_to_breakpoint,
+            BrainfuckInterpreter.run_to_breakpoint,
+        ):
+            stops = _breakpoint_stops(code, breakpoints, steps, run_to_breakpoint)
+            assert stops == expected
+
+
+@pytest.mark.parametrize(
+    'run_to_breakpoint',
+    [VisualiserInterpreter.run_to_breakpoint, BrainfuckInterpreter.run_to_breakpoint],
+)
+def test_breakpoint_on_next_command(run_to_breakpoint):
+    code = '+\n+\n+'
+    interpreter = BrainfuckInterpreter(code, output_func=lambda output: None)
+    breakpoints = _line_ranges(code, [0, 1])
+    # The first command run enters a breakpoint
+    assert run_to_breakpoint(interpreter, breakpoints, 1000) == ((0, 1), (0, 1))
+    assert run_to_breakpoint(interpreter, breakpoints, 1000) == ((2, 1), (2, 1))
+    with pytest.raises(ExecutionEndedError):
+        run_to_breakpoint(interpreter, breakpoints, 1000)
+
+
+def test_run_to_breakpoint_splits_runs():
+    code = '+++\n+++\n.'
+    interpreter = BrainfuckInterpreter(code, output_func=lambda output: None)
+    position, reached = interpreter.run_to_breakpoint(_line_ranges(code, [1]), 1000)
+    assert reached
+    assert position == (4, 1)
+    assert interpreter.instruction_count == 4
+    assert interpreter.tape[0] == 4
+
+
+def _watch_stops(code, watchpoints, advance, input_text=''):
+    chars = iter(input_text)
+    interpreter = BrainfuckInterpreter(
+        code, input_func=lambda: next(chars, ''), output_func=lambda output: None
+    )
+    stops = []
+    while True:
+        try:
+            reached = advance(interpreter)
+        except (ExecutionEndedError, NoInputError):
+            return stops, _visualiser_state(interpreter)
+        if reached:
+            stops.append((reached, _visualiser_state(interpreter)))
+
+
+def _step_to_watchpoint(watchpoints):
+    def advance(interpreter):
+        before = {w.cell: interpreter.tape[w.cell] for w in watchpoints}
+        interpreter.step()
+        for watchpoint in watchpoints:
+            old, new = before[watchpoint.cell], interpreter.tape[watchpoint.cell]
+            if watchpoint.value is None and new != old:
+                return watchpoint
+            if watchpoint.value is not None and new == watchpoint.value != old:
+                return watchpoint
+        return None
+
+    return advance
+
+
+@pytest.mark.parametrize(
+    'code, watchpoints, input_text',
+    [
+        ('+++[>+++++<-]>[>+>++<<-]', [Watchpoint(1)], ''),
+        ('+++[>+++++<-]>[>+>++<<-]', [Watchpoint(1, 7), Watchpoint(3, 10)], ''),
+        ('-----[>+++<-]', [Watchpoint(1, 255), Watchpoint(0, 0)], ''),
+        ('+>,>,<<[>>+<<-]', [Watchpoint(1), Watchpoint(2, 98)], 'aba'),
+        ('++++++++[>++++++++<-]>[>+++<-]', [Watchpoint(1, 20)], ''),
+        ('++++++++[>++++++++<-]>[>+++<-]', [Watchpoint(2, 300)], ''),
+        # Several watchpoints on the same cell
+        ('+++[>+++++<-]>[>+>++<<-]', [Watchpoint(1, 10), Watchpoint(1, 4), Watchpoint(1)], ''),
+        ('+>,>,<<[>>+<<-]', [Watchpoint(2, 98), Watchpoint(2, 97), Watchpoint(1, 97)], 'aba'),
+    ],
+)
+@pytest.mark.parametrize('steps', [1000, 5, 1])
+def test_run_to_watchpoint(code, watchpoints, input_text, steps):
+    expected = _watch_stops(code, watchpoints, _step_to_watchpoint(watchpoints), input_text)
+    stops = _watch_stops(
+        code,
+        watchpoints,
+        lambda interpreter: interpreter.run_to_breakpoint([], steps, watchpoints)[1],
+        input_text,
+    )
+    assert stops == expected
+
+
+@pytest.mark.parametrize(
+    'code, watchpoints, input_text',
+    [
+        ('+++[>+++++<-]>[>+>++<<-]', [Watchpoint(1, 7), Watchpoint(3, 10)], ''),
+        ('+>,>,<<[>>+<<-]', [Watchpoint(2, 98), Watchpoint(2, 97), Watchpoint(1, 97)], 'aba'),
+    ],
+)
+def test_watch_step(code, watchpoints, input_text):
+    expected = _watch_stops(code, watchpoints, _step_to_watchpoint(watchpoints), input_text)
+    stops = _watch_stops(
+        code, watchpoints, lambda interpreter: interpreter.watch_step(watchpoints)[1], input_text
+    )
+    assert stops == expected
+
+
+def test_watchpoint_and_breakpoint():
+    code = '++\n[>+<-]\n>.'
+    interpreter = BrainfuckInterpreter(code, output_func=lambda output: None)
+    breakpoints = _line_ranges(code, [2])
+    watchpoints = [Watchpoint(1, 2)]
+    assert interpreter.run_to_breakpoint(breakpoints, 1000, watchpoints) == (
+        (5, 1),
+        Watchpoint(1, 2),
+    )
+    assert interpreter.run_to_breakpoint(breakpoints, 1000, watchpoints) == ((10, 1), (10, 2))
+    assert Watchpoint(1, 2).describe() == 'cell 1 == 2'
+
+
+def test_watchpoint_on_breakpoint():
+    # The command that stops at the breakpoint is run by `step`
+    code = '+\n+\n.'
+    interpreter = BrainfuckInterpreter(code, output_func=lambda output: None)
+    breakpoints = _line_ranges(code, [1])
+    assert interpreter.run_to_breakpoint(breakpoints, 1000, [Watchpoint(0, 2)]) == (
+        (2, 1),
+        Watchpoint(0, 2),
+    )
+
+
+class TestCheckpoints:
+    def checkpoint(self, step, cells=1):
+        return history.Checkpoint(step, 0, 0, tape.TapeSnapshot(bytearray(cells), 0), 0, 0)
+
+    def test_find(self):
+        checkpoints = history.Checkpoints(interval=10)
+        for step in range(0, 50, 10):
+            checkpoints.add(self.checkpoint(step))
+        assert checkpoints.next_step == 50
+        assert checkpoints.find(25).step == 20
+        assert checkpoints.find(20).step == 20
+        checkpoints.discard_after(25)
+        assert (len(checkpoints), checkpoints.next_step) == (3, 30)
+
+    def test_thinned(self):
+        checkpoints = history.Checkpoints(interval=10, max_count=4)
+        while len(checkpoints) < 4 or checkpoints.interval < 80:
+            checkpoints.add(self.checkpoint(checkpoints.next_step))
+        assert checkpoints.find(1000).step % 80 == 0
+        assert len(checkpoints) <= 4
+
+    def test_memory_budget(self):
+        checkpoints = history.Checkpoints(interval=10, max_bytes=250)
+        for _ in range(10):
+            checkpoints.add(self.checkpoint(checkpoints.next_step, cells=100))
+        assert len(checkpoints) <= 2
+        assert checkpoints.find(0).step == 0
+
+
+class TestOutputBuffer:
+    def test_flush_size(self):
+        output = []
+        buffer = output_buffer.OutputBuffer(output.append, flush_size=3, flush_interval=60)
+        for value in b'abcde':
+            buffer.write(value)
+        assert output == ['abc']
+        buffer.flush()
+        assert output == ['abc', 'de']
+
+    def test_flush_interval(self):
+        output = []
+        buffer = output_buffer.OutputBuffer(output.append, flush_interval=0)
+        buffer.write(ord('a'))
+        assert output == ['a']
+
+    def test_wide_cells(self):
+        output = []
+        buffer = output_buffer.OutputBuffer(output.append, 32, flush_interval=60)
+        buffer.write(0x1F600)
+        buffer.flush()
+        assert output == ['\U0001F600']
+        with pytest.raises(ProgramRuntimeError):
+            buffer.write(0x110000)
+
+
+class TestProgramCache:
+    def test_cached(self):
+        cache = program_cache.ProgramCache()
+        calls = []
+        create = lambda code: calls.append(code) or len(calls)
+        assert cache.get('+-', 'a', create) == 1
+        assert cache.get('+-', 'a', create) == 1
+        assert cache.get('+-', 'b', create) == 2
+        assert cache.get('-+', 'a', create) == 3
+        assert len(calls) == 3
+
+    def test_evicts_least_recently_used(self):
+        cache = program_cache.ProgramCache(max_size=6)
+        cache.get('aaa', None, str.upper)
+        cache.get('bbb', None, str.upper)
+        cache.get('aaa', None, str.upper)
+        cache.get('ccc', None, str.upper)
+        assert cache.size == 6
+        assert cache.get('aaa', None, lambda code: 'new') == 'AAA'
+        assert cache.get('bbb', None, lambda code: 'new') == 'new'
+
+    def test_errors_not_cached(self):
+        cache = program_cache.ProgramCache()
+        with pytest.raises(ProgramSyntaxError):
+            cache.get('[', None, brainfuck_ir.parse)
+        assert len(cache) == 0
+
+
+def test_compiled_program_shared():
+    code = '++[>+<-]>.'
+    first = CompiledBrainfuckInterpreter(code, output_func=None)
+    second = CompiledBrainfuckInterpreter(code, output_func=None)
+    assert first._program.gi_code is second._program.gi_code
+    assert first.run() == second.run() == '\x02'
+
+
+class TestTape:
+    def test_grows_in_chunks(self):
+        memory = tape.Tape(chunk_size=10)
+        assert len(memory) == 10
+        assert memory.grow(25) == 25
+        assert len(memory) == 30
+
+    def test_grows_left(self):
+        memory = tape.Tape(chunk_size=10, bidirectional=True)
+        cells = memory.cells
+        cells[0] = 5
+        assert memory.grow(-3) == 7
+        assert memory.cells is cells
+        assert memory.origin == 10
+        assert memory[10] == 5
+
+    def test_snapshot(self):
+        memory = tape.Tape(16, chunk_size=4, bidirectional=True)
+        memory.cells[1] = 300
+        snapshot = memory.snapshot()
+        memory.grow(-1)
+        memory.cells[memory.origin + 1] = 5
+        memory.restore(snapshot)
+        assert (list(memory.cells), memory.origin) == ([0, 300, 0, 0], 0)
+        assert snapshot.nbytes == 8
+
+    def test_max_cells(self):
+        memory = tape.Tape(chunk_size=10, max_cells=15)
+        assert memory.grow(12) == 12
+        assert len(memory) == 15
+        with pytest.raises(ProgramRuntimeError):
+            memory.grow(15)
+
+
+def _random_program(rng, length):
+    code = []
+    depth = 0
+    for _ in range(length):
+        char = rng.choice('+-<>[].+-<>+-')
+        if char == ']':
+            if not depth:
+                continue
+            depth -= 1
+        elif char == '[':
+            depth += 1
+        code.append(char)
+    return ''.join(code) + ']' * depth
+
+
+def _reference_output(code, max_steps=20000):
+    """Return the output of running `code` with the visualiser interpreter, or None if
+    it does not finish without an error in `max_steps`. (The fast interpreters fold
+    runs such as `<>>`, so they do not raise an error for moving off the tape in the
+    middle of a run.)"""
+    interpreter = BrainfuckInterpreter(code, output_func=None)
+    try:
+        for _ in range(max_steps):
+            interpreter.step()
+    except ExecutionEndedError:
+        return interpreter.output
+    except ProgramRuntimeError:
+        pass
+    return None
+
+
+@pytest.mark.parametrize('interpreter_type', FAST_INTERPRETERS)
+def test_random_programs_match_reference(interpreter_type):
+    rng = random.Random(0)
+    checked = 0
+    while checked < 200:
+        code = '+' * rng.randrange(8) + _random_program(rng, rng.randrange(1, 40))
+        expected = _reference_output(code)
+        if expected is None:
+            continue
+        assert run(interpreter_type, code) == expected, code
+        checked += 1
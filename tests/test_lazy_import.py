@@ -0,0 +1,27 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from esolang_IDE import lazy_import
+
+
+def test_resolve():
+    assert lazy_import.resolve('esolang_IDE.interpreters.tape:Tape').__name__ == 'Tape'
+
+
+def test_lazy_exports():
+    __getattr__ = lazy_import.lazy_exports('esolang_IDE.interpreters', {'Tape': '.tape'})
+    assert __getattr__('Tape').__name__ == 'Tape'
+    with pytest.raises(AttributeError):
+        __getattr__('Missing')
+
+
+def test_packages_do_not_import_filetypes():
+    # The registry of languages depends on the packages, not the other way round
+    check = (
+        'import sys, esolang_IDE.interpreters, esolang_IDE.input_decoders; '
+        'assert "esolang_IDE.filetypes" not in sys.modules'
+    )
+    subprocess.run([sys.executable, '-c', check], cwd=Path(__file__).parent.parent, check=True)
@@ -0,0 +1,85 @@
+import io
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from esolang_IDE import run
+
+SAMPLE_PROGRAMS_PATH = (Path(__file__).parent / 'sample_programs').resolve()
+
+
+def run_program(code, input_bytes=b'', **kwargs):
+    stdout = io.BytesIO()
+    stderr = io.StringIO()
+    status = run.run_program(code, io.BytesIO(input_bytes), stdout, stderr, **kwargs)
+    return status, stdout.getvalue(), stderr.getvalue()
+
+
+@pytest.mark.parametrize('engine', run.ENGINES)
+def test_hello_world(engine):
+    code = (SAMPLE_PROGRAMS_PATH / 'hello world.b').read_text()
+    assert run_program(code, engine=engine) == (0, b'Hello World!' * 20, '')
+
+
+def test_bytes_round_trip():
+    data = bytes(range(1, 256))
+    assert run_program(',[.,]', data) == (0, data, '')
+
+
+def test_eof_error():
+    status, output, error = run_program('+[,.]', b'ab', eof='error')
+    assert (status, output) == (1, b'ab')
+    assert 'No input' in error
+
+
+def test_runtime_error():
+    status, output, error = run_program('+.<')
+    assert (status, output) == (1, b'\x01')
+    assert 'Tape pointer out of bounds' in error
+
+
+def test_syntax_error():
+    status, output, error = run_program('[')
+    assert (status, output) == (2, b'')
+    assert 'Unmatched opening parentheses' in error
+
+
+def test_wide_cells_written_as_utf8():
+    assert run_program('+' * 300 + '.', cell_bits=16) == (0, chr(300).encode(), '')
+
+
+def test_wide_cells_read_as_utf8():
+    data = 'aé€😀'.encode()
+    assert run_program(',[.,]', data, cell_bits=32) == (0, data, '')
+
+
+def test_utf8_input_split_between_reads():
+    class OneByteReader(io.BytesIO):
+        def read1(self, size=-1):
+            return super().read1(1)
+
+    data = '€é'.encode()
+    stdout = io.BytesIO()
+    status = run.run_program(',[.,]', OneByteReader(data), stdout, io.StringIO(), cell_bits=16)
+    assert (status, stdout.getvalue()) == (0, data)
+
+
+def test_command_line(tmp_path):
+    program = tmp_path / 'reverse.b'
+    program.write_text(',>,>,.<.<.')
+    # Check that the CLI never imports PyQt
+    check = (
+        'import sys, esolang_IDE.run; '
+        'assert not any(name.startswith("PyQt5") for name in sys.modules)'
+    )
+    cwd = Path(__file__).parent.parent
+    subprocess.run([sys.executable, '-c', check], cwd=cwd, check=True)
+    result = subprocess.run(
+        [sys.executable, '-m', 'esolang_IDE.run', str(program)],
+        input=b'abc',
+        capture_output=True,
+        cwd=cwd,
+    )
+    assert (result.returncode, result.stdout) == (0, b'cba')
@@ -0,0 +1,192 @@
+import threading
+
+from PyQt5 import QtCore
+
+from esolang_IDE.code_text import CodeText
+from esolang_IDE.controllers.visualiser_controller import Model
+from esolang_IDE.filetypes import FileTypes
+from esolang_IDE.interpreters import BrainfuckInterpreter, TapeVisual, Watchpoint
+from esolang_IDE.output_text import OutputText, RunnerOutputText
+from esolang_IDE.visualisers.visualiser_widgets.brainfuck import BrainfuckTableModel
+
+
+def make_code_text(qtbot, text):
+    code_text = CodeText()
+    qtbot.addWidget(code_text)
+    code_text.set_lexer(FileTypes.BRAINFUCK.to_lexer())
+    code_text.setText(text)
+    return code_text
+
+
+def test_toggle_breakpoint(qtbot):
+    code_text = make_code_text(qtbot, '+\n+\n+\n.')
+    code_text.toggle_breakpoint(2)
+    code_text.toggle_breakpoint(0)
+    assert code_text.breakpoint_lines() == [0, 2]
+    code_text.toggle_breakpoint(2)
+    assert code_text.breakpoint_lines() == [0]
+
+
+def test_breakpoint_ranges(qtbot):
+    code_text = make_code_text(qtbot, '++\n[->+<]\n\n.')
+    for line in (1, 2, 3):
+        code_text.toggle_breakpoint(line)
+    assert code_text.breakpoint_ranges() == [(3, 6), (10, 0), (11, 1)]
+
+
+class _Controller:
+    """Stands in for the `VisualiserController` of a `Model`."""
+
+    def __init__(self, code):
+        self.code = code
+
+    def get_source_code(self):
+        return self.code
+
+    def next_input(self):
+        return ''
+
+    def undo_input(self):
+        pass
+
+    def reset_visualiser(self):
+        pass
+
+    def update_view(self):
+        pass
+
+
+def test_short_steps_kept_in_history(qtbot):
+    model = Model(_Controller('+[>+<+]'))
+    model.set_interpreter_type(BrainfuckInterpreter)
+    for _ in range(3):
+        model.step(20)
+        qtbot.waitUntil(model._worker.isFinished)
+    # Stepping back over the steps doesn't need to replay from a checkpoint
+    interpreter = model._interpreter
+    assert interpreter.instruction_count == len(interpreter.past) == 60
+    model.stop()
+
+
+def test_steps_stop_at_watchpoint(qtbot):
+    model = Model(_Controller('+[>+<+]'))
+    model.set_interpreter_type(BrainfuckInterpreter)
+    model.step(50, [Watchpoint(1, 3)])
+    qtbot.waitUntil(model._worker.isFinished)
+    interpreter = model._interpreter
+    assert interpreter.tape[1] == 3
+    assert interpreter.instruction_count == 14
+    assert model.get_data().status_message == 'Stopped when cell 1 == 3'
+    model.stop()
+
+
+def test_show_output(qtbot):
+    output_text = OutputText()
+    qtbot.addWidget(output_text)
+    output = list('abc\ndef')
+    output_text.show_output(output, 0)
+    assert output_text.toPlainText() == 'abc\ndef'
+
+    # Go back past the new line, then add more output
+    del output[2:]
+    output_text.show_output(output, 2)
+    assert output_text.toPlainText() == 'ab'
+    output.extend('xy')
+    output_text.show_output(output, 2)
+    assert output_text.toPlainText() == 'abxy'
+    output_text.show_output(output, len(output))
+    assert output_text.toPlainText() == 'abxy'
+
+
+def test_show_output_past_dropped_lines(qtbot):
+    output_text = OutputText()
+    qtbot.addWidget(output_text)
+    output = list('x\n' * 2000)
+    output_text.show_output(output, 0)
+    assert output_text.toPlainText().count('\n') < 2000
+
+    # The removed characters are no longer in the document
+    del output[10:]
+    output_text.show_output(output, 10)
+    assert output_text.toPlainText() == 'x\n' * 5
+
+
+def record_changes(model):
+    changes = []
+    model.dataChanged.connect(
+        lambda top_left, bottom_right: changes.append(
+            (top_left.row(), top_left.column(), bottom_right.row(), bottom_right.column())
+        )
+    )
+    model.rowsInserted.connect(lambda parent, first, last: changes.append((first, last)))
+    return changes
+
+
+def test_changed_cells(qtbot):
+    model = BrainfuckTableModel()
+    changes = record_changes(model)
+    model.set_tape(TapeVisual([0] * 20, 0, {7}, 0))
+    model.display_changes()
+    # The old current cell, -1, is not in the table
+    assert sorted(changes) == [(0, 0, 0, 0), (1, 2, 1, 2)]
+
+    changes.clear()
+    model.set_tape(TapeVisual([0] * 20, 1, set(), 1))
+    model.display_changes()
+    assert sorted(changes) == [(0, 0, 0, 0), (0, 1, 0, 1)]
+
+    # The same version again is ignored
+    changes.clear()
+    model.set_tape(TapeVisual([0] * 20, 2, {5}, 1))
+    assert not model.has_changes()
+    model.display_changes()
+    assert changes == []
+
+
+def test_rows_inserted(qtbot):
+    model = BrainfuckTableModel()
+    changes = record_changes(model)
+    model.set_tape(TapeVisual([0] * 23, 0, None, 0))
+    model.display_changes()
+    assert model.rowCount(QtCore.QModelIndex()) == 5
+    assert changes == [(4, 4), (0, 0, 4, 4)]
+
+
+def test_many_changed_cells(qtbot):
+    model = BrainfuckTableModel()
+    model.set_columns(10)
+    changes = record_changes(model)
+    model.set_tape(TapeVisual([0] * 200, 0, set(range(42, 150)), 0))
+    model.display_changes()
+    assert changes[0] == (2, 19)
+    assert changes[-1] == (0, 0, 14, 9)
+
+
+def test_max_value(qtbot):
+    model = BrainfuckTableModel()
+    assert model.max_value() == 255
+    interpreter = BrainfuckInterpreter('-', output_func=None, cell_bits=32)
+    interpreter.step()
+    model.set_tape(interpreter.get_visual())
+    assert model.max_value() == 2**32 - 1
+
+
+def test_buffered_chars(qtbot):
+    output_text = RunnerOutputText()
+    qtbot.addWidget(output_text)
+
+    def write():
+        for _ in range(2000):
+            output_text.buffer_text('abc')
+
+    # The runner thread adds to the buffer while the text takes from it
+    writer = threading.Thread(target=write)
+    writer.start()
+    while writer.is_alive():
+        output_text.buffered_chars()
+        output_text._add_from_buffer()
+    writer.join()
+    assert output_text.buffered_chars() == 3 * 2000 - len(output_text.toPlainText())
+    while output_text.buffered_chars():
+        output_text._add_from_buffer()
+    assert output_text.toPlainText() == 'abc' * 2000